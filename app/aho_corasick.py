@@ -0,0 +1,77 @@
+# Archivo: app/aho_corasick.py
+# COLEPA - Autómata Aho-Corasick para detectar muchos patrones en una sola pasada
+
+from collections import deque
+from typing import Dict, Iterator, List, Set, Tuple
+
+
+class AutomataAhoCorasick:
+    """
+    Autómata de coincidencia múltiple de cadenas.
+    Se cargan los patrones con agregar(), se compila una vez y luego cada
+    búsqueda recorre el texto en una sola pasada, sin importar cuántos
+    patrones haya.
+    """
+
+    def __init__(self):
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._fallo: List[int] = [0]
+        self._salidas: List[List[str]] = [[]]
+        self._compilado = False
+
+    def agregar(self, patron: str):
+        """Agrega un patrón (se debe volver a compilar antes de buscar)"""
+        nodo = 0
+        for caracter in patron:
+            siguiente = self._transiciones[nodo].get(caracter)
+            if siguiente is None:
+                siguiente = len(self._transiciones)
+                self._transiciones[nodo][caracter] = siguiente
+                self._transiciones.append({})
+                self._fallo.append(0)
+                self._salidas.append([])
+            nodo = siguiente
+        if patron not in self._salidas[nodo]:
+            self._salidas[nodo].append(patron)
+        self._compilado = False
+
+    def compilar(self):
+        """Calcula los enlaces de fallo con un recorrido BFS"""
+        cola = deque()
+        for siguiente in self._transiciones[0].values():
+            self._fallo[siguiente] = 0
+            cola.append(siguiente)
+
+        while cola:
+            nodo = cola.popleft()
+            for caracter, siguiente in self._transiciones[nodo].items():
+                cola.append(siguiente)
+                fallo = self._fallo[nodo]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(caracter, 0)
+                self._fallo[siguiente] = destino if destino != siguiente else 0
+                self._salidas[siguiente] = self._salidas[siguiente] + self._salidas[self._fallo[siguiente]]
+
+        self._compilado = True
+
+    def buscar(self, texto: str) -> Iterator[Tuple[int, str]]:
+        """Genera (posición_inicio, patrón) por cada ocurrencia en el texto"""
+        if not self._compilado:
+            self.compilar()
+
+        for patron in self._salidas[0]:
+            yield 0, patron
+
+        nodo = 0
+        for posicion, caracter in enumerate(texto):
+            while nodo and caracter not in self._transiciones[nodo]:
+                nodo = self._fallo[nodo]
+            nodo = self._transiciones[nodo].get(caracter, 0)
+            for patron in self._salidas[nodo]:
+                if patron:
+                    yield posicion - len(patron) + 1, patron
+
+    def encontrar(self, texto: str) -> Set[str]:
+        """Conjunto de patrones distintos presentes en el texto"""
+        return {patron for _, patron in self.buscar(texto)}
@@ -0,0 +1,92 @@
+# Archivo: app/alias_leyes.py
+# COLEPA - Resolución de la ley mencionada en una consulta ("CPP", "el penal", "ley laboral"...)
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.aho_corasick import AutomataAhoCorasick
+from app.analizador import plegar
+
+# Nombre oficial (tal como figura en "nombre_ley") -> formas en que lo mencionan los usuarios.
+# Los alias se escriben ya plegados (minúsculas y sin tildes).
+ALIAS_LEYES: Dict[str, List[str]] = {
+    "Código Civil": [
+        "codigo civil", "cod. civil", "cod civil", "c.c.", "ley civil", "el civil", "derecho civil",
+    ],
+    "Código Penal": [
+        "codigo penal", "cod. penal", "cod penal", "c.p.", "ley penal", "el penal", "derecho penal",
+    ],
+    "Código Laboral": [
+        "codigo laboral", "cod. laboral", "codigo del trabajo", "ley laboral", "el laboral",
+        "derecho laboral", "ley del trabajo",
+    ],
+    "Código Procesal Penal": [
+        "codigo procesal penal", "cod. procesal penal", "cpp", "c.p.p.", "procesal penal",
+    ],
+    "Código Procesal Civil": [
+        "codigo procesal civil", "cod. procesal civil", "cpc", "c.p.c.", "procesal civil",
+    ],
+    "Código de la Niñez y la Adolescencia": [
+        "codigo de la ninez y la adolescencia", "codigo de la ninez", "cna", "ley de la ninez",
+        "ninez y adolescencia",
+    ],
+    "Código Aduanero": [
+        "codigo aduanero", "cod. aduanero", "ley aduanera", "el aduanero", "derecho aduanero",
+    ],
+    "Código Electoral": [
+        "codigo electoral", "cod. electoral", "ley electoral", "el electoral",
+    ],
+    "Código Sanitario": [
+        "codigo sanitario", "cod. sanitario", "ley sanitaria", "el sanitario",
+    ],
+    "Código de Organización Judicial": [
+        "codigo de organizacion judicial", "organizacion judicial", "coj",
+        "ley de organizacion judicial",
+    ],
+}
+
+
+class ResolutorLeyes:
+    """
+    Compila todos los alias en un autómata Aho-Corasick: una sola pasada
+    sobre la consulta encuentra cualquier mención a cualquier código.
+    Solo cuentan las coincidencias que empiezan y terminan en borde de palabra.
+    """
+
+    def __init__(self, nombres_corpus: Iterable[str] = (), alias: Optional[Dict[str, List[str]]] = None):
+        alias = alias if alias is not None else ALIAS_LEYES
+        self._ley_por_alias: Dict[str, str] = {}
+        for ley, formas in alias.items():
+            for forma in formas + [ley]:
+                self._ley_por_alias.setdefault(plegar(forma), ley)
+        # Leyes del corpus sin alias cargados: al menos su nombre oficial
+        for ley in nombres_corpus:
+            self._ley_por_alias.setdefault(plegar(ley), ley)
+
+        self._automata = AutomataAhoCorasick()
+        for forma in self._ley_por_alias:
+            self._automata.agregar(forma)
+        self._automata.compilar()
+
+    def menciones(self, query: str) -> List[Tuple[int, int, str]]:
+        """(inicio, fin, ley) de cada alias encontrado en la consulta"""
+        texto = plegar(query)
+        encontradas = []
+        for inicio, forma in self._automata.buscar(texto):
+            fin = inicio + len(forma)
+            if inicio > 0 and texto[inicio - 1].isalnum():
+                continue
+            if fin < len(texto) and texto[fin].isalnum():
+                continue
+            encontradas.append((inicio, fin, self._ley_por_alias[forma]))
+        return encontradas
+
+    def leyes_mencionadas(self, query: str) -> Set[str]:
+        return {ley for _, _, ley in self.menciones(query)}
+
+    def resolver(self, query: str) -> Optional[str]:
+        """Ley a la que se refiere la consulta: la mención más larga (y, a igual largo, la primera)"""
+        menciones = self.menciones(query)
+        if not menciones:
+            return None
+        inicio, fin, ley = min(menciones, key=lambda m: (-(m[1] - m[0]), m[0]))
+        return ley
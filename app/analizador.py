@@ -0,0 +1,79 @@
+# Archivo: app/analizador.py
+# COLEPA - Analizador de texto en español compartido por búsqueda, validación y cache
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Tuple
+
+try:
+    from unidecode import unidecode
+    UNIDECODE_AVAILABLE = True
+except ImportError:
+    UNIDECODE_AVAILABLE = False
+
+    def unidecode(texto: str) -> str:
+        descompuesto = unicodedata.normalize('NFKD', texto)
+        return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+# Palabras vacías ya plegadas (sin tildes, en minúsculas)
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aqui asi aun cada como con contra cual cuales
+cualquier cuando cuanto de del desde donde dos durante e el ella ellas ello ellos en entre era eran es esa
+esas ese eso esos esta estan estas este esto estos fue fueron ha habia han hasta hay la las le les lo los mas
+me mi mis mucho muchos muy nada ni no nos o otra otras otro otros para pero poco por porque que quien
+quienes se segun ser si sido sin sino sobre son su sus tal tambien tan tanto te tiene tienen todo todos tu tus
+un una unas uno unos ya y yo
+dice dicen puede pueden hacer hace cuales cuantos cuantas
+""".split())
+
+
+def plegar(texto: str) -> str:
+    """Minúsculas y sin tildes ("Código" → "codigo")"""
+    return unidecode(texto.lower())
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Tokens alfanuméricos del texto plegado"""
+    return re.findall(r'\w+', plegar(texto))
+
+
+def raiz(token: str) -> str:
+    """Stemming liviano: quita plurales y la vocal de género final"""
+    if len(token) < 4 or token.isdigit():
+        return token
+    if token.endswith("ces"):
+        token = token[:-3] + "z"
+    elif token.endswith(("os", "as", "es")):
+        token = token[:-2]
+    elif token.endswith("s"):
+        token = token[:-1]
+    if len(token) > 3 and token.endswith(("o", "a", "e")):
+        token = token[:-1]
+    return token
+
+
+def analizar_tokens(tokens: List[str]) -> List[str]:
+    """Stopwords y stemming sobre tokens ya plegados"""
+    return [raiz(token) for token in tokens if token not in STOPWORDS]
+
+
+def analizar(texto: str) -> List[str]:
+    """Pipeline completo: plegado, tokenización, stopwords y stemming"""
+    return analizar_tokens(tokenizar(texto))
+
+
+@lru_cache(maxsize=4096)
+def analizar_consulta(texto: str) -> Tuple[str, ...]:
+    """Igual que analizar(), memorizado para analizar cada consulta una sola vez"""
+    return tuple(analizar(texto))
+
+
+def normalizar_texto(texto: str) -> str:
+    """Forma canónica de una consulta para claves de cache"""
+    if not texto:
+        return ""
+    normalizado = plegar(texto).strip()
+    normalizado = re.sub(r'[^\w\s]', ' ', normalizado)
+    normalizado = re.sub(r'\s+', ' ', normalizado)
+    return normalizado.strip()
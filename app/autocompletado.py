@@ -0,0 +1,249 @@
+# Archivo: app/autocompletado.py
+# COLEPA - Autocompletado por prefijo de leyes, títulos, palabras clave y números de artículo
+#
+# Trie compacto (cada arista lleva varias letras) que se arma al cargar el
+# corpus. Cada nodo guarda ya sus mejores completaciones por frecuencia, así
+# que completar es recorrer el prefijo, sin explorar el subárbol ni puntuar
+# texto. Las frases se indexan también desde cada palabra ("injus" →
+# "despido injustificado"). Los números de artículo no entran al trie:
+# "Código Civil art. 1" se completa con búsqueda binaria sobre los números de
+# esa ley, ordenados por cuántas veces los citan otros artículos.
+
+import re
+import heapq
+import bisect
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.alias_leyes import ALIAS_LEYES
+from app.analizador import plegar
+
+MAX_COMPLETACIONES = 10
+# Frases más largas solo se indexan desde sus primeras palabras
+MAX_PALABRAS_FRASE = 8
+# Cuántas palabras del final de la consulta se intentan completar como frase
+MAX_PALABRAS_CONSULTA = 4
+MIN_LETRAS = 2
+# Hijos compartido por todas las hojas (más de la mitad de los nodos)
+_SIN_HIJOS: Dict[str, int] = {}
+
+# "Artículo 105.- Homicidio doloso. El que..." -> "Homicidio doloso"
+PATRON_EPIGRAFE = re.compile(r'\s*art(?:[íi]culo|\.)?\s*\d+\s*[º°]?\s*\.?\s*-?\s*([^.;:,]{3,80}?)\.\s', re.IGNORECASE)
+MAX_PALABRAS_EPIGRAFE = 6
+# "... art. 1", "artículo n° 12", "arts." al final de lo que se está escribiendo
+PATRON_NUMERO = re.compile(r'\bart(?:[íi]culos?|s)?\.?\s*(?:n[º°]?\s*)?(\d*)$', re.IGNORECASE)
+
+
+class TriePrefijos:
+    """
+    Radix trie de claves plegadas -> entradas. Los nodos viven en listas
+    paralelas (etiqueta de la arista, hijos por primera letra, mejores
+    entradas del subárbol) en lugar de un objeto por nodo.
+    """
+
+    def __init__(self, pares: Iterable[Tuple[str, int]], puntajes: Sequence[float], n: int = MAX_COMPLETACIONES):
+        self.puntajes = puntajes
+        self.n = n
+        entradas_por_clave: Dict[str, Set[int]] = {}
+        for clave, entrada in pares:
+            entradas_por_clave.setdefault(clave, set()).add(entrada)
+        self.etiquetas: List[str] = []
+        self.hijos: List[Dict[str, int]] = []
+        self.mejores: List[Tuple[int, ...]] = []
+        claves = sorted(entradas_por_clave)
+        self._construir(claves, entradas_por_clave, 0, len(claves), 0, "")
+
+    def __len__(self) -> int:
+        return len(self.etiquetas)
+
+    def _orden(self, entrada: int) -> Tuple[float, int]:
+        return self.puntajes[entrada], -entrada
+
+    def _construir(self, claves: List[str], entradas: Dict[str, Set[int]],
+                   desde: int, hasta: int, profundidad: int, etiqueta: str) -> int:
+        """Nodo para claves[desde:hasta], que comparten los primeros `profundidad` caracteres"""
+        nodo = len(self.etiquetas)
+        self.etiquetas.append(etiqueta)
+        self.hijos.append({})
+        self.mejores.append(())
+
+        hijos: Dict[str, int] = {}
+        candidatos: Set[int] = set()
+        i = desde
+        while i < hasta and len(claves[i]) == profundidad:
+            candidatos |= entradas[claves[i]]
+            i += 1
+        while i < hasta:
+            letra = claves[i][profundidad]
+            j = i + 1
+            while j < hasta and claves[j][profundidad] == letra:
+                j += 1
+            # Las claves están ordenadas: el prefijo común del grupo es el de la primera y la última
+            primera, ultima = claves[i], claves[j - 1]
+            comun = profundidad + 1
+            while comun < min(len(primera), len(ultima)) and primera[comun] == ultima[comun]:
+                comun += 1
+            hijo = self._construir(claves, entradas, i, j, comun, primera[profundidad:comun])
+            hijos[letra] = hijo
+            candidatos.update(self.mejores[hijo])
+            i = j
+
+        self.hijos[nodo] = hijos or _SIN_HIJOS
+        self.mejores[nodo] = tuple(heapq.nlargest(self.n, candidatos, key=self._orden))
+        return nodo
+
+    def buscar(self, prefijo: str) -> Tuple[int, ...]:
+        """Mejores entradas con alguna clave que empieza con `prefijo` (ya plegado)"""
+        nodo, profundidad = 0, 0
+        while profundidad < len(prefijo):
+            hijo = self.hijos[nodo].get(prefijo[profundidad])
+            if hijo is None:
+                return ()
+            etiqueta = self.etiquetas[hijo]
+            if not etiqueta.startswith(prefijo[profundidad:profundidad + len(etiqueta)]):
+                return ()
+            nodo, profundidad = hijo, profundidad + len(etiqueta)
+        return self.mejores[nodo]
+
+
+def _clave(texto: str) -> str:
+    return " ".join(plegar(texto).split())
+
+
+def _claves_frase(texto: str) -> List[str]:
+    """La frase plegada desde cada una de sus palabras"""
+    palabras = _clave(texto).split()
+    return [" ".join(palabras[i:]) for i in range(min(len(palabras), MAX_PALABRAS_FRASE))]
+
+
+def epigrafe(texto: str) -> Optional[str]:
+    """Título corto al comienzo del artículo ("Artículo 129.- Trata de personas.")"""
+    match = PATRON_EPIGRAFE.match(texto)
+    if match and len(match.group(1).split()) <= MAX_PALABRAS_EPIGRAFE:
+        return match.group(1).strip()
+    return None
+
+
+class Autocompletado:
+    """
+    Completaciones de un snapshot del corpus: nombres de ley (y sus alias),
+    "titulo", palabras clave y epígrafes de artículos en el trie; números de
+    artículo por ley en listas ordenadas.
+    """
+
+    def __init__(self, indice, n: int = MAX_COMPLETACIONES):
+        self.n = n
+        # Entradas en listas paralelas: texto, tipo, frecuencia y, para los epígrafes, (ley, número)
+        self.textos: List[str] = []
+        self.tipos: List[str] = []
+        self.frecuencias: List[int] = []
+        self.articulos: Dict[int, Tuple[str, str]] = {}
+        por_texto: Dict[Tuple[str, str], int] = {}
+        pares: List[Tuple[str, int]] = []
+
+        def agregar(texto: str, tipo: str, frecuencia: int, claves: List[str],
+                    articulo: Optional[Tuple[str, str]] = None):
+            clave = (tipo, _clave(texto))
+            entrada = por_texto.get(clave)
+            if entrada is None:
+                entrada = por_texto[clave] = len(self.textos)
+                self.textos.append(texto)
+                self.tipos.append(tipo)
+                self.frecuencias.append(0)
+                if articulo:
+                    self.articulos[entrada] = articulo
+            self.frecuencias[entrada] += frecuencia
+            pares.extend((c, entrada) for c in claves)
+
+        for ley, posiciones in indice.postings_leyes.items():
+            alias = [_clave(a) for a in ALIAS_LEYES.get(ley, [])]
+            agregar(ley, "ley", len(posiciones), _claves_frase(ley) + alias)
+
+        for valor, posiciones in indice.facetas["titulo"].items():
+            titulo = indice.etiquetas_facetas["titulo"][valor]
+            agregar(titulo, "titulo", len(posiciones), _claves_frase(titulo))
+
+        # Citas recibidas por artículo: frecuencia de epígrafes y números
+        self.citas: Dict[Tuple[str, str], int] = {}
+        self.numeros_por_ley: Dict[str, List[str]] = {}
+        palabras_clave: Dict[str, str] = {}
+        for posicion, art in enumerate(indice.articulos):
+            ley, numero = art['nombre_ley'], str(art['numero_articulo'])
+            citas = len(indice.citado_por.get(posicion, ()))
+            if citas:
+                self.citas[(ley, numero)] = citas
+            self.numeros_por_ley.setdefault(ley, []).append(numero)
+            for palabra in art.get('palabras_clave', []):
+                palabras_clave.setdefault(plegar(palabra), palabra)
+            titulo = epigrafe(art['texto_completo'])
+            if titulo:
+                agregar(f"{titulo} ({ley}, art. {numero})", "articulo", 1 + citas, _claves_frase(titulo), (ley, numero))
+
+        for palabra, posiciones in indice.postings_palabras_clave.items():
+            agregar(palabras_clave.get(palabra, palabra), "palabra_clave", len(posiciones), _claves_frase(palabra))
+
+        self.trie = TriePrefijos(pares, self.frecuencias, n)
+
+        # Números ordenados como texto (prefijo "1" = rango contiguo) y los mejores
+        # de los prefijos de hasta un dígito, que son los rangos más largos
+        self._mejores_numeros: Dict[Tuple[str, str], List[str]] = {}
+        for ley, numeros in self.numeros_por_ley.items():
+            numeros.sort()
+            for prefijo in [""] + [str(d) for d in range(1, 10)]:
+                self._mejores_numeros[(ley, prefijo)] = self._rango_numeros(ley, prefijo)
+
+    def __len__(self) -> int:
+        return len(self.textos)
+
+    def entrada(self, entrada: int) -> Dict:
+        resultado = {"texto": self.textos[entrada], "tipo": self.tipos[entrada], "frecuencia": self.frecuencias[entrada]}
+        if entrada in self.articulos:
+            resultado["nombre_ley"], resultado["numero_articulo"] = self.articulos[entrada]
+        return resultado
+
+    def _orden_numero(self, ley: str, numero: str) -> Tuple[int, int]:
+        return self.citas.get((ley, numero), 0), -int(numero) if numero.isdigit() else 0
+
+    def _rango_numeros(self, ley: str, prefijo: str) -> List[str]:
+        numeros = self.numeros_por_ley[ley]
+        desde = bisect.bisect_left(numeros, prefijo)
+        hasta = bisect.bisect_left(numeros, prefijo + "\uffff")
+        return heapq.nlargest(self.n, numeros[desde:hasta], key=lambda numero: self._orden_numero(ley, numero))
+
+    def completar_numero(self, digitos: str, ley: Optional[str], n: int) -> List[Dict]:
+        leyes = [ley] if ley in self.numeros_por_ley else list(self.numeros_por_ley)
+        candidatos = []
+        for nombre in leyes:
+            mejores = self._mejores_numeros.get((nombre, digitos))
+            if mejores is None:
+                mejores = self._rango_numeros(nombre, digitos)
+            candidatos.extend((self._orden_numero(nombre, numero), nombre, numero) for numero in mejores)
+        completaciones = []
+        for (citas, _), nombre, numero in heapq.nlargest(n, candidatos, key=lambda c: c[0]):
+            completaciones.append({
+                "texto": f"art. {numero}" if ley else f"art. {numero} del {nombre}",
+                "tipo": "numero", "frecuencia": citas, "nombre_ley": nombre, "numero_articulo": numero,
+            })
+        return completaciones
+
+    def completar(self, texto: str, n: Optional[int] = None, resolutor=None) -> List[Dict]:
+        """
+        Hasta `n` completaciones de lo que se está escribiendo. Cada una dice
+        desde qué carácter de `texto` reemplaza ("inicio"). `resolutor`
+        (ResolutorLeyes) detecta la ley mencionada antes de "art. 1".
+        """
+        n = min(n or self.n, self.n)
+        numero = PATRON_NUMERO.search(texto)
+        if numero:
+            ley = resolutor.resolver(texto[:numero.start()]) if resolutor else None
+            return [dict(c, inicio=numero.start()) for c in self.completar_numero(numero.group(1), ley, n)]
+
+        # La frase más larga que tenga completaciones: "despido injus" antes que "injus"
+        inicios = [palabra.start() for palabra in re.finditer(r'\S+', texto)][-MAX_PALABRAS_CONSULTA:]
+        for inicio in inicios:
+            prefijo = _clave(texto[inicio:]) + (" " if texto[-1:].isspace() else "")
+            if len(prefijo.strip()) < MIN_LETRAS:
+                continue
+            entradas = self.trie.buscar(prefijo)
+            if entradas:
+                return [dict(self.entrada(entrada), inicio=inicio) for entrada in entradas[:n]]
+        return []
@@ -0,0 +1,274 @@
+# Archivo: app/busqueda_distribuida.py
+# COLEPA - Búsqueda por shards: el corpus se reparte por ley entre procesos persistentes
+#
+# Cada proceso (shard) recibe los artículos de sus leyes, arma un
+# IndiceInvertido solo léxico y atiende consultas por un Pipe. El
+# coordinador manda la consulta a todos los shards involucrados, espera sus
+# top-k y los mezcla. Los shards usan el IDF y la longitud media del corpus
+# completo, así que sus scores BM25 son los mismos que daría un único índice.
+#
+# Cada consulta lleva un id y un hilo lector por shard entrega cada
+# respuesta a quien la pidió: varias consultas concurrentes comparten los
+# pipes sin esperarse. Los procesos arrancan con forkserver (o spawn), nunca
+# con fork: se levantan desde el hilo que vigila el corpus y un fork con
+# otros hilos activos puede heredar locks tomados.
+
+import time
+import heapq
+import logging
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.analizador import plegar
+from app.indice_invertido import PresupuestoAgotado
+
+logger = logging.getLogger(__name__)
+
+# Segundos que el coordinador espera las respuestas de una consulta
+TIMEOUT_CONSULTA = 30.0
+
+
+def repartir_leyes(conteos: Dict[str, int], num_shards: int) -> List[List[str]]:
+    """Reparte las leyes entre shards de manera greedy: la más grande va al shard con menos artículos"""
+    shards: List[List[str]] = [[] for _ in range(num_shards)]
+    cargas = [(0, i) for i in range(num_shards)]
+    heapq.heapify(cargas)
+    for ley, cantidad in sorted(conteos.items(), key=lambda item: (-item[1], item[0])):
+        carga, i = heapq.heappop(cargas)
+        shards[i].append(ley)
+        heapq.heappush(cargas, (carga + cantidad, i))
+    return [leyes for leyes in shards if leyes]
+
+
+def _proceso_shard(conexion, articulos: List[Dict], posiciones_globales: List[int],
+                   idf: Dict[str, float], longitud_media: float):
+    """Bucle del proceso shard: construye su índice y responde consultas hasta recibir 'cerrar'"""
+    from app.indice_invertido import IndiceInvertido, _puntuar_consulta, _mejores_posiciones, _formatear_articulo
+
+    indice = IndiceInvertido(articulos, solo_lexico=True)
+    indice.aplicar_estadisticas(idf, longitud_media)
+    conexion.send(("listo", len(articulos)))
+
+    while True:
+        try:
+            mensaje = conexion.recv()
+        except EOFError:
+            break
+        if mensaje[0] == "cerrar":
+            break
+        id_consulta = mensaje[1]
+        try:
+            _, _, query, k, min_score, modo, ventana, filtros, restante = mensaje
+            # El límite viaja como segundos restantes: el reloj monotónico es de cada proceso
+            limite = None if restante is None else time.monotonic() + restante
+            permitidos = indice.filtrar(filtros)
+            resultado = []
+            if permitidos is None or permitidos:
+                scores, coincidencias, _ = _puntuar_consulta(indice, query, modo, False, permitidos, ventana, limite)
+                for score, posicion in _mejores_posiciones(scores, k, min_score):
+                    hit = _formatear_articulo(indice.articulos[posicion])
+                    hit["score"] = score
+                    hit["terminos_coincidentes"] = sorted(coincidencias.get(posicion, ()))
+                    resultado.append((score, posiciones_globales[posicion], hit))
+            conexion.send((id_consulta, "ok", resultado))
+        except Exception as e:
+            conexion.send((id_consulta, "error", f"{type(e).__name__}: {e}"))
+    conexion.close()
+
+
+class _Shard:
+    """
+    Proceso worker con su extremo del Pipe. Los envíos se serializan con un
+    lock corto; las respuestas las lee un hilo propio y resuelven el Future
+    de la consulta con ese id.
+    """
+
+    def __init__(self, contexto, leyes: List[str], articulos: List[Dict], posiciones: List[int],
+                 idf: Dict[str, float], longitud_media: float):
+        self.leyes = leyes
+        self.leyes_plegadas = {plegar(ley) for ley in leyes}
+        self.lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pendientes: Dict[int, Future] = {}
+        self.caido = False
+        self._lector: Optional[threading.Thread] = None
+        self.conexion, extremo_worker = contexto.Pipe()
+        self.proceso = contexto.Process(
+            target=_proceso_shard,
+            args=(extremo_worker, articulos, posiciones, idf, longitud_media),
+            daemon=True,
+        )
+        self.proceso.start()
+        extremo_worker.close()
+
+    def esperar_listo(self, timeout: float):
+        if not self.conexion.poll(timeout):
+            raise TimeoutError(f"El shard {', '.join(self.leyes)} no terminó de indexar en {timeout}s")
+        estado, _ = self.conexion.recv()
+        if estado != "listo":
+            raise RuntimeError(f"El shard {', '.join(self.leyes)} no pudo iniciar")
+        self._lector = threading.Thread(target=self._leer_respuestas, daemon=True)
+        self._lector.start()
+
+    def _leer_respuestas(self):
+        """Hilo lector: entrega cada respuesta a su Future; si el pipe se corta, falla las pendientes"""
+        while True:
+            try:
+                id_consulta, estado, resultado = self.conexion.recv()
+            except (EOFError, OSError):
+                break
+            with self.lock:
+                futuro = self._pendientes.pop(id_consulta, None)
+            if futuro is not None:
+                futuro.set_result((estado, resultado))
+        with self.lock:
+            self.caido = True
+            pendientes, self._pendientes = self._pendientes, {}
+        for futuro in pendientes.values():
+            futuro.set_exception(EOFError(f"El shard {', '.join(self.leyes)} se cerró"))
+
+    def enviar(self, query: str, k: int, min_score: float, modo: str, ventana: int,
+               filtros: Dict[str, str], restante: Optional[float] = None) -> Future:
+        """Manda la consulta con un id nuevo; el Future se resuelve con (estado, resultado)"""
+        futuro: Future = Future()
+        with self.lock:
+            if self.caido:
+                raise BrokenPipeError(f"El shard {', '.join(self.leyes)} no responde")
+            id_consulta = next(self._ids)
+            self._pendientes[id_consulta] = futuro
+            try:
+                self.conexion.send(("buscar", id_consulta, query, k, min_score, modo, ventana, filtros, restante))
+            except Exception:
+                del self._pendientes[id_consulta]
+                raise
+        return futuro
+
+    def cancelar(self, futuro: Future):
+        """Olvida una consulta que ya no se espera (su respuesta, si llega, se descarta)"""
+        with self.lock:
+            for id_consulta, pendiente in self._pendientes.items():
+                if pendiente is futuro:
+                    del self._pendientes[id_consulta]
+                    break
+
+    def cerrar(self):
+        with self.lock:
+            try:
+                self.conexion.send(("cerrar",))
+            except (BrokenPipeError, OSError):
+                pass
+        self.proceso.join(timeout=5)
+        if self.proceso.is_alive():
+            self.proceso.terminate()
+        # Con el proceso terminado el lector recibe EOF y falla lo que quedó pendiente
+        if self._lector is not None:
+            self._lector.join(timeout=5)
+        self.conexion.close()
+
+
+class BuscadorDistribuido:
+    """
+    Coordinador de los shards. `iniciar(snapshot)` levanta un juego nuevo de
+    procesos para esa versión del corpus y recién después reemplaza (y
+    cierra) el anterior; `version` indica qué snapshot sirven los shards.
+    """
+
+    def __init__(self, num_shards: int, timeout_inicio: float = 300.0):
+        self.num_shards = max(1, num_shards)
+        self.timeout_inicio = timeout_inicio
+        self.version: Optional[str] = None
+        self._shards: List[_Shard] = []
+        # Nunca fork: iniciar() corre también en el hilo que recarga el corpus.
+        # El servidor de forkserver precarga el índice y cada shard se bifurca de él
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._contexto = multiprocessing.get_context("forkserver")
+            self._contexto.set_forkserver_preload(["app.indice_invertido"])
+        else:
+            self._contexto = multiprocessing.get_context("spawn")
+
+    def iniciar(self, snapshot):
+        indice = snapshot.indice
+        conteos = {ley: len(posiciones) for ley, posiciones in indice.postings_leyes.items()}
+        nuevos = []
+        try:
+            for leyes in repartir_leyes(conteos, self.num_shards):
+                posiciones = sorted(p for ley in leyes for p in indice.postings_leyes[ley])
+                articulos = [self._registro_plano(indice.articulos[p]) for p in posiciones]
+                nuevos.append(_Shard(self._contexto, leyes, articulos, posiciones,
+                                     indice.idf, indice.longitud_media))
+            for shard in nuevos:
+                shard.esperar_listo(self.timeout_inicio)
+        except Exception:
+            for shard in nuevos:
+                shard.cerrar()
+            raise
+
+        anteriores, self._shards = self._shards, nuevos
+        self.version = snapshot.version
+        for shard in anteriores:
+            shard.cerrar()
+        logger.info(
+            f"🧩 Búsqueda por shards activa: {len(nuevos)} procesos, versión {snapshot.version}"
+        )
+
+    @staticmethod
+    def _registro_plano(art) -> Dict[str, Any]:
+        """Copia serializable del artículo (los registros del corpus binario son vistas sobre el mmap)"""
+        return art.to_dict() if hasattr(art, "to_dict") else dict(art)
+
+    def _shards_para(self, filtros: Dict[str, str]) -> List[_Shard]:
+        ley = filtros.get("ley")
+        if not ley:
+            return self._shards
+        ley_plegada = plegar(str(ley).strip())
+        return [shard for shard in self._shards if ley_plegada in shard.leyes_plegadas]
+
+    def buscar_top_k(self, query: str, k: int, min_score: float, modo: str, ventana: int,
+                     filtros: Dict[str, str], limite: Optional[float] = None) -> Optional[List[Dict]]:
+        """
+        Top-k mezclado de todos los shards (mismo orden que la búsqueda local).
+        Devuelve None si algún shard falla, para que el llamador busque localmente.
+        Con `limite` (time.monotonic()) cada shard corta su ranking al pasarlo
+        y se levanta PresupuestoAgotado.
+        """
+        shards = self._shards_para(filtros)
+        if not shards:
+            return []
+        restante = None if limite is None else limite - time.monotonic()
+
+        # Se envía a todos antes de esperar la primera respuesta; otras consultas siguen en paralelo
+        futuros: List[Tuple[_Shard, Future]] = []
+        try:
+            for shard in shards:
+                futuros.append((shard, shard.enviar(query, k, min_score, modo, ventana, filtros, restante)))
+            respuestas = [futuro.result(timeout=TIMEOUT_CONSULTA) for _, futuro in futuros]
+        except (EOFError, BrokenPipeError, OSError, FuturesTimeoutError) as e:
+            # Shard caído o colgado: sin versión, nadie vuelve a usar este juego de shards
+            logger.error(f"❌ Shard sin respuesta, búsqueda local: {type(e).__name__}: {e}")
+            for shard, futuro in futuros:
+                shard.cancelar(futuro)
+            self.version = None
+            return None
+
+        candidatos: List[Tuple[float, int, Dict]] = []
+        for estado, resultado in respuestas:
+            if estado != "ok":
+                if resultado.startswith("ValueError"):
+                    raise ValueError(resultado.split(": ", 1)[1])
+                if resultado.startswith("PresupuestoAgotado"):
+                    raise PresupuestoAgotado(resultado.split(": ", 1)[1])
+                logger.error(f"❌ Error en shard: {resultado}")
+                return None
+            candidatos.extend(resultado)
+
+        mejores = heapq.nlargest(k, candidatos, key=lambda c: (c[0], -c[1]))
+        return [hit for _, _, hit in mejores]
+
+    def cerrar(self):
+        shards, self._shards = self._shards, []
+        self.version = None
+        for shard in shards:
+            shard.cerrar()
@@ -0,0 +1,138 @@
+# Archivo: app/busqueda_hibrida.py
+# COLEPA - Búsqueda híbrida: léxica (mock_search) + densa (vector_search) fusionadas con RRF
+#
+# Los dos buscadores corren en paralelo, y el denso busca en todas sus
+# colecciones a la vez. Cada uno devuelve una lista ordenada y la fusión
+# Reciprocal Rank Fusion suma 1 / (constante + rank) por cada lista donde
+# aparece el artículo: no hace falta que los scores de BM25 y de coseno
+# estén en la misma escala.
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.mock_search import buscar_top_k, buscar_articulos_por_numero, detectar_ley_en_consulta
+
+logger = logging.getLogger(__name__)
+
+try:
+    from app.vector_search import buscar_articulos_relevantes_lote, COLECCIONES_POR_LEY
+    DENSE_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f"⚠️ Búsqueda densa no disponible para el modo híbrido: {e}")
+    DENSE_AVAILABLE = False
+    COLECCIONES_POR_LEY = {}
+
+# Constante k de RRF (60 en el paper original)
+CONSTANTE_RRF = 60
+# Candidatos que aporta cada buscador a la fusión
+PROFUNDIDAD_FUSION = 20
+# Umbral de coseno de los candidatos densos (más bajo que el 0.7 de la búsqueda simple:
+# acá no deciden solos, solo proponen candidatos)
+UMBRAL_DENSO = 0.5
+
+# La búsqueda léxica y una tarea por colección densa (hasta 10 colecciones)
+_ejecutor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="colepa-hibrida")
+
+
+def _clave(hit: Dict) -> Tuple[str, str]:
+    return hit.get("nombre_ley", ""), str(hit.get("numero_articulo", ""))
+
+
+def fusion_rrf(listas: Dict[str, List[Dict]], k: int, constante: int = CONSTANTE_RRF) -> List[Dict]:
+    """
+    Fusiona listas ordenadas por rank. Cada hit fusionado lleva "score_rrf" y
+    "fuentes" ({buscador: {"rank", "aporte"}}); se conserva la primera versión
+    del artículo según el orden de `listas`.
+    """
+    fusionados: Dict[Tuple[str, str], Dict] = {}
+    for fuente, hits in listas.items():
+        for rank, hit in enumerate(hits, start=1):
+            clave = _clave(hit)
+            if clave not in fusionados:
+                fusionados[clave] = dict(hit, score_rrf=0.0, fuentes={})
+            elif fuente in fusionados[clave]["fuentes"]:
+                continue
+            aporte = 1.0 / (constante + rank)
+            fusionados[clave]["score_rrf"] += aporte
+            fusionados[clave]["fuentes"][fuente] = {"rank": rank, "aporte": aporte}
+    orden = sorted(enumerate(fusionados.values()), key=lambda par: (-par[1]["score_rrf"], par[0]))
+    return [hit for _, hit in orden[:k]]
+
+
+def _lexico(query: str, numero: Optional[int], ley: Optional[str], profundidad: int) -> List[Dict]:
+    """Artículos con el número pedido primero y después el ranking por palabras clave"""
+    hits = buscar_articulos_por_numero(numero, ley) if numero else []
+    vistos = {_clave(hit) for hit in hits}
+    for hit in buscar_top_k(query, k=profundidad):
+        if _clave(hit) not in vistos:
+            vistos.add(_clave(hit))
+            hits.append(hit)
+    return hits[:profundidad]
+
+
+def _denso(query: str, embedder: Callable[[str], List[float]], ley: Optional[str], profundidad: int) -> List[Dict]:
+    """
+    Vecinos por coseno en la colección de la ley mencionada (o en todas),
+    ordenados por score. Cada colección se busca en el ejecutor, en paralelo.
+    """
+    vector = embedder(query)
+    colecciones = [COLECCIONES_POR_LEY[ley]] if ley in COLECCIONES_POR_LEY else list(COLECCIONES_POR_LEY.values())
+    tareas = [
+        _ejecutor.submit(buscar_articulos_relevantes_lote, [vector], coleccion, profundidad, UMBRAL_DENSO)
+        for coleccion in colecciones
+    ]
+    hits = []
+    for tarea in tareas:
+        hits.extend(tarea.result()[0])
+    hits.sort(key=lambda hit: -hit["score"])
+    return hits[:profundidad]
+
+
+def _cronometrar(funcion, *args) -> Tuple[List[Dict], float, Optional[str]]:
+    inicio = time.perf_counter()
+    try:
+        resultado, error = funcion(*args), None
+    except Exception as e:
+        resultado, error = [], str(e)
+        logger.error(f"❌ Error en {funcion.__name__.strip('_')}: {e}")
+    return resultado, (time.perf_counter() - inicio) * 1000, error
+
+
+def buscar_hibrido(query: str, k: int = 5, embedder: Optional[Callable[[str], List[float]]] = None,
+                   numero: Optional[int] = None, profundidad: int = PROFUNDIDAD_FUSION,
+                   constante: int = CONSTANTE_RRF) -> Dict:
+    """
+    Corre el buscador léxico y el denso a la vez y fusiona sus rankings.
+    `embedder` convierte la consulta en vector (sin él, o sin vector_search,
+    solo participa el léxico). Devuelve {"hits", "buscadores", "latencia_ms"}:
+    por buscador, su latencia, cuántos candidatos dio, cuánto RRF aportó al
+    top-k y el error si falló.
+    """
+    inicio = time.perf_counter()
+    ley = detectar_ley_en_consulta(query)
+
+    tarea_lexica = _ejecutor.submit(_cronometrar, _lexico, query, numero, ley, profundidad)
+    resultados = {}
+    if embedder is not None and DENSE_AVAILABLE:
+        # En este hilo mientras corre la léxica: el embedding y el reparto de las colecciones
+        # al ejecutor (desde un hilo del ejecutor, esperar sus propias tareas podría trabarlo)
+        resultados["denso"] = _cronometrar(_denso, query, embedder, ley, profundidad)
+    resultados = {"lexico": tarea_lexica.result(), **resultados}
+
+    listas, buscadores = {}, {}
+    for fuente, (hits, latencia, error) in resultados.items():
+        listas[fuente] = hits
+        buscadores[fuente] = {"latencia_ms": round(latencia, 2), "candidatos": len(hits), "error": error}
+
+    fusionados = fusion_rrf(listas, k, constante)
+    for fuente, info in buscadores.items():
+        info["en_top_k"] = sum(1 for hit in fusionados if fuente in hit["fuentes"])
+        info["aporte_rrf"] = sum(hit["fuentes"][fuente]["aporte"] for hit in fusionados if fuente in hit["fuentes"])
+
+    return {
+        "hits": fusionados,
+        "buscadores": buscadores,
+        "latencia_ms": round((time.perf_counter() - inicio) * 1000, 2),
+    }
@@ -0,0 +1,69 @@
+# Archivo: app/cache_busqueda.py
+# COLEPA - Cache LRU acotado para resultados de búsqueda (incluye resultados vacíos)
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+_SIN_VALOR = object()
+
+
+class CacheLRU:
+    """
+    Cache LRU thread-safe con contadores de hits/misses.
+    Los resultados negativos (None) también se guardan: una consulta que no
+    encuentra nada es igual de cara de repetir que una que sí.
+    """
+
+    def __init__(self, capacidad: int = 2048):
+        self.capacidad = capacidad
+        self._entradas: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.hits_negativos = 0
+
+    def obtener(self, clave: Hashable) -> Any:
+        """Valor cacheado o _SIN_VALOR (None es un valor válido)"""
+        with self._lock:
+            valor = self._entradas.get(clave, _SIN_VALOR)
+            if valor is _SIN_VALOR:
+                self.misses += 1
+                return _SIN_VALOR
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            if valor is None:
+                self.hits_negativos += 1
+            return valor
+
+    def guardar(self, clave: Hashable, valor: Any):
+        if self.capacidad <= 0:
+            return
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def obtener_o_calcular(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        valor = self.obtener(clave)
+        if valor is _SIN_VALOR:
+            valor = calcular()
+            self.guardar(clave, valor)
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hit_rate_percentage": round(self.hits / total * 100, 1) if total else 0,
+                "hits": self.hits,
+                "hits_negativos": self.hits_negativos,
+                "misses": self.misses,
+                "entradas": len(self._entradas),
+                "capacidad": self.capacidad
+            }
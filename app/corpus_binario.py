@@ -0,0 +1,267 @@
+# Archivo: app/corpus_binario.py
+# COLEPA - Almacén de corpus binario compacto, leído con mmap
+#
+# Formato (little-endian, secciones alineadas a 8 bytes):
+#   cabecera  : MAGIA (8s) | versión (I) | n_articulos (I) | n_bloques (I) | relleno (I)
+#   tabla     : N_SECCIONES × (offset Q, longitud Q)
+#   secciones : metadata (JSON) | leyes (tabla de cadenas) | ids (q × n)
+#               | ley_idx (I × n) | numeros (tabla de cadenas) | palabras_clave (tabla de cadenas)
+#               | offsets_bloques (Q × n_bloques+1) | bloques (zlib concatenados)
+#               | ubicacion_texto (I × 3n: bloque, inicio, longitud)
+#               | libro | titulo | capitulo | seccion (tablas de cadenas, "" si falta)
+#
+# Los nombres de ley se guardan una sola vez (internados) y el texto se
+# comprime en bloques de varios artículos; un artículo se descomprime recién
+# cuando alguien lee su 'texto_completo'. Como el archivo se abre con mmap,
+# todos los workers de uvicorn comparten las mismas páginas.
+
+import json
+import mmap
+import sys
+import zlib
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+MAGIA = b"COLEPAC1"
+VERSION_FORMATO = 2
+ARTICULOS_POR_BLOQUE = 64
+BLOQUES_EN_CACHE = 32
+SEPARADOR_PALABRAS = "\x1f"
+
+_CABECERA = struct.Struct("<8sIIII")
+_SECCION = struct.Struct("<QQ")
+SECCIONES = (
+    "metadata", "leyes", "ids", "ley_idx", "numeros",
+    "palabras_clave", "offsets_bloques", "bloques", "ubicacion_texto",
+    "libro", "titulo", "capitulo", "seccion",
+)
+# Campos de jerarquía opcionales (los generan los scripts procesar_*)
+CAMPOS_JERARQUIA = ("libro", "titulo", "capitulo", "seccion")
+
+
+def _tabla_cadenas(cadenas: List[str]) -> bytes:
+    """Serializa: cantidad (I) | offsets (I × cantidad+1) | blob UTF-8"""
+    codificadas = [c.encode('utf-8') for c in cadenas]
+    offsets = [0]
+    for c in codificadas:
+        offsets.append(offsets[-1] + len(c))
+    return struct.pack(f"<I{len(offsets)}I", len(cadenas), *offsets) + b"".join(codificadas)
+
+
+def _alinear(datos: bytearray):
+    datos.extend(b"\0" * (-len(datos) % 8))
+
+
+def convertir_json(ruta_json: Path, ruta_salida: Path, articulos_por_bloque: int = ARTICULOS_POR_BLOQUE) -> int:
+    """Convierte legal_database.json al formato binario; devuelve la cantidad de artículos"""
+    with open(ruta_json, 'r', encoding='utf-8') as f:
+        legal_db = json.load(f)
+    articulos = legal_db['articulos']
+
+    leyes: List[str] = []
+    indice_leyes: Dict[str, int] = {}
+    ley_idx, ids, numeros, palabras = [], [], [], []
+    for art in articulos:
+        ley = art['nombre_ley']
+        if ley not in indice_leyes:
+            indice_leyes[ley] = len(leyes)
+            leyes.append(ley)
+        ley_idx.append(indice_leyes[ley])
+        ids.append(int(art.get('id', 0)))
+        numeros.append(str(art['numero_articulo']))
+        palabras.append(SEPARADOR_PALABRAS.join(art.get('palabras_clave', [])))
+
+    bloques, offsets_bloques, ubicacion = [], [0], []
+    for inicio in range(0, len(articulos), articulos_por_bloque):
+        crudo = bytearray()
+        for art in articulos[inicio:inicio + articulos_por_bloque]:
+            texto = art['texto_completo'].encode('utf-8')
+            ubicacion.extend((len(bloques), len(crudo), len(texto)))
+            crudo.extend(texto)
+        comprimido = zlib.compress(bytes(crudo), 6)
+        bloques.append(comprimido)
+        offsets_bloques.append(offsets_bloques[-1] + len(comprimido))
+
+    contenido = {
+        "metadata": json.dumps(legal_db.get('metadata', {}), ensure_ascii=False).encode('utf-8'),
+        "leyes": _tabla_cadenas(leyes),
+        "ids": struct.pack(f"<{len(ids)}q", *ids),
+        "ley_idx": struct.pack(f"<{len(ley_idx)}I", *ley_idx),
+        "numeros": _tabla_cadenas(numeros),
+        "palabras_clave": _tabla_cadenas(palabras),
+        "offsets_bloques": struct.pack(f"<{len(offsets_bloques)}Q", *offsets_bloques),
+        "bloques": b"".join(bloques),
+        "ubicacion_texto": struct.pack(f"<{len(ubicacion)}I", *ubicacion),
+    }
+    for campo in CAMPOS_JERARQUIA:
+        contenido[campo] = _tabla_cadenas([str(art.get(campo) or "") for art in articulos])
+
+    datos = bytearray(_CABECERA.size + _SECCION.size * len(SECCIONES))
+    _alinear(datos)
+    tabla = []
+    for nombre in SECCIONES:
+        tabla.append((len(datos), len(contenido[nombre])))
+        datos.extend(contenido[nombre])
+        _alinear(datos)
+
+    _CABECERA.pack_into(datos, 0, MAGIA, VERSION_FORMATO, len(articulos), len(bloques), 0)
+    for i, (offset, longitud) in enumerate(tabla):
+        _SECCION.pack_into(datos, _CABECERA.size + i * _SECCION.size, offset, longitud)
+
+    ruta_temporal = Path(str(ruta_salida) + ".tmp")
+    ruta_temporal.write_bytes(bytes(datos))
+    ruta_temporal.replace(ruta_salida)
+    return len(articulos)
+
+
+class _TablaCadenas:
+    """Vista perezosa sobre una tabla de cadenas dentro del mmap"""
+
+    def __init__(self, vista: memoryview):
+        cantidad = struct.unpack_from("<I", vista, 0)[0]
+        fin_offsets = 4 + 4 * (cantidad + 1)
+        self._offsets = vista[4:fin_offsets].cast('I')
+        self._blob = vista[fin_offsets:]
+        self.cantidad = cantidad
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+
+class CorpusBinario:
+    """
+    Corpus abierto con mmap. Se comporta como la lista ARTICULOS: indexable,
+    iterable y con len(); cada elemento es un ArticuloMapeado.
+    """
+
+    def __init__(self, ruta: Path, mapa: Optional[mmap.mmap] = None):
+        if sys.byteorder != 'little':
+            raise ValueError("El corpus binario solo se puede leer en plataformas little-endian")
+
+        self.ruta = Path(ruta)
+        if mapa is None:
+            with open(self.ruta, 'rb') as f:
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mmap = mapa
+        vista = memoryview(self._mmap)
+
+        magia, version, self._n, self._n_bloques, _ = _CABECERA.unpack_from(vista, 0)
+        if magia != MAGIA or version != VERSION_FORMATO:
+            raise ValueError(f"{self.ruta.name} no es un corpus COLEPA v{VERSION_FORMATO}")
+
+        secciones = {}
+        for i, nombre in enumerate(SECCIONES):
+            offset, longitud = _SECCION.unpack_from(vista, _CABECERA.size + i * _SECCION.size)
+            secciones[nombre] = vista[offset:offset + longitud]
+
+        self.metadata = json.loads(str(secciones["metadata"], 'utf-8'))
+        tabla_leyes = _TablaCadenas(secciones["leyes"])
+        self.leyes = [sys.intern(tabla_leyes[i]) for i in range(tabla_leyes.cantidad)]
+        self._ids = secciones["ids"].cast('q')
+        self._ley_idx = secciones["ley_idx"].cast('I')
+        self._numeros = _TablaCadenas(secciones["numeros"])
+        self._palabras = _TablaCadenas(secciones["palabras_clave"])
+        self._offsets_bloques = secciones["offsets_bloques"].cast('Q')
+        self._bloques = secciones["bloques"]
+        self._ubicacion = secciones["ubicacion_texto"].cast('I')
+        self._jerarquia = {campo: _TablaCadenas(secciones[campo]) for campo in CAMPOS_JERARQUIA}
+        self._cache_bloques: "OrderedDict[int, bytes]" = OrderedDict()
+        self._lock_bloques = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> "ArticuloMapeado":
+        # Registro creado en cada acceso: no hay una lista de registros por artículo en memoria
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return ArticuloMapeado(self, i)
+
+    def __iter__(self) -> Iterator["ArticuloMapeado"]:
+        return (ArticuloMapeado(self, i) for i in range(self._n))
+
+    def _bloque(self, numero: int) -> bytes:
+        """Bloque de texto descomprimido (con un LRU chico de bloques recientes)"""
+        with self._lock_bloques:
+            bloque = self._cache_bloques.get(numero)
+            if bloque is not None:
+                self._cache_bloques.move_to_end(numero)
+                return bloque
+        inicio, fin = self._offsets_bloques[numero], self._offsets_bloques[numero + 1]
+        bloque = zlib.decompress(self._bloques[inicio:fin])
+        with self._lock_bloques:
+            self._cache_bloques[numero] = bloque
+            if len(self._cache_bloques) > BLOQUES_EN_CACHE:
+                self._cache_bloques.popitem(last=False)
+        return bloque
+
+    def texto(self, i: int) -> str:
+        bloque, inicio, longitud = self._ubicacion[3 * i:3 * i + 3]
+        return self._bloque(bloque)[inicio:inicio + longitud].decode('utf-8')
+
+    def campo(self, i: int, nombre: str) -> Any:
+        if nombre == 'texto_completo':
+            return self.texto(i)
+        if nombre == 'nombre_ley':
+            return self.leyes[self._ley_idx[i]]
+        if nombre == 'numero_articulo':
+            return self._numeros[i]
+        if nombre == 'id':
+            return self._ids[i]
+        if nombre == 'palabras_clave':
+            palabras = self._palabras[i]
+            return palabras.split(SEPARADOR_PALABRAS) if palabras else []
+        if nombre in self._jerarquia:
+            valor = self._jerarquia[nombre][i]
+            if valor:
+                return valor
+        raise KeyError(nombre)
+
+
+class ArticuloMapeado:
+    """
+    Registro de artículo respaldado por el mmap, de solo lectura: los campos
+    del JSON se leen bajo demanda y lo que calcula el índice queda en el
+    índice, no en el registro.
+    """
+
+    __slots__ = ("_corpus", "_i")
+
+    CAMPOS = ("id", "nombre_ley", "numero_articulo", "texto_completo", "palabras_clave")
+
+    def __init__(self, corpus: CorpusBinario, i: int):
+        self._corpus = corpus
+        self._i = i
+
+    def __getitem__(self, clave: str) -> Any:
+        return self._corpus.campo(self._i, clave)
+
+    def _campos(self) -> List[str]:
+        jerarquia = self._corpus._jerarquia
+        return list(self.CAMPOS) + [campo for campo in CAMPOS_JERARQUIA if jerarquia[campo][self._i]]
+
+    def __contains__(self, clave: str) -> bool:
+        return clave in self._campos()
+
+    def get(self, clave: str, defecto: Any = None) -> Any:
+        try:
+            return self[clave]
+        except KeyError:
+            return defecto
+
+    def keys(self) -> List[str]:
+        return self._campos()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {clave: self[clave] for clave in self._campos()}
+
+
+def abrir_corpus(ruta: Path, mapa: Optional[mmap.mmap] = None) -> Dict[str, Any]:
+    """Abre un corpus binario con la misma forma que legal_database.json (`mapa`: el archivo ya mapeado)"""
+    corpus = CorpusBinario(ruta, mapa)
+    return {"metadata": corpus.metadata, "articulos": corpus}
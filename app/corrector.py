@@ -0,0 +1,148 @@
+# Archivo: app/corrector.py
+# COLEPA - Corrección ortográfica de consultas con SymSpell (borrado simétrico)
+#
+# Una palabra se corrige sola únicamente si no tiene postings en el índice
+# (ni ella ni su raíz) y su candidato está a una letra y gana claro por
+# frecuencia. Los demás candidatos se ofrecen como sugerencia sin tocar la
+# consulta: el corpus no tiene todo el español ("abuelo" no es "abuso").
+
+import re
+from typing import Container, Dict, List, Optional, Set, Tuple
+
+from app.analizador import STOPWORDS, plegar, raiz
+
+DISTANCIA_MAXIMA = 2
+LONGITUD_PREFIJO = 7
+LONGITUD_MINIMA = 4
+# Corrección automática: a esta distancia como máximo y con al menos esta
+# frecuencia respecto del segundo candidato a la misma distancia
+DISTANCIA_CORRECCION = 1
+RAZON_FRECUENCIA = 3
+
+# Palabras frecuentes en las consultas que no figuran en los códigos:
+# se reconocen como válidas para no "corregirlas" hacia un término legal
+PALABRAS_CONSULTA = frozenset("""
+quiero quisiera necesito saber sabes pregunta consulta consultar ayuda ayudame explica explicame
+informacion significa sucede pasa ocurre tengo puedo podria debo deberia hola gracias favor caso
+""".split())
+
+
+def distancia_edicion(a: str, b: str) -> int:
+    """Distancia Damerau-Levenshtein restringida (transposiciones adyacentes)"""
+    anterior_previa: List[int] = []
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], anterior_previa[j - 2] + 1)
+        anterior_previa, anterior = anterior, actual
+    return anterior[len(b)]
+
+
+class CorrectorSymSpell:
+    """
+    Diccionario de borrados simétricos construido con el vocabulario del corpus.
+    Para cada término se guardan sus variantes con hasta DISTANCIA_MAXIMA letras
+    borradas (solo sobre el prefijo, para acotar memoria); corregir una palabra
+    es generar sus propios borrados y verificar los pocos candidatos que coinciden.
+    """
+
+    def __init__(self, frecuencias: Dict[str, int],
+                 distancia_maxima: int = DISTANCIA_MAXIMA,
+                 longitud_prefijo: int = LONGITUD_PREFIJO,
+                 indexados: Container[str] = ()):
+        self.frecuencias = frecuencias
+        # Tokens analizados con postings: una palabra cuya raíz está acá no se corrige
+        self.indexados = indexados
+        self.distancia_maxima = distancia_maxima
+        self.longitud_prefijo = longitud_prefijo
+        self._borrados: Dict[str, List[str]] = {}
+
+        for termino in frecuencias:
+            if len(termino) < LONGITUD_MINIMA or termino.isdigit():
+                continue
+            for borrado in self._generar_borrados(termino[:longitud_prefijo], distancia_maxima):
+                self._borrados.setdefault(borrado, []).append(termino)
+
+    @staticmethod
+    def _generar_borrados(palabra: str, distancia: int) -> Set[str]:
+        borrados = {palabra}
+        frontera = {palabra}
+        for _ in range(distancia):
+            siguiente = set()
+            for variante in frontera:
+                if len(variante) <= 1:
+                    continue
+                for i in range(len(variante)):
+                    siguiente.add(variante[:i] + variante[i + 1:])
+            siguiente -= borrados
+            borrados |= siguiente
+            frontera = siguiente
+        return borrados
+
+    def _distancia_permitida(self, termino: str) -> int:
+        return 1 if len(termino) < 6 else self.distancia_maxima
+
+    def es_conocido(self, termino: str) -> bool:
+        return (termino in self.frecuencias or termino in STOPWORDS or termino in PALABRAS_CONSULTA
+                or raiz(termino) in self.indexados)
+
+    def _candidatos(self, termino: str) -> List[Tuple[int, int, str]]:
+        """(distancia, -frecuencia, término) del vocabulario, del más cercano al más lejano"""
+        if self.es_conocido(termino) or len(termino) < LONGITUD_MINIMA or termino.isdigit():
+            return []
+
+        distancia_maxima = self._distancia_permitida(termino)
+        candidatos: Set[str] = set()
+        for borrado in self._generar_borrados(termino[:self.longitud_prefijo], distancia_maxima):
+            candidatos.update(self._borrados.get(borrado, ()))
+
+        encontrados = []
+        for candidato in candidatos:
+            if abs(len(candidato) - len(termino)) > distancia_maxima:
+                continue
+            distancia = distancia_edicion(termino, candidato)
+            if distancia <= distancia_maxima:
+                encontrados.append((distancia, -self.frecuencias[candidato], candidato))
+        return sorted(encontrados)
+
+    def sugerir(self, termino: str) -> Optional[str]:
+        """Término del vocabulario más cercano (menor distancia, luego más frecuente)"""
+        candidatos = self._candidatos(termino)
+        return candidatos[0][2] if candidatos else None
+
+    def _correccion_segura(self, candidatos: List[Tuple[int, int, str]]) -> bool:
+        """El mejor candidato está a DISTANCIA_CORRECCION y no tiene un rival parecido a la misma distancia"""
+        distancia, frecuencia, _ = candidatos[0]
+        if distancia > DISTANCIA_CORRECCION:
+            return False
+        rivales = [c for c in candidatos[1:] if c[0] == distancia]
+        return not rivales or -frecuencia >= RAZON_FRECUENCIA * -rivales[0][1]
+
+    def revisar_consulta(self, query: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """({original: corrección} que se aplican solas, {original: sugerencia} que solo se ofrecen)"""
+        correcciones: Dict[str, str] = {}
+        sugerencias: Dict[str, str] = {}
+        for termino in set(re.findall(r'\w+', plegar(query))):
+            candidatos = self._candidatos(termino)
+            if not candidatos:
+                continue
+            if self._correccion_segura(candidatos):
+                correcciones[termino] = candidatos[0][2]
+            else:
+                sugerencias[termino] = candidatos[0][2]
+        return correcciones, sugerencias
+
+    def corregir_consulta(self, query: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Devuelve la consulta plegada con las correcciones seguras aplicadas
+        y el mapa {original: corrección}.
+        """
+        correcciones, _ = self.revisar_consulta(query)
+        if not correcciones:
+            return query, {}
+        corregida = re.sub(r'\w+', lambda m: correcciones.get(m.group(0), m.group(0)), plegar(query))
+        return corregida, correcciones
@@ -0,0 +1,116 @@
+# Archivo: app/estructura.py
+# COLEPA - Árbol libro → título → capítulo → sección de cada código, para navegarlo sin GPT
+#
+# Se arma una vez por snapshot del corpus con las facetas que ya calculó el
+# índice. La API entrega un nodo por vez (sus hijos resumidos, sin nietos)
+# y cada nodo se serializa una sola vez: el ETag es el hash del cuerpo, así
+# los nodos que no cambiaron conservan su ETag aunque el corpus se recargue.
+
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.autocompletado import epigrafe
+
+NIVELES = ("libro", "titulo", "capitulo", "seccion")
+
+
+class _Nodo:
+    __slots__ = ("nivel", "nombre", "hijos", "por_valor", "articulos", "total")
+
+    def __init__(self, nivel: str, nombre: str):
+        self.nivel = nivel
+        self.nombre = nombre
+        self.hijos: List["_Nodo"] = []
+        self.por_valor: Dict[str, "_Nodo"] = {}
+        # Posiciones de los artículos que cuelgan directamente de este nodo
+        self.articulos: List[int] = []
+        # Artículos en todo el subárbol
+        self.total = 0
+
+
+class EstructuraCodigos:
+    """
+    Un árbol por ley, en el orden en que aparecen los artículos en el corpus.
+    Los niveles que faltan en un artículo ("N/A" o vacíos) se saltan: el
+    artículo cuelga del último nivel que sí tiene.
+    """
+
+    def __init__(self, indice):
+        self.indice = indice
+        self.raices: Dict[str, _Nodo] = {}
+        for posicion, valores in enumerate(indice._facetas_por_articulo):
+            ley = indice.articulos[posicion]['nombre_ley']
+            nodo = self.raices.get(ley)
+            if nodo is None:
+                nodo = self.raices[ley] = _Nodo("ley", ley)
+            nodo.total += 1
+            for nivel, valor in zip(NIVELES, valores[1:]):
+                if valor is None:
+                    continue
+                hijo = nodo.por_valor.get(valor)
+                if hijo is None:
+                    hijo = nodo.por_valor[valor] = _Nodo(nivel, indice.etiquetas_facetas[nivel][valor])
+                    nodo.hijos.append(hijo)
+                nodo = hijo
+                nodo.total += 1
+            nodo.articulos.append(posicion)
+
+        # (ley, id del nodo) -> (cuerpo JSON, ETag)
+        self._serializados: Dict[Tuple[str, str], Tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def _camino(self, ley: str, id_nodo: str) -> Optional[List[Tuple[str, _Nodo]]]:
+        """(id, nodo) desde la raíz hasta el nodo "1.3.0" (índices de hijo); None si no existe"""
+        nodo = self.raices.get(ley)
+        if nodo is None:
+            return None
+        camino = [("", nodo)]
+        for parte in id_nodo.split(".") if id_nodo else []:
+            if not parte.isdigit() or int(parte) >= len(nodo.hijos):
+                return None
+            nodo = nodo.hijos[int(parte)]
+            camino.append((f"{camino[-1][0]}.{int(parte)}".lstrip("."), nodo))
+        return camino
+
+    def _a_json(self, ley: str, camino: List[Tuple[str, _Nodo]]) -> Dict:
+        id_nodo, nodo = camino[-1]
+        prefijo = f"{id_nodo}." if id_nodo else ""
+        articulos = []
+        for posicion in nodo.articulos:
+            art = self.indice.articulos[posicion]
+            articulos.append({
+                "numero_articulo": str(art['numero_articulo']),
+                "epigrafe": epigrafe(art['texto_completo']),
+            })
+        return {
+            "ley": ley,
+            "id": id_nodo,
+            "nivel": nodo.nivel,
+            "nombre": nodo.nombre,
+            "articulos_total": nodo.total,
+            "ruta": [{"id": i, "nivel": n.nivel, "nombre": n.nombre} for i, n in camino[:-1]],
+            "hijos": [
+                {
+                    "id": f"{prefijo}{i}", "nivel": hijo.nivel, "nombre": hijo.nombre,
+                    "articulos_total": hijo.total, "tiene_hijos": bool(hijo.hijos),
+                }
+                for i, hijo in enumerate(nodo.hijos)
+            ],
+            "articulos": articulos,
+        }
+
+    def nodo(self, ley: str, id_nodo: str = "") -> Optional[Tuple[bytes, str]]:
+        """Cuerpo JSON y ETag fuerte del nodo (serializado la primera vez que se pide)"""
+        camino = self._camino(ley, id_nodo)
+        if camino is None:
+            return None
+        clave = (ley, camino[-1][0])
+        resultado = self._serializados.get(clave)
+        if resultado is not None:
+            return resultado
+        cuerpo = json.dumps(self._a_json(ley, camino), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        resultado = (cuerpo, f'"{hashlib.sha256(cuerpo).hexdigest()[:32]}"')
+        with self._lock:
+            return self._serializados.setdefault(clave, resultado)
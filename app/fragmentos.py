@@ -0,0 +1,159 @@
+# Archivo: app/fragmentos.py
+# COLEPA - Fragmentos de un artículo que mejor responden a la consulta
+#
+# Los artículos largos (Código de Organización Judicial, Aduanero) inflan el
+# prompt de GPT. El texto se corta en oraciones e incisos (cortes después de
+# ".", ";" o ":" y en saltos de línea) y se eligen los segmentos con más
+# términos de la consulta, y después sus vecinos, hasta llenar un
+# presupuesto de tokens. Un artículo pedido por número se manda desde el
+# comienzo, sin saltos. Los offsets de cada segmento elegido (sobre el
+# texto original) permiten resaltarlos.
+
+import re
+import math
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from app.analizador import analizar, analizar_consulta, plegar
+
+# Aproximación de tokens de GPT para texto en español (sin tokenizer a mano)
+CARACTERES_POR_TOKEN = 3.5
+SEPARADOR = " […] "
+
+PATRON_CORTE = re.compile(r'(?<=[.;:])\s+|\s*\n\s*')
+# Un punto después de estas palabras no termina la oración ("art. 5", "inc. a")
+ABREVIATURAS = frozenset("art arts inc incs num nro nros n cod pag dr dra sr sra sres lit".split())
+
+# Palabras que dicen a qué artículo o ley se refiere la consulta, no de qué trata:
+# en "qué dice el artículo 10 del código de organización judicial" no eligen segmentos
+PALABRAS_REFERENCIA = frozenset(analizar(
+    "artículo artículos art arts inciso incisos inc numeral código códigos ley leyes "
+    "establece establecen dispone disponen"
+))
+
+Segmento = Tuple[int, int]
+
+
+def estimar_tokens(texto: str) -> int:
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+def _es_abreviatura(texto: str, punto: int, inicio_segmento: int) -> bool:
+    """El punto en texto[punto] cierra una abreviatura, una inicial o un número de inciso ("1." al empezar)"""
+    palabra = re.search(r'(\w*)$', texto[max(0, punto - 12):punto]).group(1)
+    if palabra.isdigit():
+        return len(palabra) <= 2 and punto - len(palabra) == inicio_segmento
+    return len(palabra) == 1 or plegar(palabra) in ABREVIATURAS
+
+
+def segmentar(texto: str) -> List[Segmento]:
+    """Oraciones e incisos como (inicio, fin) sobre el texto, sin los espacios de los cortes"""
+    segmentos: List[Segmento] = []
+    inicio = len(texto) - len(texto.lstrip())
+    for corte in PATRON_CORTE.finditer(texto):
+        if texto[corte.start() - 1:corte.start()] == "." and _es_abreviatura(texto, corte.start() - 1, inicio):
+            continue
+        if corte.start() > inicio:
+            segmentos.append((inicio, corte.start()))
+        inicio = corte.end()
+    fin = len(texto.rstrip())
+    if fin > inicio:
+        segmentos.append((inicio, fin))
+    return segmentos
+
+
+def terminos_consulta(query: str, nombre_ley: Optional[str] = None) -> Set[str]:
+    """Términos de la consulta que puntúan segmentos: sin números, referencias ni el nombre de la ley del artículo"""
+    excluidos = PALABRAS_REFERENCIA.union(analizar(nombre_ley)) if nombre_ley else PALABRAS_REFERENCIA
+    return {t for t in analizar_consulta(query) if not t.isdigit() and t not in excluidos}
+
+
+def puntuar_segmentos(texto: str, segmentos: Sequence[Segmento], query: str,
+                      idf: Optional[Dict[str, float]] = None, nombre_ley: Optional[str] = None) -> List[float]:
+    """Suma del IDF (o 1) de cada término distinto de la consulta presente en el segmento"""
+    terminos = terminos_consulta(query, nombre_ley)
+    return [
+        sum(idf.get(t, 0.0) if idf else 1.0 for t in terminos.intersection(analizar(texto[inicio:fin])))
+        for inicio, fin in segmentos
+    ]
+
+
+def seleccionar_fragmentos(texto: str, segmentos: Sequence[Segmento], puntajes: Sequence[float],
+                           presupuesto: int, contiguo: bool = False) -> Dict:
+    """
+    Elige segmentos hasta `presupuesto` tokens: el encabezado si es corto,
+    después los de mayor puntaje y, con lo que sobra, sus vecinos. Sin
+    coincidencias o con `contiguo` (artículo pedido por número), el
+    comienzo del artículo. Devuelve {"texto", "fragmentos" ([{"inicio",
+    "fin"}]), "tokens", "tokens_texto_completo", "recortado"}.
+    """
+    tokens_completo = estimar_tokens(texto)
+    if tokens_completo <= presupuesto or not segmentos:
+        return {
+            "texto": texto, "fragmentos": [{"inicio": 0, "fin": len(texto)}],
+            "tokens": tokens_completo, "tokens_texto_completo": tokens_completo, "recortado": False,
+        }
+
+    # Cada segmento paga también un separador, así el resultado no pasa del presupuesto
+    costos = [math.ceil((fin - inicio + len(SEPARADOR)) / CARACTERES_POR_TOKEN) for inicio, fin in segmentos]
+    if contiguo or not any(p > 0 for p in puntajes):
+        orden, continuo = list(range(len(segmentos))), True
+    else:
+        orden = sorted((i for i in range(len(segmentos)) if puntajes[i] > 0), key=lambda i: (-puntajes[i], i))
+        if costos[0] <= presupuesto // 4:
+            orden = [0] + [i for i in orden if i != 0]
+        continuo = False
+
+    # ...más las marcas de texto omitido al principio y al final
+    elegidos, usados = set(), estimar_tokens("[…] ")
+    for i in orden:
+        if usados + costos[i] <= presupuesto:
+            elegidos.add(i)
+            usados += costos[i]
+        elif continuo:
+            break
+
+    # Lo que sobra del presupuesto se llena con los vecinos de los elegidos, de a un segmento por lado
+    agregado = not continuo
+    while agregado:
+        agregado = False
+        for i in sorted(elegidos):
+            for vecino in (i - 1, i + 1):
+                if 0 <= vecino < len(segmentos) and vecino not in elegidos and usados + costos[vecino] <= presupuesto:
+                    elegidos.add(vecino)
+                    usados += costos[vecino]
+                    agregado = True
+
+    # Segmentos consecutivos forman un solo tramo
+    tramos: List[List[int]] = []
+    for i in sorted(elegidos):
+        if tramos and tramos[-1][2] == i - 1:
+            tramos[-1][1:] = [segmentos[i][1], i]
+        else:
+            tramos.append([segmentos[i][0], segmentos[i][1], i])
+    if not tramos:
+        # Ni el mejor segmento entra: se corta en el último espacio antes del presupuesto
+        inicio, fin = segmentos[orden[0]]
+        limite = inicio + int(presupuesto * CARACTERES_POR_TOKEN) - 2 * len(SEPARADOR)
+        corte = texto.rfind(" ", inicio, limite)
+        tramos = [[inicio, corte if corte > inicio else min(fin, limite), orden[0]]]
+
+    resultado = SEPARADOR.join(texto[inicio:fin] for inicio, fin, _ in tramos)
+    if tramos[0][0] > segmentos[0][0]:
+        resultado = "[…] " + resultado
+    if tramos[-1][1] < segmentos[-1][1]:
+        resultado += " […]"
+    return {
+        "texto": resultado,
+        "fragmentos": [{"inicio": inicio, "fin": fin} for inicio, fin, _ in tramos],
+        "tokens": estimar_tokens(resultado),
+        "tokens_texto_completo": tokens_completo,
+        "recortado": True,
+    }
+
+
+def extraer_fragmentos(texto: str, query: str, presupuesto: int, idf: Optional[Dict[str, float]] = None,
+                       nombre_ley: Optional[str] = None, contiguo: bool = False) -> Dict:
+    """Fragmentos de un texto que no está en el índice (payloads de Qdrant, referencias sin índice)"""
+    segmentos = segmentar(texto)
+    puntajes = [0.0] * len(segmentos) if contiguo else puntuar_segmentos(texto, segmentos, query, idf, nombre_ley)
+    return seleccionar_fragmentos(texto, segmentos, puntajes, presupuesto, contiguo)
@@ -0,0 +1,201 @@
+# Archivo: app/hnsw.py
+# COLEPA - Índice HNSW (Hierarchical Navigable Small World) para el backend vectorial local
+#
+# Grafo de vecinos en varias capas sobre los embeddings ya normalizados de
+# IndiceVectorial: la búsqueda baja de la capa más rala a la capa 0 y en
+# cada paso solo compara la consulta contra los vecinos del nodo actual.
+# El grafo se guarda aparte (<coleccion>.hnsw.npz) y no incluye los
+# vectores: se usa siempre sobre la misma matriz con la que se construyó.
+
+import math
+import heapq
+import random
+import logging
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VERSION_GRAFO = 1
+
+
+class IndiceHNSW:
+    """
+    M: vecinos por nodo en las capas superiores (2M en la capa 0).
+    ef_construccion: amplitud de la búsqueda al insertar (más = mejor grafo, más lento de armar).
+    ef: amplitud de la búsqueda al consultar (más = más recall, más latencia).
+    """
+
+    def __init__(self, M: int = 16, ef_construccion: int = 200, ef: int = 64, semilla: int = 42):
+        if M < 2:
+            raise ValueError("M debe ser al menos 2")
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construccion = ef_construccion
+        self.ef = ef
+        self.semilla = semilla
+        self._mL = 1 / math.log(M)
+        self.matriz: Optional[np.ndarray] = None
+        # nodo -> capa -> vecinos
+        self._vecinos: List[List[List[int]]] = []
+        self.punto_entrada = -1
+        self.nivel_maximo = -1
+
+    def __len__(self) -> int:
+        return len(self._vecinos)
+
+    def _filas(self, nodos) -> np.ndarray:
+        filas = self.matriz[nodos]
+        return filas if filas.dtype == np.float32 else filas.astype(np.float32)
+
+    # ========== CONSTRUCCIÓN ==========
+    def construir(self, matriz: np.ndarray, reportar_cada: int = 0) -> "IndiceHNSW":
+        """Inserta todas las filas de `matriz` (normalizadas) en orden"""
+        self.matriz = matriz
+        self._vecinos = []
+        self.punto_entrada, self.nivel_maximo = -1, -1
+        rng = random.Random(self.semilla)
+        for nodo in range(len(matriz)):
+            self._insertar(nodo, int(-math.log(1.0 - rng.random()) * self._mL))
+            if reportar_cada and (nodo + 1) % reportar_cada == 0:
+                logger.info(f"🕸️ HNSW: {nodo + 1}/{len(matriz)} nodos insertados")
+        return self
+
+    def _insertar(self, nodo: int, nivel: int):
+        consulta = self._filas(nodo)
+        self._vecinos.append([[] for _ in range(nivel + 1)])
+        if self.punto_entrada < 0:
+            self.punto_entrada, self.nivel_maximo = nodo, nivel
+            return
+
+        entradas = [self.punto_entrada]
+        for capa in range(self.nivel_maximo, nivel, -1):
+            entradas = [self._buscar_capa(consulta, entradas, 1, capa)[0][1]]
+
+        for capa in range(min(nivel, self.nivel_maximo), -1, -1):
+            candidatos = self._buscar_capa(consulta, entradas, self.ef_construccion, capa)
+            maximo = self.M0 if capa == 0 else self.M
+            self._vecinos[nodo][capa] = self._seleccionar(candidatos, self.M)
+            for vecino in self._vecinos[nodo][capa]:
+                lista = self._vecinos[vecino][capa]
+                lista.append(nodo)
+                if len(lista) > maximo:
+                    similitudes = (self._filas(lista) @ self._filas(vecino)).tolist()
+                    ordenados = sorted(zip(similitudes, lista), reverse=True)
+                    self._vecinos[vecino][capa] = self._seleccionar(ordenados, maximo)
+            entradas = [n for _, n in candidatos]
+
+        if nivel > self.nivel_maximo:
+            self.punto_entrada, self.nivel_maximo = nodo, nivel
+
+    def _seleccionar(self, candidatos: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        Heurística de vecinos de HNSW: un candidato entra si está más cerca del
+        nodo base que de los ya elegidos (así el grafo conserva conexiones
+        hacia otras zonas); los descartados completan hasta m.
+        """
+        if len(candidatos) <= m:
+            return [n for _, n in candidatos]
+        nodos = [n for _, n in candidatos]
+        entre_si = self._filas(nodos) @ self._filas(nodos).T
+        elegidos: List[int] = []
+        descartados: List[int] = []
+        for i, (similitud, _) in enumerate(candidatos):
+            if len(elegidos) >= m:
+                break
+            if not elegidos or entre_si[i, elegidos].max() < similitud:
+                elegidos.append(i)
+            else:
+                descartados.append(i)
+        elegidos.extend(descartados[:m - len(elegidos)])
+        return [nodos[i] for i in elegidos]
+
+    # ========== BÚSQUEDA ==========
+    def _buscar_capa(self, consulta: np.ndarray, entradas: List[int], ef: int,
+                     capa: int) -> List[Tuple[float, int]]:
+        """Búsqueda voraz en una capa; devuelve hasta ef (similitud, nodo) de mayor a menor"""
+        visitados = set(entradas)
+        similitudes = (self._filas(entradas) @ consulta).tolist()
+        candidatos = [(-s, n) for s, n in zip(similitudes, entradas)]
+        resultados = [(s, n) for s, n in zip(similitudes, entradas)]
+        heapq.heapify(candidatos)
+        heapq.heapify(resultados)
+        while len(resultados) > ef:
+            heapq.heappop(resultados)
+
+        while candidatos:
+            similitud_negada, nodo = heapq.heappop(candidatos)
+            if len(resultados) >= ef and -similitud_negada < resultados[0][0]:
+                break
+            nuevos = [v for v in self._vecinos[nodo][capa] if v not in visitados]
+            if not nuevos:
+                continue
+            visitados.update(nuevos)
+            for vecino, s in zip(nuevos, (self._filas(nuevos) @ consulta).tolist()):
+                if len(resultados) < ef or s > resultados[0][0]:
+                    heapq.heappush(candidatos, (-s, vecino))
+                    heapq.heappush(resultados, (s, vecino))
+                    if len(resultados) > ef:
+                        heapq.heappop(resultados)
+        return sorted(resultados, reverse=True)
+
+    def buscar(self, consulta: np.ndarray, k: int, ef: Optional[int] = None) -> List[Tuple[float, int]]:
+        """(similitud, fila) de los k vecinos aproximados de una consulta normalizada"""
+        if self.punto_entrada < 0 or k <= 0:
+            return []
+        consulta = np.asarray(consulta, dtype=np.float32)
+        entradas = [self.punto_entrada]
+        for capa in range(self.nivel_maximo, 0, -1):
+            entradas = [self._buscar_capa(consulta, entradas, 1, capa)[0][1]]
+        resultados = self._buscar_capa(consulta, entradas, max(ef or self.ef, k), 0)
+        return sorted(resultados, key=lambda r: (-r[0], r[1]))[:k]
+
+    # ========== PERSISTENCIA ==========
+    def guardar(self, ruta: Path):
+        """Guarda el grafo (sin los vectores) en un .npz"""
+        niveles, conteos, planos = [], [], []
+        for capas in self._vecinos:
+            niveles.append(len(capas) - 1)
+            for lista in capas:
+                conteos.append(len(lista))
+                planos.extend(lista)
+        ruta = Path(ruta)
+        ruta_temporal = ruta.with_name(ruta.name + ".tmp.npz")
+        np.savez(
+            ruta_temporal,
+            parametros=np.array([VERSION_GRAFO, self.M, self.ef_construccion, self.ef, self.semilla,
+                                 self.punto_entrada, self.nivel_maximo, len(self), self.matriz.shape[1]],
+                                dtype=np.int64),
+            niveles=np.asarray(niveles, dtype=np.int32),
+            offsets=np.concatenate([[0], np.cumsum(conteos, dtype=np.int64)]),
+            vecinos=np.asarray(planos, dtype=np.int32),
+        )
+        ruta_temporal.replace(ruta)
+
+    @classmethod
+    def cargar(cls, ruta: Path, matriz: np.ndarray) -> "IndiceHNSW":
+        """Carga un grafo guardado; `matriz` debe ser la misma con la que se construyó"""
+        with np.load(ruta) as datos:
+            version, M, ef_construccion, ef, semilla, entrada, nivel_maximo, n, dimension = \
+                datos["parametros"].tolist()
+            if version != VERSION_GRAFO:
+                raise ValueError(f"{Path(ruta).name}: versión de grafo {version}, se esperaba {VERSION_GRAFO}")
+            if (n, dimension) != matriz.shape:
+                raise ValueError(f"{Path(ruta).name} se construyó para {n} × {dimension}, no {matriz.shape}")
+            niveles = datos["niveles"].tolist()
+            offsets = datos["offsets"].tolist()
+            planos = datos["vecinos"].tolist()
+
+        indice = cls(M, ef_construccion, ef, semilla)
+        indice.matriz = matriz
+        indice.punto_entrada, indice.nivel_maximo = entrada, nivel_maximo
+        lista = 0
+        for nivel in niveles:
+            capas = []
+            for _ in range(nivel + 1):
+                capas.append(planos[offsets[lista]:offsets[lista + 1]])
+                lista += 1
+            indice._vecinos.append(capas)
+        return indice
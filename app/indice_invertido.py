@@ -0,0 +1,564 @@
+# Archivo: app/indice_invertido.py
+# COLEPA - Índice invertido del corpus y el scoring léxico (legacy, BM25, frases, proximidad)
+#
+# Separado de mock_search, que carga el corpus al importarse, para que los
+# procesos shard (busqueda_distribuida) arranquen con forkserver o spawn e
+# importen solo el índice.
+
+import os
+import re
+import math
+import time
+import heapq
+import bisect
+import logging
+from array import array
+from typing import Optional, Dict, Iterable, List, Set, Tuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from app.aho_corasick import AutomataAhoCorasick
+from app.analizador import STOPWORDS, analizar_consulta, plegar, raiz, tokenizar
+from app.corrector import CorrectorSymSpell
+from app.alias_leyes import ResolutorLeyes
+from app.referencias import GrafoReferencias
+from app.fragmentos import segmentar, seleccionar_fragmentos, terminos_consulta
+
+logger = logging.getLogger(__name__)
+
+
+# ========== MODOS DE RANKING ==========
+# "legacy": suma ad-hoc original (+5 palabra clave, +2 palabra en texto, +10 ley)
+# "bm25": BM25 con estadísticas del corpus precalculadas al cargar
+MODOS_RANKING = ("legacy", "bm25")
+MODO_RANKING = os.getenv("COLEPA_RANKING", "legacy")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# ========== FRASES Y PROXIMIDAD ==========
+# Las frases entre comillas ("estado civil") filtran; los términos de la
+# consulta que aparecen a menos de VENTANA_PROXIMIDAD palabras (las
+# stopwords cuentan) suman un bonus
+VENTANA_PROXIMIDAD = int(os.getenv("COLEPA_VENTANA_PROXIMIDAD", "5"))
+PESO_PROXIMIDAD = {"legacy": 2.0, "bm25": 1.0}
+
+# ========== FACETAS ==========
+# Faceta -> campo del artículo (los payloads de scripts/poblar_* traen la jerarquía)
+FACETAS = {"ley": "nombre_ley", "libro": "libro", "titulo": "titulo", "capitulo": "capitulo", "seccion": "seccion"}
+VALORES_SIN_FACETA = ("", "n/a")
+
+# ========== TIEMPO LÍMITE ==========
+# `limite` es un instante de time.monotonic(): el scoring lo revisa entre
+# términos y candidatos y corta con PresupuestoAgotado si ya pasó
+class PresupuestoAgotado(TimeoutError):
+    """El ranking no terminó antes del límite de tiempo de la consulta"""
+
+
+def _verificar_limite(limite: Optional[float]):
+    if limite is not None and time.monotonic() > limite:
+        raise PresupuestoAgotado("límite de tiempo de la consulta agotado")
+
+# Stopword -> id de un byte (0 = no es stopword), para verificarlas dentro de las frases
+ID_STOPWORD = {palabra: i for i, palabra in enumerate(sorted(STOPWORDS), 1)}
+
+# ========== ÍNDICE INVERTIDO ==========
+class IndiceInvertido:
+    """
+    Índice token → posting list construido una sola vez al cargar la base.
+    Cada artículo se analiza una sola vez (plegado, stopwords, stemming) y
+    sus tokens quedan solo en las estructuras del índice (postings y
+    posiciones en arrays compactos), nunca en el registro del artículo: con
+    el corpus binario los registros siguen siendo vistas sobre el mmap.
+    Solo se puntúan los artículos que comparten algún término con la consulta.
+    Con `solo_lexico` (shards) se arma solo lo que usa el scoring: sin
+    segmentos para fragmentos, corrector ni grafo de referencias.
+    """
+
+    def __init__(self, articulos: List[Dict], grafo: Optional[GrafoReferencias] = None,
+                 solo_lexico: bool = False):
+        self.articulos = articulos
+        self.solo_lexico = solo_lexico
+
+        # token analizado -> {posición del artículo: frecuencia del término}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        # token analizado -> {posición del artículo: orden de cada aparición entre los tokens del artículo}
+        self.posiciones: Dict[str, Dict[int, array]] = {}
+        self.longitudes: List[int] = []
+        # Por artículo, el id de stopword de cada palabra en orden (un byte por palabra):
+        # las stopwords no tienen postings pero una frase las tiene que respetar
+        self.stopwords_articulo: List[bytes] = []
+        # Oraciones/incisos de cada artículo ((inicio, fin) en el texto) y el orden
+        # del primer token de cada uno, para ubicar los términos por segmento
+        self.segmentos: List[Tuple[Tuple[int, int], ...]] = []
+        self.primer_token_segmento: List[array] = []
+        # palabra clave -> posiciones (con repetición, como en la lista original)
+        self.postings_palabras_clave: Dict[str, List[int]] = {}
+        # nombre oficial de la ley -> posiciones de sus artículos
+        self.postings_leyes: Dict[str, List[int]] = {}
+        # (nombre_ley, numero_articulo) -> posición, y numero -> leyes que lo tienen
+        self.por_ley_numero: Dict[Tuple[str, str], int] = {}
+        self.leyes_por_numero: Dict[str, List[str]] = {}
+        # nombre de ley plegado -> nombre oficial
+        self.nombres_leyes: Dict[str, str] = {}
+        # faceta -> valor plegado -> posiciones; y el valor original para mostrar
+        posiciones_facetas: Dict[str, Dict[str, List[int]]] = {faceta: {} for faceta in FACETAS}
+        self.etiquetas_facetas: Dict[str, Dict[str, str]] = {faceta: {} for faceta in FACETAS}
+        self._facetas_por_articulo: List[Tuple[Optional[str], ...]] = []
+
+        self.automata_palabras_clave = AutomataAhoCorasick()
+
+        # palabra plegada (sin stemming) -> frecuencia, para el corrector ortográfico
+        frecuencias_palabras: Dict[str, int] = {}
+        # palabra plegada del texto (sin stemming ni stopwords) -> posiciones de los artículos que la tienen,
+        # para el "palabra in texto" del ranking legacy (el original no usaba raíces)
+        self.postings_palabras: Dict[str, array] = {}
+
+        for posicion, art in enumerate(articulos):
+            texto = art['texto_completo']
+            if solo_lexico:
+                # Los cortes de segmento caen en espacios: el texto entero da las mismas palabras
+                palabras = tokenizar(texto)
+                palabras_segmentos = [palabras]
+            else:
+                segmentos = segmentar(texto)
+                palabras_segmentos = [tokenizar(texto[inicio:fin]) for inicio, fin in segmentos]
+                palabras = [palabra for palabras_segmento in palabras_segmentos for palabra in palabras_segmento]
+                extras = tokenizar(" ".join(art.get('palabras_clave', []))) + tokenizar(art['nombre_ley'])
+                for palabra in palabras + extras:
+                    frecuencias_palabras[palabra] = frecuencias_palabras.get(palabra, 0) + 1
+            for palabra in set(palabras) - STOPWORDS:
+                por_palabra = self.postings_palabras.get(palabra)
+                if por_palabra is None:
+                    por_palabra = self.postings_palabras[palabra] = array('I')
+                por_palabra.append(posicion)
+
+            # El orden cuenta todas las palabras, también las stopwords que no se
+            # indexan: "daños y perjuicios" no queda pegado como "daños perjuicios"
+            primeros, orden, longitud = [], 0, 0
+            for palabras_segmento in palabras_segmentos:
+                primeros.append(orden)
+                for palabra in palabras_segmento:
+                    if palabra not in STOPWORDS:
+                        token = raiz(palabra)
+                        ordenes = self.posiciones.setdefault(token, {}).get(posicion)
+                        if ordenes is None:
+                            ordenes = self.posiciones[token][posicion] = array('I')
+                        ordenes.append(orden)
+                        longitud += 1
+                    orden += 1
+            if not solo_lexico:
+                self.segmentos.append(tuple(segmentos))
+                self.primer_token_segmento.append(array('I', primeros))
+            self.longitudes.append(longitud)
+            self.stopwords_articulo.append(bytes(ID_STOPWORD.get(palabra, 0) for palabra in palabras))
+
+            for palabra in art.get('palabras_clave', []):
+                palabra_plegada = plegar(palabra)
+                self.postings_palabras_clave.setdefault(palabra_plegada, []).append(posicion)
+                self.automata_palabras_clave.agregar(palabra_plegada)
+
+            self.postings_leyes.setdefault(art['nombre_ley'], []).append(posicion)
+            self.nombres_leyes.setdefault(plegar(art['nombre_ley']), art['nombre_ley'])
+
+            valores = []
+            for faceta, campo in FACETAS.items():
+                valor = str(art.get(campo) or "").strip()
+                clave_valor = plegar(valor)
+                if clave_valor in VALORES_SIN_FACETA:
+                    valores.append(None)
+                    continue
+                posiciones_facetas[faceta].setdefault(clave_valor, []).append(posicion)
+                self.etiquetas_facetas[faceta].setdefault(clave_valor, valor)
+                valores.append(clave_valor)
+            self._facetas_por_articulo.append(tuple(valores))
+
+            clave = (art['nombre_ley'], str(art['numero_articulo']))
+            if clave not in self.por_ley_numero:
+                self.por_ley_numero[clave] = posicion
+                self.leyes_por_numero.setdefault(clave[1], []).append(art['nombre_ley'])
+
+        self.automata_palabras_clave.compilar()
+        # Frecuencia de cada término por artículo: la cantidad de apariciones ya indexadas
+        self.postings = {
+            token: {posicion: len(ordenes) for posicion, ordenes in por_articulo.items()}
+            for token, por_articulo in self.posiciones.items()
+        }
+        self.facetas: Dict[str, Dict[str, frozenset]] = {
+            faceta: {valor: frozenset(posiciones) for valor, posiciones in por_valor.items()}
+            for faceta, por_valor in posiciones_facetas.items()
+        }
+        # Alias de cada código ("CPP", "el penal"...) compilados en un autómata
+        self.resolutor = ResolutorLeyes(self.postings_leyes)
+
+        # Referencias cruzadas por posición (las que apuntan fuera del corpus se descartan)
+        if grafo is None and not solo_lexico:
+            grafo = GrafoReferencias.desde_articulos(articulos, self.resolutor)
+        self.referencias: Dict[int, Tuple[int, ...]] = {}
+        citado_por: Dict[int, List[int]] = {}
+        for origen, destinos in grafo.salientes.items() if grafo is not None else ():
+            posicion = self.por_ley_numero.get(origen)
+            if posicion is None:
+                continue
+            citados = tuple(dict.fromkeys(
+                self.por_ley_numero[d] for d in destinos if d in self.por_ley_numero and d != origen
+            ))
+            if citados:
+                self.referencias[posicion] = citados
+                for citado in citados:
+                    citado_por.setdefault(citado, []).append(posicion)
+        self.citado_por: Dict[int, Tuple[int, ...]] = {p: tuple(o) for p, o in citado_por.items()}
+
+        # Estadísticas BM25: IDF por término y normalización por longitud por artículo
+        total = len(articulos)
+        longitud_media = (sum(self.longitudes) / total) if total else 0.0
+        self.aplicar_estadisticas({
+            token: math.log(1 + (total - len(frecuencias) + 0.5) / (len(frecuencias) + 0.5))
+            for token, frecuencias in self.postings.items()
+        }, longitud_media)
+
+        self.corrector = None if solo_lexico else CorrectorSymSpell(frecuencias_palabras, indexados=self.postings)
+
+        # Matriz término-documento BM25 para búsqueda por lotes (se arma bajo demanda)
+        self._vocabulario: Optional[Dict[str, int]] = None
+        self._matriz_bm25 = None
+
+        # Sufijos ordenados de las palabras de los textos: resuelven "palabra in
+        # texto" con búsqueda binaria en lugar de un escaneo del corpus
+        self._sufijos = sorted(
+            (palabra[i:], palabra) for palabra in self.postings_palabras for i in range(len(palabra))
+        )
+
+    def aplicar_estadisticas(self, idf: Dict[str, float], longitud_media: float):
+        """
+        Fija IDF y longitud media de BM25. Un shard recibe las del corpus completo
+        para que sus scores sean comparables con los de los demás shards.
+        """
+        self.idf = {token: idf.get(token, 0.0) for token in self.postings}
+        self.longitud_media = longitud_media
+        self._normalizacion_bm25: List[float] = [
+            BM25_K1 * (1 - BM25_B + BM25_B * longitud / longitud_media) if longitud_media else BM25_K1
+            for longitud in self.longitudes
+        ]
+
+    def cobertura(self, posicion: int, query: str) -> Optional[float]:
+        """Fracción de los términos (no numéricos) de la consulta que aparecen en el artículo; None si no hay términos"""
+        terminos = {t for t in analizar_consulta(query) if not t.isdigit()}
+        if not terminos:
+            return None
+        return sum(1 for t in terminos if posicion in self.postings.get(t, ())) / len(terminos)
+
+    def fragmento(self, posicion: int, query: str, presupuesto: int, contiguo: bool = False) -> Dict:
+        """
+        Segmentos del artículo que mejor responden a la consulta dentro de
+        `presupuesto` tokens (ver fragmentos.seleccionar_fragmentos). Usa los
+        cortes y las posiciones de términos ya indexados: no re-tokeniza.
+        """
+        art = self.articulos[posicion]
+        primeros = self.primer_token_segmento[posicion]
+        puntajes = [0.0] * len(primeros)
+        for termino in () if contiguo else terminos_consulta(query, art['nombre_ley']):
+            ordenes = self.posiciones.get(termino, {}).get(posicion)
+            if ordenes:
+                for segmento in {bisect.bisect_right(primeros, orden) - 1 for orden in ordenes}:
+                    puntajes[segmento] += self.idf[termino]
+        return seleccionar_fragmentos(art['texto_completo'], self.segmentos[posicion], puntajes, presupuesto, contiguo)
+
+    def palabras_con_fragmento(self, fragmento: str) -> Set[str]:
+        """Palabras plegadas de los textos que contienen el fragmento"""
+        palabras = set()
+        inicio = bisect.bisect_left(self._sufijos, (fragmento, ''))
+        for sufijo, palabra in self._sufijos[inicio:]:
+            if not sufijo.startswith(fragmento):
+                break
+            palabras.add(palabra)
+        return palabras
+
+    def articulos_con_fragmento(self, fragmento: str) -> Set[int]:
+        """Posiciones de los artículos con alguna palabra que contiene el fragmento"""
+        posiciones = set()
+        for palabra in self.palabras_con_fragmento(fragmento):
+            posiciones.update(self.postings_palabras[palabra])
+        return posiciones
+
+    def posiciones_por_numero(self, numero: int, nombre_ley: Optional[str] = None) -> List[int]:
+        """Posiciones de los artículos con ese número (en todas las leyes o en una sola)"""
+        numero_str = str(numero)
+        if nombre_ley:
+            ley = self.nombres_leyes.get(plegar(nombre_ley))
+            posicion = self.por_ley_numero.get((ley, numero_str))
+            return [posicion] if posicion is not None else []
+        return [self.por_ley_numero[(ley, numero_str)] for ley in self.leyes_por_numero.get(numero_str, [])]
+
+    def detectar_ley(self, query: str) -> Optional[str]:
+        """Nombre oficial de la ley a la que se refiere la consulta (por nombre o alias)"""
+        return self.resolutor.resolver(query)
+
+    def posiciones_ley(self, nombre_ley: str) -> frozenset:
+        """Posiciones de los artículos de una ley (vacío si no está en el corpus)"""
+        return self.facetas["ley"].get(plegar(nombre_ley), frozenset())
+
+    def filtrar(self, filtros: Optional[Dict[str, str]]) -> Optional[frozenset]:
+        """
+        Intersección de los conjuntos de cada faceta pedida, empezando por el
+        más chico (None si no hay filtros). Los valores se comparan plegados.
+        """
+        if not filtros:
+            return None
+        conjuntos = []
+        for faceta, valor in filtros.items():
+            if faceta not in FACETAS:
+                raise ValueError(f"Faceta desconocida: {faceta} (opciones: {', '.join(FACETAS)})")
+            conjuntos.append(self.facetas[faceta].get(plegar(str(valor).strip()), frozenset()))
+        conjuntos.sort(key=len)
+        resultado = conjuntos[0]
+        for conjunto in conjuntos[1:]:
+            if not resultado:
+                break
+            resultado = resultado & conjunto
+        return resultado
+
+    def contar_facetas(self, posiciones: Iterable[int]) -> Dict[str, Dict[str, int]]:
+        """Cantidad de artículos por valor de cada faceta dentro de un conjunto de resultados"""
+        conteos: Dict[str, Dict[str, int]] = {faceta: {} for faceta in FACETAS}
+        nombres = list(FACETAS)
+        for posicion in posiciones:
+            for faceta, valor in zip(nombres, self._facetas_por_articulo[posicion]):
+                if valor is not None:
+                    etiqueta = self.etiquetas_facetas[faceta][valor]
+                    conteos[faceta][etiqueta] = conteos[faceta].get(etiqueta, 0) + 1
+        return {faceta: valores for faceta, valores in conteos.items() if valores}
+
+    def articulos_con_frase(self, frase: str) -> Set[int]:
+        """
+        Artículos donde aparece la frase tal cual: sus términos con las mismas
+        distancias que en la consulta y, en los huecos, las mismas stopwords
+        ("daños y perjuicios" no es "daños de perjuicios"). Intersecta primero
+        las posting lists, después los desplazamientos y al final las stopwords.
+        """
+        palabras = tokenizar(frase)
+        terminos = [(raiz(palabra), i) for i, palabra in enumerate(palabras) if palabra not in STOPWORDS]
+        stopwords = [(ID_STOPWORD[palabra], i) for i, palabra in enumerate(palabras) if palabra in STOPWORDS]
+        if not terminos:
+            return set()
+        listas = [self.posiciones.get(termino) for termino, _ in terminos]
+        if any(lista is None for lista in listas):
+            return set()
+
+        candidatos = set(min(listas, key=len))
+        for lista in listas:
+            candidatos &= lista.keys()
+
+        primero = terminos[0][1]
+        resultado = set()
+        for posicion in candidatos:
+            inicios = set(listas[0][posicion])
+            for (_, lugar), lista in zip(terminos[1:], listas[1:]):
+                desplazamiento = lugar - primero
+                inicios &= {orden - desplazamiento for orden in lista[posicion]}
+                if not inicios:
+                    break
+            if stopwords and inicios:
+                ids = self.stopwords_articulo[posicion]
+                # orden - primero es donde empieza la frase en el artículo
+                inicios = {
+                    orden for orden in inicios
+                    if all(0 <= orden - primero + lugar < len(ids) and ids[orden - primero + lugar] == id_stopword
+                           for id_stopword, lugar in stopwords)
+                }
+            if inicios:
+                resultado.add(posicion)
+        return resultado
+
+    @staticmethod
+    def _distancia_minima(a: List[int], b: List[int]) -> int:
+        """Menor |i - j| entre dos listas ordenadas de posiciones (merge lineal)"""
+        i = j = 0
+        mejor = abs(a[0] - b[0])
+        while i < len(a) and j < len(b):
+            mejor = min(mejor, abs(a[i] - b[j]))
+            if a[i] < b[j]:
+                i += 1
+            else:
+                j += 1
+        return mejor
+
+    def puntuar_proximidad(self, terminos: List[str], candidatos: Iterable[int], ventana: int,
+                           limite: Optional[float] = None) -> Dict[int, float]:
+        """
+        Bonus por cercanía: por cada par de términos consecutivos de la consulta
+        presentes en el artículo a distancia d <= ventana suma (ventana - d + 1) / ventana.
+        """
+        distintos = [t for t in dict.fromkeys(terminos) if t in self.posiciones]
+        bonus: Dict[int, float] = {}
+        if len(distintos) < 2 or ventana <= 0:
+            return bonus
+        for i, posicion in enumerate(candidatos):
+            if i % 256 == 0:
+                _verificar_limite(limite)
+            presentes = [self.posiciones[t][posicion] for t in distintos if posicion in self.posiciones[t]]
+            total = 0.0
+            for anterior, siguiente in zip(presentes, presentes[1:]):
+                distancia = self._distancia_minima(anterior, siguiente)
+                if distancia <= ventana:
+                    total += (ventana - distancia + 1) / ventana
+            if total:
+                bonus[posicion] = total
+        return bonus
+
+    def puntuar(self, query: str, coincidencias: Optional[Dict[int, Set[str]]] = None,
+                permitidos: Optional[frozenset] = None, limite: Optional[float] = None) -> Dict[int, int]:
+        """
+        Scoring legacy (+5 palabra clave, +2 palabra en texto, +10 ley) sobre los candidatos.
+        Si se pasa `coincidencias`, se registran ahí los términos que puntuaron en cada artículo;
+        con `permitidos` solo se puntúan esas posiciones. Con `limite` corta
+        con PresupuestoAgotado si se pasa de ese instante.
+        """
+        query_lower = plegar(query)
+        scores: Dict[int, int] = {}
+
+        def sumar(posicion: int, puntos: int, termino: str):
+            if permitidos is not None and posicion not in permitidos:
+                return
+            scores[posicion] = scores.get(posicion, 0) + puntos
+            if coincidencias is not None:
+                coincidencias.setdefault(posicion, set()).add(termino)
+
+        # Score por palabras clave
+        for palabra in self.automata_palabras_clave.encontrar(query_lower):
+            _verificar_limite(limite)
+            for posicion in self.postings_palabras_clave[palabra]:
+                sumar(posicion, 5, palabra)
+
+        # Score por palabras en texto: las de 4+ letras de la consulta (antes del
+        # stemming, como el original), buscadas dentro de las palabras del texto
+        palabras_query = {palabra for palabra in tokenizar(query) if len(palabra) >= 4 and palabra not in STOPWORDS}
+        for palabra in palabras_query:
+            _verificar_limite(limite)
+            for posicion in self.articulos_con_fragmento(palabra):
+                sumar(posicion, 2, raiz(palabra))
+
+        # Score por ley mencionada (nombre oficial o alias)
+        for ley in self.resolutor.leyes_mencionadas(query):
+            _verificar_limite(limite)
+            for posicion in self.postings_leyes.get(ley, ()):
+                sumar(posicion, 10, plegar(ley))
+
+        return scores
+
+    def puntuar_bm25(self, query: str, coincidencias: Optional[Dict[int, Set[str]]] = None,
+                     permitidos: Optional[frozenset] = None, limite: Optional[float] = None) -> Dict[int, float]:
+        """Scoring BM25: solo recorre las posting lists de los términos de la consulta"""
+        scores: Dict[int, float] = {}
+        for termino in set(analizar_consulta(query)):
+            _verificar_limite(limite)
+            frecuencias = self.postings.get(termino)
+            if not frecuencias:
+                continue
+            idf = self.idf[termino]
+            for posicion, tf in frecuencias.items():
+                if permitidos is not None and posicion not in permitidos:
+                    continue
+                aporte = idf * tf * (BM25_K1 + 1) / (tf + self._normalizacion_bm25[posicion])
+                scores[posicion] = scores.get(posicion, 0.0) + aporte
+                if coincidencias is not None:
+                    coincidencias.setdefault(posicion, set()).add(termino)
+        return scores
+
+    def matriz_bm25(self):
+        """
+        Matriz dispersa CSR (términos × artículos) con el peso BM25 de cada
+        término en cada artículo. Se construye la primera vez que se pide.
+        """
+        if self._matriz_bm25 is None:
+            vocabulario = {termino: indice for indice, termino in enumerate(self.postings)}
+            self._vocabulario = vocabulario
+            filas, columnas, pesos = [], [], []
+            for termino, frecuencias in self.postings.items():
+                fila = vocabulario[termino]
+                idf = self.idf[termino]
+                for posicion, tf in frecuencias.items():
+                    filas.append(fila)
+                    columnas.append(posicion)
+                    pesos.append(idf * tf * (BM25_K1 + 1) / (tf + self._normalizacion_bm25[posicion]))
+            self._matriz_bm25 = sparse.csr_matrix(
+                (np.asarray(pesos, dtype=np.float64), (filas, columnas)),
+                shape=(len(vocabulario), len(self.articulos))
+            )
+        return self._matriz_bm25
+
+    def puntuar_lote_bm25(self, queries: List[str]):
+        """Scores BM25 de un lote de consultas con un único producto de matrices dispersas"""
+        matriz = self.matriz_bm25()
+        filas, columnas = [], []
+        for fila, query in enumerate(queries):
+            for termino in set(analizar_consulta(query)):
+                columna = self._vocabulario.get(termino)
+                if columna is not None:
+                    filas.append(fila)
+                    columnas.append(columna)
+        consultas = sparse.csr_matrix(
+            (np.ones(len(filas), dtype=np.float64), (filas, columnas)),
+            shape=(len(queries), matriz.shape[0])
+        )
+        return (consultas @ matriz).tocsr()
+
+    def puntuar_con_modo(self, query: str, modo: Optional[str] = None,
+                         coincidencias: Optional[Dict[int, Set[str]]] = None,
+                         permitidos: Optional[frozenset] = None, limite: Optional[float] = None) -> Dict[int, float]:
+        """Despacha al scorer elegido (por defecto COLEPA_RANKING)"""
+        modo = modo or MODO_RANKING
+        if modo == "bm25":
+            return self.puntuar_bm25(query, coincidencias, permitidos, limite)
+        if modo == "legacy":
+            return self.puntuar(query, coincidencias, permitidos, limite)
+        raise ValueError(f"Modo de ranking desconocido: {modo} (opciones: {', '.join(MODOS_RANKING)})")
+
+# ========== SCORING DE CONSULTAS ==========
+def _formatear_articulo(art: Dict) -> Dict:
+    return {
+        "pageContent": art['texto_completo'],
+        "numero_articulo": art['numero_articulo'],
+        "nombre_ley": art['nombre_ley'],
+        "titulo": art.get('titulo', '')
+    }
+
+def _puntuar_consulta(indice: IndiceInvertido, query: str, modo: str, corregir: bool,
+                      permitidos: Optional[frozenset], ventana: int, limite: Optional[float] = None):
+    """
+    Corrección, filtro por frases, scoring y bonus de proximidad; devuelve
+    (scores, coincidencias, correcciones). Con `limite` (time.monotonic())
+    corta con PresupuestoAgotado en cuanto se pasa.
+    """
+    correcciones: Dict[str, str] = {}
+    if corregir:
+        query, correcciones = indice.corrector.corregir_consulta(query)
+    coincidencias: Dict[int, Set[str]] = {}
+    
+    # Frases entre comillas: filtro por intersección de posting lists posicionales
+    frases = [f for f in re.findall(r'"([^"]+)"', query) if analizar_consulta(f)]
+    for frase in frases:
+        _verificar_limite(limite)
+        con_frase = indice.articulos_con_frase(frase)
+        permitidos = frozenset(con_frase if permitidos is None else con_frase & permitidos)
+        for posicion in permitidos:
+            coincidencias.setdefault(posicion, set()).add(f'"{plegar(frase)}"')
+        if not permitidos:
+            return {}, coincidencias, correcciones
+    
+    scores = indice.puntuar_con_modo(query, modo, coincidencias, permitidos, limite)
+    if ventana > 0 and scores:
+        peso = PESO_PROXIMIDAD.get(modo, 1.0)
+        terminos = list(analizar_consulta(query))
+        for posicion, bonus in indice.puntuar_proximidad(terminos, scores, ventana, limite).items():
+            scores[posicion] += peso * bonus
+    return scores, coincidencias, correcciones
+
+def _mejores_posiciones(scores: Dict[int, float], k: int, min_score: float) -> List[Tuple[float, int]]:
+    """(score, posición) de los k mejores con un heap acotado; a igual score, la primera posición"""
+    candidatos = ((score, -posicion) for posicion, score in scores.items() if score >= min_score)
+    return [(score, -posicion_negada) for score, posicion_negada in heapq.nlargest(k, candidatos)]
@@ -10,11 +10,13 @@ import json
 import logging
 import hashlib
 import threading
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any, Tuple
 
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, Response
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, Response, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
@@ -47,9 +49,21 @@ except ImportError as e:
     OPENAI_AVAILABLE = False
     openai_client = None
 
+# ========== ANALIZADOR DE TEXTO ==========
+from app.analizador import analizar, analizar_consulta, normalizar_texto
+from app.referencias import extraer_numeros_articulos, extraer_pedido_articulos
+from app.fragmentos import extraer_fragmentos, estimar_tokens
+
 # ========== IMPORTAR MOCK SEARCH ==========
 try:
-    from app.mock_search import buscar_articulo_relevante, buscar_articulo_por_numero
+    from app.mock_search import (
+        buscar_articulo_relevante, buscar_articulo_por_numero, buscar_articulos_por_numeros, detectar_ley_en_consulta,
+        buscar_articulos_por_numero, buscar_top_k, autocompletar, estructura_ley,
+        articulos_referenciados, fragmento_articulo, sugerencias_ortograficas,
+        estadisticas_cache_busqueda, activar_busqueda_distribuida, detener_busqueda_distribuida,
+        version_corpus
+    )
+    from app.indice_invertido import PresupuestoAgotado
     VECTOR_SEARCH_AVAILABLE = True
     logger.info("✅ Mock Search Engine cargado - 25 artículos disponibles")
 except ImportError as e:
@@ -59,8 +73,50 @@ except ImportError as e:
     def buscar_articulo_relevante(query):
         return None
     
-    def buscar_articulo_por_numero(numero):
+    def buscar_articulo_por_numero(numero, nombre_ley=None):
+        return None
+    
+    def buscar_articulos_por_numeros(numeros, nombre_ley=None):
+        return []
+    
+    def detectar_ley_en_consulta(query):
         return None
+    
+    def articulos_referenciados(nombre_ley, numero, limite=None, inversas=False):
+        return []
+    
+    def estadisticas_cache_busqueda():
+        return {}
+    
+    def activar_busqueda_distribuida():
+        return False
+    
+    def detener_busqueda_distribuida():
+        pass
+    
+    def version_corpus():
+        return ""
+
+# ========== BÚSQUEDA HÍBRIDA (LÉXICA + DENSA) ==========
+# COLEPA_BUSQUEDA=hibrida: ambos buscadores en paralelo y fusión RRF; "secuencial" = número y luego palabras clave
+# Solo el modo híbrido importa busqueda_hibrida (y con ella vector_search y el cliente de Qdrant)
+MODO_BUSQUEDA = os.getenv("COLEPA_BUSQUEDA", "secuencial")
+HYBRID_AVAILABLE = False
+if MODO_BUSQUEDA == "hibrida":
+    try:
+        from app.busqueda_hibrida import buscar_hibrido
+        HYBRID_AVAILABLE = True
+    except ImportError as e:
+        logger.warning(f"⚠️ Búsqueda híbrida no disponible: {e}")
+
+@lru_cache(maxsize=1024)
+def _embedding_consulta(texto: str) -> Tuple[float, ...]:
+    response = openai_client.embeddings.create(model="text-embedding-ada-002", input=texto)
+    return tuple(response.data[0].embedding)
+
+def crear_embedding_consulta(texto: str) -> List[float]:
+    """Embedding ada-002 de la consulta (mismo modelo que usaron los scripts poblar_*)"""
+    return list(_embedding_consulta(texto))
 
 # ========== CLASIFICADOR INTELIGENTE ==========
 try:
@@ -126,12 +182,7 @@ class CacheManager:
         logger.info(f"🚀 CacheManager inicializado - Límite: {max_memory_mb}MB")
     
     def _normalize_query(self, text: str) -> str:
-        if not text:
-            return ""
-        normalized = text.lower().strip()
-        normalized = re.sub(r'[^\w\s]', ' ', normalized)
-        normalized = re.sub(r'\s+', ' ', normalized)
-        return normalized.strip()
+        return normalizar_texto(text)
     
     def _generate_hash(self, *args) -> str:
         content = "|".join(str(arg) for arg in args if arg is not None)
@@ -165,7 +216,12 @@ class CacheManager:
         thread = threading.Thread(target=cleanup_worker, daemon=True)
         thread.start()
     
-    def get_respuesta(self, historial: List, contexto: Optional[Dict]) -> Optional[str]:
+    def _clave_respuesta(self, historial: List, contexto: Optional[Dict], texto_completo: bool) -> str:
+        """
+        La respuesta depende del texto que va al prompt: entra si fue el
+        artículo entero o los fragmentos y la versión del corpus (una
+        recarga puede cambiar el texto del mismo artículo)
+        """
         historial_text = " ".join([msg.content for msg in historial[-3:]])
         normalized = self._normalize_query(historial_text)
         
@@ -173,10 +229,15 @@ class CacheManager:
         if contexto:
             contexto_hash = self._generate_hash(
                 contexto.get('nombre_ley', ''),
-                contexto.get('numero_articulo', '')
+                contexto.get('numero_articulo', ''),
+                texto_completo,
+                version_corpus()
             )
         
-        cache_key = self._generate_hash(normalized, contexto_hash)
+        return self._generate_hash(normalized, contexto_hash)
+    
+    def get_respuesta(self, historial: List, contexto: Optional[Dict], texto_completo: bool = False) -> Optional[str]:
+        cache_key = self._clave_respuesta(historial, contexto, texto_completo)
         
         if cache_key in self.cache_respuestas:
             respuesta, timestamp = self.cache_respuestas[cache_key]
@@ -190,18 +251,8 @@ class CacheManager:
         self.misses_total += 1
         return None
     
-    def set_respuesta(self, historial: List, contexto: Optional[Dict], respuesta: str):
-        historial_text = " ".join([msg.content for msg in historial[-3:]])
-        normalized = self._normalize_query(historial_text)
-        
-        contexto_hash = ""
-        if contexto:
-            contexto_hash = self._generate_hash(
-                contexto.get('nombre_ley', ''),
-                contexto.get('numero_articulo', '')
-            )
-        
-        cache_key = self._generate_hash(normalized, contexto_hash)
+    def set_respuesta(self, historial: List, contexto: Optional[Dict], respuesta: str, texto_completo: bool = False):
+        cache_key = self._clave_respuesta(historial, contexto, texto_completo)
         self.cache_respuestas[cache_key] = (respuesta, time.time())
     
     def get_stats(self) -> Dict:
@@ -231,12 +282,17 @@ class MensajeChat(BaseModel):
 class ConsultaRequest(BaseModel):
     historial: List[MensajeChat] = Field(..., min_items=1, max_items=20)
     metadatos: Optional[Dict[str, Any]] = None
+    # Mandar a GPT el artículo entero en lugar de los fragmentos relevantes
+    texto_completo: bool = False
 
 class FuenteLegal(BaseModel):
     ley: str
     articulo_numero: str
     libro: Optional[str] = None
     titulo: Optional[str] = None
+    # Offsets (sobre el texto del artículo) de los fragmentos usados, para resaltarlos
+    fragmentos: Optional[List[Dict[str, int]]] = None
+    texto: Optional[str] = None
 
 class ConsultaResponse(BaseModel):
     respuesta: str
@@ -245,6 +301,45 @@ class ConsultaResponse(BaseModel):
     tiempo_procesamiento: Optional[float] = None
     es_respuesta_oficial: bool = True
 
+class HitBusqueda(BaseModel):
+    nombre_ley: str
+    numero_articulo: str
+    titulo: Optional[str] = None
+    texto: str
+    score: Optional[float] = None
+    terminos_coincidentes: List[str] = []
+    # Pedido por número en la consulta ("artículo 129"): va antes del ranking y sin score
+    por_numero: bool = False
+
+class BusquedaResponse(BaseModel):
+    query: str
+    ley: Optional[str] = None
+    hits: List[HitBusqueda]
+    offset: int
+    k: int
+    hay_mas: bool
+    # El presupuesto de tiempo se agotó antes del ranking: solo vienen los pedidos por número
+    parcial: bool = False
+    correcciones: Dict[str, str] = {}
+    # Posibles errores que no se corrigieron solos: se ofrecen al usuario
+    sugerencias: Dict[str, str] = {}
+    tiempo_ms: float
+
+class Completacion(BaseModel):
+    texto: str
+    # ley, titulo, palabra_clave, articulo (epígrafe) o numero
+    tipo: str
+    frecuencia: int
+    # Desde qué carácter de q reemplaza la completación
+    inicio: int
+    nombre_ley: Optional[str] = None
+    numero_articulo: Optional[str] = None
+
+class AutocompletadoResponse(BaseModel):
+    q: str
+    completaciones: List[Completacion]
+    tiempo_ms: float
+
 class StatusResponse(BaseModel):
     status: str
     timestamp: datetime
@@ -254,7 +349,15 @@ class StatusResponse(BaseModel):
 
 # ========== CONFIGURACIÓN ==========
 MAX_TOKENS_RESPUESTA = 400
-MAX_TOKENS_CONTEXTO = 600
+MAX_TOKENS_CONTEXTO = int(os.getenv("COLEPA_TOKENS_CONTEXTO", "600"))
+MAX_TOKENS_REFERENCIA = 150
+# Artículo pedido por número (o todos los de un rango, repartidos): va completo hasta este tope
+MAX_TOKENS_ARTICULO_PEDIDO = int(os.getenv("COLEPA_TOKENS_ARTICULO_PEDIDO", "2000"))
+
+# /api/buscar
+MAX_K_BUSQUEDA = 50
+MAX_OFFSET_BUSQUEDA = 500
+PRESUPUESTO_BUSQUEDA_MS = int(os.getenv("COLEPA_PRESUPUESTO_BUSQUEDA_MS", "1000"))
 
 INSTRUCCION_SISTEMA_NASDAQ = """Eres COLEPA, asistente jurídico especializado en legislación paraguaya.
 
@@ -281,7 +384,12 @@ metricas_sistema = {
 
 # ========== FUNCIONES AUXILIARES ==========
 def extraer_numero_articulo_mejorado(texto: str) -> Optional[int]:
-    """Extracción optimizada de números de artículo"""
+    """Extracción optimizada de números de artículo (el primero, si piden varios)"""
+    numeros = extraer_numeros_articulos(texto)
+    if numeros:
+        logger.info(f"✅ Artículo extraído: {numeros[0]}")
+        return numeros[0]
+    
     texto_lower = texto.lower().strip()
     
     patrones = [
@@ -305,17 +413,56 @@ def extraer_numero_articulo_mejorado(texto: str) -> Optional[int]:
     
     return None
 
-def validar_calidad_contexto(contexto: Optional[Dict], pregunta: str) -> tuple[bool, float]:
-    """Validación de relevancia del contexto"""
+def combinar_contextos(contextos: List[Dict]) -> Dict:
+    """Un solo contexto con varios artículos, en el orden pedido (con la ley si son de varias)"""
+    numeros = [str(c["numero_articulo"]) for c in contextos]
+    leyes = list(dict.fromkeys(c["nombre_ley"] for c in contextos))
+    if len(set(numeros)) == 1:
+        numero_articulo = numeros[0]
+    else:
+        numero_articulo = ", ".join(numeros[:-1]) + f" y {numeros[-1]}"
+    return {
+        "pageContent": "\n\n".join(f"{_encabezado_articulo(c, len(leyes) > 1)}: {c['pageContent']}" for c in contextos),
+        "numero_articulo": numero_articulo,
+        "nombre_ley": " / ".join(leyes),
+        "titulo": contextos[0].get("titulo", ""),
+        # Copias: el recorte agrega "fragmento" a cada artículo
+        "articulos": [dict(c) for c in contextos],
+    }
+
+def _encabezado_articulo(contexto: Dict, con_ley: bool) -> str:
+    if con_ley:
+        return f"{contexto['nombre_ley']}, Artículo {contexto['numero_articulo']}"
+    return f"Artículo {contexto['numero_articulo']}"
+
+def contexto_ambiguo(candidatos: List[Dict], numero: int) -> Dict:
+    """El número existe en varios códigos y la consulta no dice cuál: van todos y se pregunta"""
+    leyes = [c["nombre_ley"] for c in candidatos]
+    logger.info(f"⚠️ Art. {numero} ambiguo entre: {', '.join(leyes)}")
+    contexto = combinar_contextos(candidatos)
+    contexto["aviso"] = (f"El artículo {numero} existe en {', '.join(leyes[:-1])} y {leyes[-1]}; se incluyen todos. "
+                         f"Indica de qué código se trata para una respuesta precisa.")
+    return contexto
+
+# Marca de "número de la pregunta todavía no extraído"
+_SIN_EXTRAER = object()
+
+def validar_calidad_contexto(contexto: Optional[Dict], pregunta: str,
+                             numero_pregunta: Any = _SIN_EXTRAER) -> tuple[bool, float]:
+    """
+    Validación de relevancia del contexto. Si la búsqueda ya calculó la
+    "cobertura_consulta" del hit, se usa esa en lugar de volver a tokenizar
+    el artículo; `numero_pregunta` evita extraer otra vez el número.
+    """
     if not contexto or not contexto.get("pageContent"):
         return False, 0.0
     
     try:
-        texto_contexto = contexto.get("pageContent", "").lower()
-        pregunta_lower = pregunta.lower()
+        texto_contexto = contexto.get("pageContent", "")
         
         # Validación por número de artículo
-        numero_pregunta = extraer_numero_articulo_mejorado(pregunta)
+        if numero_pregunta is _SIN_EXTRAER:
+            numero_pregunta = extraer_numero_articulo_mejorado(pregunta)
         numero_contexto = contexto.get("numero_articulo")
         
         if numero_pregunta and numero_contexto:
@@ -323,15 +470,20 @@ def validar_calidad_contexto(contexto: Optional[Dict], pregunta: str) -> tuple[b
                 logger.info(f"✅ Match exacto - Art. {numero_pregunta}")
                 return True, 1.0
         
-        # Validación semántica
-        palabras_pregunta = set(re.findall(r'\b\w{4,}\b', pregunta_lower))
-        palabras_contexto = set(re.findall(r'\b\w{4,}\b', texto_contexto))
-        
-        if len(palabras_pregunta) == 0:
-            return False, 0.0
-        
-        interseccion = palabras_pregunta & palabras_contexto
-        score_basico = len(interseccion) / len(palabras_pregunta)
+        # Validación semántica (raíces sin tildes ni stopwords)
+        if "cobertura_consulta" in contexto:
+            score_basico = contexto["cobertura_consulta"]
+            if score_basico is None:
+                return False, 0.0
+        else:
+            palabras_pregunta = {t for t in analizar_consulta(pregunta) if not t.isdigit()}
+            palabras_contexto = set(analizar(texto_contexto))
+            
+            if len(palabras_pregunta) == 0:
+                return False, 0.0
+            
+            interseccion = palabras_pregunta & palabras_contexto
+            score_basico = len(interseccion) / len(palabras_pregunta)
         
         # Bonus por longitud
         if len(texto_contexto) > 100:
@@ -346,22 +498,141 @@ def validar_calidad_contexto(contexto: Optional[Dict], pregunta: str) -> tuple[b
         logger.error(f"❌ Error validando contexto: {e}")
         return False, 0.0
 
+# Artículos citados que se agregan al contexto (del grafo de referencias, sin otra búsqueda)
+MAX_REFERENCIAS_CONTEXTO = 3
+
+def agregar_referencias_contexto(contexto: Optional[Dict]) -> Optional[Dict]:
+    if contexto and not contexto.get("articulos") and VECTOR_SEARCH_AVAILABLE:
+        try:
+            referencias = articulos_referenciados(
+                contexto["nombre_ley"], contexto["numero_articulo"], limite=MAX_REFERENCIAS_CONTEXTO
+            )
+            if referencias:
+                contexto["referencias"] = referencias
+                logger.info(f"🔗 {len(referencias)} artículos citados agregados al contexto")
+        except Exception as e:
+            logger.error(f"❌ Error expandiendo referencias: {e}")
+    return contexto
+
+def _fragmento(contexto: Dict, pregunta: str, presupuesto: int, contiguo: bool = False) -> Dict:
+    fragmento = None
+    if VECTOR_SEARCH_AVAILABLE:
+        fragmento = fragmento_articulo(
+            contexto["nombre_ley"], contexto["numero_articulo"], contexto["pageContent"], pregunta, presupuesto, contiguo
+        )
+    return fragmento or extraer_fragmentos(
+        contexto["pageContent"], pregunta, presupuesto, nombre_ley=contexto.get("nombre_ley"), contiguo=contiguo
+    )
+
+def _fragmento_combinado(contexto: Dict, pregunta: str) -> Dict:
+    """
+    Cada artículo de un contexto combinado (todos pedidos por número) se
+    recorta por separado, desde su comienzo y con su propio presupuesto.
+    Los offsets quedan sobre el pageContent combinado.
+    """
+    articulos = contexto["articulos"]
+    presupuesto = max(MAX_TOKENS_ARTICULO_PEDIDO // len(articulos), MAX_TOKENS_REFERENCIA)
+    con_ley = len({c["nombre_ley"] for c in articulos}) > 1
+    partes, fragmentos, desplazamiento = [], [], 0
+    for c in articulos:
+        c["fragmento"] = _fragmento(c, pregunta, presupuesto, contiguo=True)
+        encabezado = f"{_encabezado_articulo(c, con_ley)}: "
+        partes.append(encabezado + c["fragmento"]["texto"])
+        desplazamiento += len(encabezado)
+        fragmentos.extend({"inicio": f["inicio"] + desplazamiento, "fin": f["fin"] + desplazamiento}
+                          for f in c["fragmento"]["fragmentos"])
+        desplazamiento += len(c["pageContent"]) + len("\n\n")
+    texto = "\n\n".join(partes)
+    return {
+        "texto": texto,
+        "fragmentos": fragmentos,
+        "tokens": estimar_tokens(texto),
+        "tokens_texto_completo": estimar_tokens(contexto["pageContent"]),
+        "recortado": any(c["fragmento"]["recortado"] for c in articulos),
+    }
+
+def recortar_contexto(contexto: Optional[Dict], pregunta: str) -> Optional[Dict]:
+    """
+    Agrega "fragmento": lo que va al prompt en lugar del texto completo (que
+    queda en pageContent). Un artículo pedido por número va desde su
+    comienzo con el presupuesto mayor; el resto, los segmentos de la consulta.
+    """
+    if not contexto or not contexto.get("pageContent"):
+        return contexto
+    try:
+        if contexto.get("articulos"):
+            contexto["fragmento"] = _fragmento_combinado(contexto, pregunta)
+        elif str(contexto.get("numero_articulo")) in {str(n) for n in extraer_numeros_articulos(pregunta)}:
+            contexto["fragmento"] = _fragmento(contexto, pregunta, MAX_TOKENS_ARTICULO_PEDIDO, contiguo=True)
+        else:
+            contexto["fragmento"] = _fragmento(contexto, pregunta, MAX_TOKENS_CONTEXTO)
+        if contexto["fragmento"]["recortado"]:
+            logger.info(f"✂️ Contexto recortado: {contexto['fragmento']['tokens_texto_completo']} → "
+                        f"{contexto['fragmento']['tokens']} tokens")
+        for ref in contexto.get("referencias", []):
+            ref["fragmento"] = _fragmento(ref, pregunta, MAX_TOKENS_REFERENCIA)
+    except Exception as e:
+        logger.error(f"❌ Error extrayendo fragmentos: {e}")
+    return contexto
+
 def buscar_con_manejo_errores(pregunta: str) -> Optional[Dict]:
     """Búsqueda robusta con mock database"""
     logger.info(f"🔍 Búsqueda: '{pregunta[:100]}...'")
     
     contexto_final = None
-    
-    # Método 1: Por número de artículo
+    # Se extrae una sola vez; la validación lo recibe en lugar de volver a extraerlo
     numero_articulo = extraer_numero_articulo_mejorado(pregunta)
+    
+    # Método 0: Rango o lista de artículos, en un solo lote (antes que la híbrida, que siempre responde)
+    numeros, pedidos = extraer_pedido_articulos(pregunta)
+    if len(numeros) > 1 and VECTOR_SEARCH_AVAILABLE:
+        try:
+            contextos = buscar_articulos_por_numeros(numeros, detectar_ley_en_consulta(pregunta))
+            if contextos:
+                logger.info(f"✅ Encontrados por lote - {len(contextos)}/{len(numeros)} artículos")
+                contexto = combinar_contextos(contextos)
+                if pedidos > len(numeros):
+                    logger.info(f"✂️ Pedido de {pedidos} artículos cortado a {len(numeros)}")
+                    contexto["aviso"] = (f"La consulta abarca {pedidos} artículos; se incluyen solo los "
+                                         f"{len(numeros)} primeros (del {numeros[0]} al {numeros[-1]}).")
+                return contexto
+        except Exception as e:
+            logger.error(f"❌ Error búsqueda por lote: {e}")
+    
+    if MODO_BUSQUEDA == "hibrida" and HYBRID_AVAILABLE and VECTOR_SEARCH_AVAILABLE:
+        try:
+            embedder = crear_embedding_consulta if OPENAI_AVAILABLE and openai_client else None
+            resultado = buscar_hibrido(pregunta, k=3, embedder=embedder, numero=numero_articulo)
+            for fuente, info in resultado["buscadores"].items():
+                logger.info(f"🔀 {fuente}: {info['candidatos']} candidatos, {info['en_top_k']} en top-k, "
+                            f"{info['latencia_ms']:.1f}ms")
+            for contexto in resultado["hits"]:
+                es_valido, score = validar_calidad_contexto(contexto, pregunta, numero_articulo)
+                if es_valido:
+                    logger.info(f"✅ Encontrado por búsqueda híbrida - Art. {contexto['numero_articulo']} "
+                                f"({', '.join(contexto['fuentes'])})")
+                    if numero_articulo and str(contexto["numero_articulo"]) == str(numero_articulo):
+                        mismo_numero = [hit for hit in resultado["hits"]
+                                        if str(hit["numero_articulo"]) == str(numero_articulo)]
+                        if len(mismo_numero) > 1 and not detectar_ley_en_consulta(pregunta):
+                            return contexto_ambiguo(mismo_numero, numero_articulo)
+                    return agregar_referencias_contexto(contexto)
+            logger.info("⚠️ La búsqueda híbrida no dio contextos válidos, se usa la secuencial")
+        except Exception as e:
+            logger.error(f"❌ Error búsqueda híbrida, se usa la secuencial: {e}")
+    
+    # Método 1: Por número de artículo (dentro de la ley mencionada, si la hay)
     if numero_articulo and VECTOR_SEARCH_AVAILABLE:
         try:
-            contexto = buscar_articulo_por_numero(numero_articulo)
+            nombre_ley = detectar_ley_en_consulta(pregunta)
+            contexto = buscar_articulo_por_numero(numero_articulo, nombre_ley)
+            if contexto and contexto.get("candidatos") and not nombre_ley:
+                return contexto_ambiguo(contexto["candidatos"], numero_articulo)
             if contexto:
-                es_valido, score = validar_calidad_contexto(contexto, pregunta)
+                es_valido, score = validar_calidad_contexto(contexto, pregunta, numero_articulo)
                 if es_valido:
                     contexto_final = contexto
-                    logger.info(f"✅ Encontrado por número - Art. {numero_articulo}")
+                    logger.info(f"✅ Encontrado por número - Art. {numero_articulo} ({contexto['nombre_ley']})")
         except Exception as e:
             logger.error(f"❌ Error búsqueda por número: {e}")
     
@@ -370,20 +641,21 @@ def buscar_con_manejo_errores(pregunta: str) -> Optional[Dict]:
         try:
             contexto = buscar_articulo_relevante(pregunta)
             if contexto:
-                es_valido, score = validar_calidad_contexto(contexto, pregunta)
+                es_valido, score = validar_calidad_contexto(contexto, pregunta, numero_articulo)
                 if es_valido:
                     contexto_final = contexto
                     logger.info(f"✅ Encontrado por semántica - Score: {score:.2f}")
         except Exception as e:
             logger.error(f"❌ Error búsqueda semántica: {e}")
     
-    return contexto_final
+    return agregar_referencias_contexto(contexto_final)
 
-def generar_respuesta_legal_nasdaq(historial: List[MensajeChat], contexto: Optional[Dict] = None) -> str:
+def generar_respuesta_legal_nasdaq(historial: List[MensajeChat], contexto: Optional[Dict] = None,
+                                   texto_completo: bool = False) -> str:
     """Generación de respuesta premium con GPT-4"""
     
     # Cache check
-    respuesta_cached = cache_manager.get_respuesta(historial, contexto)
+    respuesta_cached = cache_manager.get_respuesta(historial, contexto, texto_completo)
     if respuesta_cached:
         return respuesta_cached
     
@@ -398,7 +670,15 @@ def generar_respuesta_legal_nasdaq(historial: List[MensajeChat], contexto: Optio
         if contexto and contexto.get("pageContent"):
             ley = contexto.get('nombre_ley', 'Legislación paraguaya')
             articulo = contexto.get('numero_articulo', 'N/A')
-            contenido = contexto.get('pageContent', '')
+            contenido = contexto.get('fragmento', {}).get('texto') or contexto.get('pageContent', '')
+            citados = ""
+            if contexto.get('referencias'):
+                citados = "\n**Artículos que cita:**\n" + "\n".join(
+                    f"- {ref['nombre_ley']}, Artículo {ref['numero_articulo']}: "
+                    f"{ref.get('fragmento', {}).get('texto') or ref['pageContent']}"
+                    for ref in contexto['referencias']
+                ) + "\n"
+            aviso = f"\n**Aviso para el usuario:** {contexto['aviso']}\n" if contexto.get('aviso') else ""
             
             prompt = f"""**Consulta:** {pregunta_actual}
 
@@ -407,7 +687,7 @@ def generar_respuesta_legal_nasdaq(historial: List[MensajeChat], contexto: Optio
 
 **Texto legal:**
 {contenido}
-
+{citados}{aviso}
 Responde de forma profesional y accesible."""
             
             mensajes.append({"role": "user", "content": prompt})
@@ -428,7 +708,7 @@ Responde de forma profesional y accesible."""
             logger.info(f"💰 Tokens: Input {response.usage.prompt_tokens}, Output {response.usage.completion_tokens}")
         
         # Cache save
-        cache_manager.set_respuesta(historial, contexto, respuesta)
+        cache_manager.set_respuesta(historial, contexto, respuesta, texto_completo)
         
         return respuesta
         
@@ -442,6 +722,7 @@ def generar_respuesta_fallback(pregunta: str, contexto: Optional[Dict] = None) -
         ley = contexto.get('nombre_ley', 'Código')
         articulo = contexto.get('numero_articulo', 'N/A')
         contenido = contexto.get('pageContent', '')
+        aviso = f"\n**Aviso:** {contexto['aviso']}\n" if contexto.get('aviso') else ""
         
         return f"""**Consulta legal:** {pregunta}
 
@@ -450,7 +731,7 @@ def generar_respuesta_fallback(pregunta: str, contexto: Optional[Dict] = None) -
 
 **Texto legal:**
 {contenido}
-
+{aviso}
 **Nota:** Esta es la disposición legal relevante encontrada en nuestra base de datos. Para asesoramiento específico sobre tu caso, consulta con un abogado."""
     
     return f"""**Consulta:** {pregunta}
@@ -464,7 +745,7 @@ No se encontró un artículo específico para esta consulta en nuestra base de d
 
 Para consultas específicas, es recomendable contactar con un profesional del derecho."""
 
-def extraer_fuente_legal(contexto: Optional[Dict]) -> Optional[FuenteLegal]:
+def extraer_fuente_legal(contexto: Optional[Dict], incluir_texto: bool = False) -> Optional[FuenteLegal]:
     if not contexto:
         return None
     
@@ -472,7 +753,9 @@ def extraer_fuente_legal(contexto: Optional[Dict]) -> Optional[FuenteLegal]:
         ley=contexto.get("nombre_ley", "No especificada"),
         articulo_numero=str(contexto.get("numero_articulo", "N/A")),
         libro=contexto.get("libro"),
-        titulo=contexto.get("titulo")
+        titulo=contexto.get("titulo"),
+        fragmentos=contexto["fragmento"]["fragmentos"] if contexto.get("fragmento") else None,
+        texto=contexto.get("pageContent") if incluir_texto else None
     )
 
 def actualizar_metricas(tiene_contexto: bool, tiempo: float):
@@ -518,6 +801,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Búsqueda por shards (COLEPA_SHARDS > 0): los procesos se levantan al arrancar, no al importar
+@app.on_event("startup")
+async def iniciar_busqueda():
+    activar_busqueda_distribuida()
+
+@app.on_event("shutdown")
+async def detener_busqueda():
+    detener_busqueda_distribuida()
+
 # ========== ENDPOINTS ==========
 @app.get("/", response_model=StatusResponse)
 async def sistema_status():
@@ -567,7 +859,8 @@ async def obtener_metricas():
             "porcentaje_exito": round(exito, 1),
             "tiempo_promedio_ms": round(metricas_sistema["tiempo_promedio"] * 1000, 2)
         },
-        "cache": cache_manager.get_stats()
+        "cache": cache_manager.get_stats(),
+        "cache_busqueda": estadisticas_cache_busqueda()
     }
 
 @app.post("/api/consulta", response_model=ConsultaResponse)
@@ -607,13 +900,15 @@ async def procesar_consulta_legal_nasdaq(request: ConsultaRequest):
         contexto = None
         if VECTOR_SEARCH_AVAILABLE:
             contexto = buscar_con_manejo_errores(pregunta_actual)
+            if not request.texto_completo:
+                contexto = recortar_contexto(contexto, pregunta_actual)
         
         # Generar respuesta
-        respuesta = generar_respuesta_legal_nasdaq(historial_limitado, contexto)
+        respuesta = generar_respuesta_legal_nasdaq(historial_limitado, contexto, request.texto_completo)
         
         # Preparar response
         tiempo = time.time() - start_time
-        fuente = extraer_fuente_legal(contexto)
+        fuente = extraer_fuente_legal(contexto, request.texto_completo)
         
         actualizar_metricas(contexto is not None, tiempo)
         
@@ -622,7 +917,7 @@ async def procesar_consulta_legal_nasdaq(request: ConsultaRequest):
         return ConsultaResponse(
             respuesta=respuesta,
             fuente=fuente,
-            recomendaciones=None,
+            recomendaciones=[contexto["aviso"]] if contexto and contexto.get("aviso") else None,
             tiempo_procesamiento=round(tiempo, 2),
             es_respuesta_oficial=True
         )
@@ -640,6 +935,136 @@ async def procesar_consulta_legal_nasdaq(request: ConsultaRequest):
             }
         )
 
+def resolver_ley(ley: str) -> Optional[str]:
+    """Acepta el nombre, un alias o solo la materia ("penal" -> "código penal")"""
+    return detectar_ley_en_consulta(ley) or detectar_ley_en_consulta(f"código {ley}")
+
+def _hit_busqueda(hit: Dict, por_numero: bool = False) -> HitBusqueda:
+    return HitBusqueda(
+        nombre_ley=hit["nombre_ley"],
+        numero_articulo=str(hit["numero_articulo"]),
+        titulo=hit.get("titulo"),
+        texto=hit["pageContent"],
+        score=hit.get("score"),
+        terminos_coincidentes=hit.get("terminos_coincidentes", []),
+        por_numero=por_numero
+    )
+
+def _buscar_con_presupuesto(q: str, nombre_ley: Optional[str], cantidad: int, limite: float):
+    """
+    Todo el trabajo de /api/buscar (pedidos por número, ranking y
+    sugerencias), pensado para correr en un hilo. El ranking revisa `limite`
+    y corta si se pasa: el hilo termina ahí y no sigue gastando CPU.
+    Devuelve (hits por número, ranking, parcial, sugerencias).
+    """
+    # Pedidos por número: una consulta al índice por número, en todas las leyes si no se indicó una
+    ley_numeros = nombre_ley or detectar_ley_en_consulta(q)
+    hits = [hit for numero in extraer_numeros_articulos(q)
+            for hit in buscar_articulos_por_numero(numero, ley_numeros)]
+    try:
+        ranking = buscar_top_k(q, cantidad + len(hits), ley=nombre_ley, limite=limite)
+    except PresupuestoAgotado:
+        return hits, [], True, {}
+    return hits, ranking, False, sugerencias_ortograficas(q)
+
+@app.get("/api/buscar", response_model=BusquedaResponse)
+async def buscar_articulos(
+    q: str = Query(..., min_length=1, max_length=500),
+    k: int = Query(10, ge=1, le=MAX_K_BUSQUEDA),
+    offset: int = Query(0, ge=0, le=MAX_OFFSET_BUSQUEDA),
+    ley: Optional[str] = Query(None, max_length=100, description="Nombre o alias del código (\"penal\", \"CPP\")"),
+    presupuesto_ms: int = Query(PRESUPUESTO_BUSQUEDA_MS, ge=10, le=10000)
+):
+    """
+    Artículos rankeados para la consulta, sin clasificador ni GPT. Los
+    artículos pedidos por número van primero; si el ranking no termina
+    dentro de `presupuesto_ms`, se responde solo con esos y parcial=true.
+    """
+    start_time = time.time()
+    limite = time.monotonic() + presupuesto_ms / 1000
+    if not VECTOR_SEARCH_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Motor de búsqueda no disponible")
+    
+    nombre_ley = None
+    if ley:
+        nombre_ley = resolver_ley(ley)
+        if not nombre_ley:
+            raise HTTPException(status_code=400, detail=f"Ley desconocida: {ley}")
+    
+    # Toda la búsqueda en un hilo, fuera del event loop; el ranking corta solo al agotar el presupuesto
+    por_numero, ranking, parcial, sugerencias = await run_in_threadpool(
+        _buscar_con_presupuesto, q, nombre_ley, offset + k + 1, limite
+    )
+    if parcial:
+        logger.warning(f"⏱️ /api/buscar: presupuesto de {presupuesto_ms}ms agotado antes del ranking")
+    
+    hits = [(hit, True) for hit in por_numero]
+    vistos = {(hit["nombre_ley"], str(hit["numero_articulo"])) for hit, _ in hits}
+    hits += [(hit, False) for hit in ranking if (hit["nombre_ley"], str(hit["numero_articulo"])) not in vistos]
+    pagina = hits[offset:offset + k]
+    
+    tiempo_ms = (time.time() - start_time) * 1000
+    logger.info(f"🔎 /api/buscar '{q[:50]}': {len(pagina)} hits en {tiempo_ms:.1f}ms")
+    
+    return BusquedaResponse(
+        query=q,
+        ley=nombre_ley,
+        hits=[_hit_busqueda(hit, por_numero) for hit, por_numero in pagina],
+        offset=offset,
+        k=k,
+        hay_mas=len(hits) > offset + k,
+        parcial=parcial,
+        correcciones=ranking[0].get("correcciones", {}) if ranking else {},
+        sugerencias=sugerencias,
+        tiempo_ms=round(tiempo_ms, 2)
+    )
+
+@app.get("/api/autocompletar", response_model=AutocompletadoResponse)
+async def autocompletar_consulta(
+    q: str = Query(..., min_length=1, max_length=200),
+    n: int = Query(8, ge=1, le=10)
+):
+    """Completaciones por prefijo para el cuadro de chat: trie en memoria, sin búsqueda ni GPT"""
+    start_time = time.time()
+    if not VECTOR_SEARCH_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Motor de búsqueda no disponible")
+    
+    completaciones = autocompletar(q, n)
+    return AutocompletadoResponse(
+        q=q,
+        completaciones=[Completacion(**c) for c in completaciones],
+        tiempo_ms=round((time.time() - start_time) * 1000, 3)
+    )
+
+# Los nodos cambian solo cuando se recarga el corpus (COLEPA_RECARGA_SEGUNDOS)
+CACHE_CONTROL_ESTRUCTURA = "public, max-age=60"
+
+@app.get("/api/codigos/{ley}/estructura")
+async def estructura_codigo(
+    ley: str,
+    request: Request,
+    nodo: str = Query("", max_length=100, description="Id del nodo a expandir (\"1.3\"); vacío = raíz")
+):
+    """
+    Un nivel del árbol libro → título → capítulo → sección: el nodo, sus hijos
+    (sin expandir) y los artículos que cuelgan de él. ETag fuerte por nodo;
+    con If-None-Match vigente responde 304 sin cuerpo.
+    """
+    if not VECTOR_SEARCH_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Motor de búsqueda no disponible")
+    
+    nombre_ley = resolver_ley(ley)
+    resultado = estructura_ley(nombre_ley, nodo) if nombre_ley else None
+    if resultado is None:
+        raise HTTPException(status_code=404, detail=f"No existe el nodo '{nodo}' en {nombre_ley or ley}")
+    
+    cuerpo, etag = resultado
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL_ESTRUCTURA, "Access-Control-Expose-Headers": "ETag"}
+    etiquetas = [e.strip().removeprefix("W/") for e in request.headers.get("if-none-match", "").split(",")]
+    if etag in etiquetas or "*" in etiquetas:
+        return Response(status_code=304, headers=headers)
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
+
 # ========== ERROR HANDLERS ==========
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -2,86 +2,513 @@
 import json
 import os
 import re
+import time
+import hashlib
+import logging
+import mmap
+import threading
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Callable, Dict, List, Set, Tuple
 
-# Cargar base de datos
+from app.analizador import analizar_consulta, plegar
+from app.cache_busqueda import CacheLRU
+from app.corpus_binario import abrir_corpus
+from app.referencias import GrafoReferencias, ruta_grafo
+from app.autocompletado import Autocompletado
+from app.estructura import EstructuraCodigos
+# El índice y el scoring viven en indice_invertido.py (los shards los importan sin cargar el corpus)
+from app.indice_invertido import (
+    IndiceInvertido, NUMPY_AVAILABLE, MODO_RANKING, VENTANA_PROXIMIDAD, PESO_PROXIMIDAD,
+    _formatear_articulo, _puntuar_consulta, _mejores_posiciones,
+)
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Base de datos
 CURRENT_DIR = Path(__file__).parent
 DB_PATH = CURRENT_DIR / "legal_database.json"
+# Ruta alternativa del corpus: un .json o un binario .colepa (ver corpus_binario.py)
+CORPUS_PATH = Path(os.getenv("COLEPA_CORPUS", str(DB_PATH)))
+
+# Cada cuántos segundos se revisa si legal_database.json cambió (0 = sin recarga)
+INTERVALO_RECARGA = int(os.getenv("COLEPA_RECARGA_SEGUNDOS", "30"))
+# Entradas del cache LRU de resultados (0 = sin cache)
+CAPACIDAD_CACHE_BUSQUEDA = int(os.getenv("COLEPA_CACHE_BUSQUEDA", "2048"))
+# Procesos de búsqueda por shards de leyes (0 = todo en el proceso actual)
+NUM_SHARDS = int(os.getenv("COLEPA_SHARDS", "0"))
+
+# ========== GESTOR DE CORPUS (RECARGA EN CALIENTE) ==========
+class SnapshotCorpus:
+    """Versión inmutable del corpus: base cargada + índice ya construido"""
+
+    def __init__(self, legal_db: Dict, indice: IndiceInvertido, version: str, mtime: float,
+                 autocompletado: Optional[Autocompletado] = None, estructura: Optional[EstructuraCodigos] = None):
+        self.legal_db = legal_db
+        self.articulos = indice.articulos
+        self.indice = indice
+        self.autocompletado = autocompletado
+        self.estructura = estructura
+        self.version = version
+        self.mtime = mtime
+
+
+class GestorCorpus:
+    """
+    Vigila el archivo del corpus (mtime + hash) y, si cambió, construye los
+    índices nuevos en segundo plano y los publica con un único cambio de
+    referencia. Cada búsqueda toma el snapshot una vez al empezar, así que
+    las consultas en curso terminan con el corpus anterior y nadie ve un
+    índice a medio construir.
+    """
+
+    def __init__(self, ruta: Path, intervalo: int = 30):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.recargas = 0
+        self._lock_recarga = threading.Lock()
+        self.snapshot = self._construir()
+        self._mtime_visto = self.snapshot.mtime
+        self._hilo = None
+        # Funciones a llamar (en el hilo de recarga) después de publicar un snapshot nuevo
+        self.al_recargar: List[Callable[[SnapshotCorpus], None]] = []
+
+    def _construir(self) -> SnapshotCorpus:
+        # Un solo open: el hash y el corpus salen de los mismos bytes aunque
+        # el archivo se reemplace en el medio (el binario se mapea, no se copia)
+        binario = self.ruta.suffix == ".colepa"
+        with open(self.ruta, 'rb') as f:
+            mtime = os.fstat(f.fileno()).st_mtime
+            datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if binario else f.read()
+        version = hashlib.sha256(datos).hexdigest()[:12]
+        legal_db = abrir_corpus(self.ruta, datos) if binario else json.loads(datos)
+        # Grafo de referencias precalculado (generar_grafo_referencias.py); si no está, se extrae del texto
+        grafo = None
+        if ruta_grafo(self.ruta).exists():
+            try:
+                grafo = GrafoReferencias.cargar(ruta_grafo(self.ruta))
+            except Exception as e:
+                logger.error(f"❌ Error cargando {ruta_grafo(self.ruta).name}: {e}")
+        indice = IndiceInvertido(legal_db['articulos'], grafo)
+        return SnapshotCorpus(legal_db, indice, version, mtime, Autocompletado(indice), EstructuraCodigos(indice))
+
+    def recargar(self, forzar: bool = False) -> bool:
+        """Reconstruye y publica el corpus si el archivo cambió; True si hubo cambio"""
+        with self._lock_recarga:
+            actual = self.snapshot
+            try:
+                if not forzar and os.path.getmtime(self.ruta) == self._mtime_visto:
+                    return False
+                inicio = time.time()
+                nuevo = self._construir()
+                self._mtime_visto = nuevo.mtime
+                if not forzar and nuevo.version == actual.version:
+                    return False
+                if NUMPY_AVAILABLE and actual.indice._matriz_bm25 is not None:
+                    nuevo.indice.matriz_bm25()
+            except Exception as e:
+                logger.error(f"❌ Error recargando {self.ruta.name}: {e}")
+                return False
+
+            self.snapshot = nuevo
+            self.recargas += 1
+            logger.info(
+                f"🔄 Corpus recargado: {len(nuevo.articulos)} artículos, "
+                f"versión {nuevo.version} ({time.time() - inicio:.2f}s)"
+            )
+            for callback in self.al_recargar:
+                try:
+                    callback(nuevo)
+                except Exception as e:
+                    logger.error(f"❌ Error post-recarga: {e}")
+            return True
+
+    def iniciar_vigilancia(self):
+        if self.intervalo <= 0 or self._hilo is not None:
+            return
+
+        def vigilar():
+            while True:
+                time.sleep(self.intervalo)
+                self.recargar()
+
+        self._hilo = threading.Thread(target=vigilar, daemon=True)
+        self._hilo.start()
+
+
+GESTOR_CORPUS = GestorCorpus(CORPUS_PATH, INTERVALO_RECARGA)
+GESTOR_CORPUS.iniciar_vigilancia()
+
+# Vista del corpus al importar (las búsquedas usan siempre GESTOR_CORPUS.snapshot)
+LEGAL_DB = GESTOR_CORPUS.snapshot.legal_db
+ARTICULOS = GESTOR_CORPUS.snapshot.articulos
+INDICE = GESTOR_CORPUS.snapshot.indice
+
+def version_corpus() -> str:
+    """Hash corto del legal_database.json publicado actualmente"""
+    return GESTOR_CORPUS.snapshot.version
+
+# ========== CACHE DE RESULTADOS ==========
+# Claves: consulta normalizada + versión del corpus, así una recarga invalida
+# todo sin recorrer el cache (las entradas viejas salen por LRU)
+CACHE_BUSQUEDA = CacheLRU(CAPACIDAD_CACHE_BUSQUEDA)
+
+def _clave_consulta(query: str) -> str:
+    """Minúsculas, sin tildes y con espacios colapsados (conserva comillas y puntos)"""
+    return " ".join(plegar(query).split())
+
+def _copia(resultado: Optional[Dict]) -> Optional[Dict]:
+    """Copia de una entrada del cache, con sus "candidatos" también copiados: quien la recibe puede modificarla"""
+    if resultado is None:
+        return None
+    copia = dict(resultado)
+    if "candidatos" in copia:
+        copia["candidatos"] = [dict(candidato) for candidato in copia["candidatos"]]
+    return copia
+
+def estadisticas_cache_busqueda() -> Dict:
+    return CACHE_BUSQUEDA.get_stats()
+
+def _agregar_cobertura(indice: IndiceInvertido, hits: List[Dict], query: str) -> List[Dict]:
+    """Agrega a cada hit "cobertura_consulta" (ver IndiceInvertido.cobertura), que lee validar_calidad_contexto"""
+    for hit in hits:
+        posicion = indice.por_ley_numero.get((hit["nombre_ley"], str(hit["numero_articulo"])))
+        if posicion is not None:
+            hit["cobertura_consulta"] = indice.cobertura(posicion, query)
+    return hits
+
+def detectar_ley_en_consulta(query: str) -> Optional[str]:
+    """Resuelve qué código menciona la consulta ("CPP", "el penal", "código civil"...)"""
+    return GESTOR_CORPUS.snapshot.indice.detectar_ley(query)
+
+def buscar_articulos_por_numero(numero: int, nombre_ley: Optional[str] = None) -> List[Dict]:
+    """Todos los artículos con ese número (uno por ley), en orden del corpus"""
+    return _articulos_por_numero(GESTOR_CORPUS.snapshot.indice, numero, nombre_ley)
 
-with open(DB_PATH, 'r', encoding='utf-8') as f:
-    LEGAL_DB = json.load(f)
+def _articulos_por_numero(indice: IndiceInvertido, numero: int, nombre_ley: Optional[str]) -> List[Dict]:
+    return [_formatear_articulo(indice.articulos[pos]) for pos in indice.posiciones_por_numero(numero, nombre_ley)]
 
-ARTICULOS = LEGAL_DB['articulos']
+def articulos_referenciados(nombre_ley: str, numero, limite: Optional[int] = None,
+                             inversas: bool = False) -> List[Dict]:
+    """
+    Artículos que cita el artículo dado (o, con inversas=True, los que lo
+    citan), sin otra búsqueda: una consulta al grafo, O(grado).
+    """
+    indice = GESTOR_CORPUS.snapshot.indice
+    posicion = indice.por_ley_numero.get((indice.nombres_leyes.get(plegar(nombre_ley)), str(numero)))
+    if posicion is None:
+        return []
+    vecinos = (indice.citado_por if inversas else indice.referencias).get(posicion, ())
+    return [_formatear_articulo(indice.articulos[p]) for p in vecinos[:limite]]
 
-def buscar_articulo_por_numero(numero: int) -> Optional[Dict]:
-    """Busca artículo por número exacto"""
-    numero_str = str(numero)
+def fragmento_articulo(nombre_ley: str, numero, texto: str, query: str, presupuesto: int,
+                       contiguo: bool = False) -> Optional[Dict]:
+    """
+    Fragmentos del artículo para la consulta con los cortes precalculados del
+    índice. None si el artículo no está en el corpus o si `texto` no es su
+    texto (p. ej. un payload de Qdrant): los offsets no servirían.
+    """
+    indice = GESTOR_CORPUS.snapshot.indice
+    posicion = indice.por_ley_numero.get((nombre_ley, str(numero)))
+    if posicion is None or indice.articulos[posicion]['texto_completo'] != texto:
+        return None
+    return indice.fragmento(posicion, query, presupuesto, contiguo)
+
+def autocompletar(texto: str, n: int = 8) -> List[Dict]:
+    """Completaciones por prefijo (ver autocompletado.py): no puntúa texto ni recorre el corpus"""
+    snapshot = GESTOR_CORPUS.snapshot
+    if snapshot.autocompletado is None:
+        return []
+    return snapshot.autocompletado.completar(texto, n, snapshot.indice.resolutor)
+
+def estructura_ley(nombre_ley: str, id_nodo: str = "") -> Optional[Tuple[bytes, str]]:
+    """Nodo del árbol libro/título/capítulo/sección ya serializado y su ETag (ver estructura.py)"""
+    snapshot = GESTOR_CORPUS.snapshot
+    if snapshot.estructura is None:
+        return None
+    return snapshot.estructura.nodo(nombre_ley, id_nodo)
+
+def sugerencias_ortograficas(query: str) -> Dict[str, str]:
+    """{palabra: sugerencia} para un "¿quisiste decir?": las que el corrector no aplica solo"""
+    return GESTOR_CORPUS.snapshot.indice.corrector.revisar_consulta(query)[1]
+
+def buscar_articulos_por_numeros(numeros: List[int], nombre_ley: Optional[str] = None) -> List[Dict]:
+    """
+    Lote de artículos pedidos por número ("arts. 229, 230 y 231"), en el orden
+    pedido, con un solo snapshot del índice. Sin ley, por cada número se toma
+    el primero del corpus (como buscar_articulo_por_numero); los números que
+    no existen se omiten.
+    """
+    indice = GESTOR_CORPUS.snapshot.indice
+    hits = []
+    for numero in numeros:
+        posiciones = indice.posiciones_por_numero(numero, nombre_ley)
+        if posiciones:
+            hits.append(_formatear_articulo(indice.articulos[posiciones[0]]))
+    return hits
+
+def buscar_articulo_por_numero(numero: int, nombre_ley: Optional[str] = None) -> Optional[Dict]:
+    """
+    Busca artículo por número exacto, opcionalmente dentro de una ley.
+    Si el número existe en varias leyes se devuelve el primero con la
+    lista completa en "candidatos". Pasa por el cache LRU de resultados.
+    """
+    return _copia(_articulo_por_numero(GESTOR_CORPUS.snapshot, numero, nombre_ley))
+
+def _articulo_por_numero(snapshot: SnapshotCorpus, numero: int, nombre_ley: Optional[str]) -> Optional[Dict]:
+    """buscar_articulo_por_numero sobre un snapshot ya tomado (resultado del cache, sin copiar)"""
+    clave = ("numero", snapshot.version, str(numero), plegar(nombre_ley or ""))
+    return CACHE_BUSQUEDA.obtener_o_calcular(
+        clave, lambda: _buscar_articulo_por_numero(snapshot.indice, numero, nombre_ley)
+    )
+
+def _buscar_articulo_por_numero(indice: IndiceInvertido, numero: int,
+                                nombre_ley: Optional[str] = None) -> Optional[Dict]:
+    candidatos = _articulos_por_numero(indice, numero, nombre_ley)
+    if not candidatos:
+        return None
     
-    for art in ARTICULOS:
-        if str(art['numero_articulo']) == numero_str:
-            return {
-                "pageContent": art['texto_completo'],
-                "numero_articulo": art['numero_articulo'],
-                "nombre_ley": art['nombre_ley'],
-                "titulo": art.get('titulo', '')
-            }
-    return None
-
-def buscar_por_palabras_clave(query: str) -> Optional[Dict]:
-    """Búsqueda semántica simple por palabras clave"""
-    query_lower = query.lower()
+    resultado = dict(candidatos[0])
+    if len(candidatos) > 1:
+        resultado["candidatos"] = candidatos
+    return resultado
+
+def _seleccionar_top_k(indice: IndiceInvertido, scores: Dict[int, float], coincidencias: Dict[int, Set[str]],
+                       correcciones: Dict[str, str], k: int, min_score: float) -> List[Dict]:
+    """Los k mejores hits ordenados por score con un heap acotado"""
+    hits = []
+    for score, posicion in _mejores_posiciones(scores, k, min_score):
+        hit = _formatear_articulo(indice.articulos[posicion])
+        hit["score"] = score
+        hit["terminos_coincidentes"] = sorted(coincidencias.get(posicion, ()))
+        hit["correcciones"] = correcciones
+        hits.append(hit)
+    return hits
+
+def _opciones_modo(modo: Optional[str], corregir: Optional[bool], ventana: Optional[int]) -> Tuple[str, bool, int]:
+    """
+    Modo, corrección y ventana efectivos. "legacy" es el scoring original:
+    la corrección ortográfica y el bonus de proximidad solo si se piden.
+    En "bm25" vienen activados salvo que se apaguen.
+    """
+    modo = modo or MODO_RANKING
+    if modo == "legacy":
+        return modo, bool(corregir), ventana or 0
+    return modo, corregir is None or corregir, VENTANA_PROXIMIDAD if ventana is None else ventana
+
+def buscar_top_k(query: str, k: int = 5, min_score: float = 0.0, modo: Optional[str] = None,
+                 corregir: Optional[bool] = None, ley: Optional[str] = None,
+                 ventana: Optional[int] = None, filtros: Optional[Dict[str, str]] = None,
+                 limite: Optional[float] = None) -> List[Dict]:
+    """
+    Los k artículos mejor puntuados, ordenados por score (a igual score, el
+    primero del corpus). Usa un heap acotado a k en lugar de ordenar todos
+    los candidatos. Cada hit incluye "score", "terminos_coincidentes", las
+    "correcciones" ortográficas aplicadas a la consulta y la
+    "cobertura_consulta" que usa la validación del contexto. Con `ley` o
+    `filtros` (ley/libro/titulo/capitulo/seccion) solo se puntúan esos
+    artículos; las frases entre comillas deben aparecer tal cual y los
+    términos cercanos (a `ventana` palabras o menos) suman un bonus de proximidad.
+    `corregir` y `ventana` sin indicar dependen del modo (ver _opciones_modo).
+    Con `limite` (un instante de time.monotonic()) el ranking se corta con
+    PresupuestoAgotado apenas lo pasa, también en los shards.
+    """
+    modo, corregir, ventana = _opciones_modo(modo, corregir, ventana)
+    return _buscar_top_k(GESTOR_CORPUS.snapshot, query, k, min_score, modo, corregir, ley, ventana, filtros, limite)
+
+def _buscar_top_k(snapshot: SnapshotCorpus, query: str, k: int, min_score: float, modo: Optional[str],
+                  corregir: bool, ley: Optional[str], ventana: int, filtros: Optional[Dict[str, str]],
+                  limite: Optional[float] = None) -> List[Dict]:
+    if k <= 0:
+        return []
     
-    # Extraer palabras importantes de la query
-    palabras_query = set(re.findall(r'\b\w{4,}\b', query_lower))  # Palabras de 4+ letras
+    indice = snapshot.indice
+    consulta_original = query
+    filtros = dict(filtros or {})
+    if ley:
+        filtros["ley"] = ley
     
-    # Scoring de artículos
-    scores = []
-    for art in ARTICULOS:
-        score = 0
-        
-        # Score por palabras clave
-        for palabra in art.get('palabras_clave', []):
-            if palabra.lower() in query_lower:
-                score += 5
-        
-        # Score por palabras en texto
-        texto_lower = art['texto_completo'].lower()
-        for palabra in palabras_query:
-            if palabra in texto_lower:
-                score += 2
-        
-        # Score por nombre de ley
-        if art['nombre_ley'].lower() in query_lower:
-            score += 10
-        
-        if score > 0:
-            scores.append((score, art))
+    # Modo shards: los procesos puntúan en paralelo y acá se mezclan los top-k
+    buscador = _BUSCADOR_DISTRIBUIDO
+    if buscador is not None and buscador.version == snapshot.version:
+        correcciones: Dict[str, str] = {}
+        if corregir:
+            query, correcciones = indice.corrector.corregir_consulta(query)
+        hits = buscador.buscar_top_k(query, k, min_score, modo or MODO_RANKING, ventana, filtros, limite)
+        if hits is not None:
+            for hit in hits:
+                hit["correcciones"] = correcciones
+            return _agregar_cobertura(indice, hits, consulta_original)
     
-    # Retornar el mejor match
-    if scores:
-        scores.sort(reverse=True, key=lambda x: x[0])
-        best_art = scores[0][1]
-        
-        return {
-            "pageContent": best_art['texto_completo'],
-            "numero_articulo": best_art['numero_articulo'],
-            "nombre_ley": best_art['nombre_ley'],
-            "titulo": best_art.get('titulo', '')
-        }
+    permitidos = indice.filtrar(filtros)
+    if permitidos is not None and not permitidos:
+        return []
     
-    return None
+    scores, coincidencias, correcciones = _puntuar_consulta(
+        indice, query, modo or MODO_RANKING, corregir, permitidos, ventana, limite
+    )
+    hits = _seleccionar_top_k(indice, scores, coincidencias, correcciones, k, min_score)
+    return _agregar_cobertura(indice, hits, consulta_original)
+
+# ========== BÚSQUEDA POR SHARDS ==========
+_BUSCADOR_DISTRIBUIDO = None
+
+def activar_busqueda_distribuida(num_shards: int = NUM_SHARDS) -> bool:
+    """
+    Reparte el corpus por ley entre `num_shards` procesos persistentes
+    (ver busqueda_distribuida.py). Si no se puede, la búsqueda sigue en
+    este proceso. Se llama al arrancar el servidor, no al importar.
+    """
+    global _BUSCADOR_DISTRIBUIDO
+    if num_shards <= 0 or _BUSCADOR_DISTRIBUIDO is not None:
+        return _BUSCADOR_DISTRIBUIDO is not None
+    
+    from app.busqueda_distribuida import BuscadorDistribuido
+    
+    try:
+        buscador = BuscadorDistribuido(num_shards)
+        buscador.iniciar(GESTOR_CORPUS.snapshot)
+    except Exception as e:
+        logger.error(f"❌ Búsqueda por shards no disponible, se usa un solo proceso: {e}")
+        return False
+    
+    _BUSCADOR_DISTRIBUIDO = buscador
+    GESTOR_CORPUS.al_recargar.append(buscador.iniciar)
+    return True
+
+def detener_busqueda_distribuida():
+    global _BUSCADOR_DISTRIBUIDO
+    buscador, _BUSCADOR_DISTRIBUIDO = _BUSCADOR_DISTRIBUIDO, None
+    if buscador is not None:
+        if buscador.iniciar in GESTOR_CORPUS.al_recargar:
+            GESTOR_CORPUS.al_recargar.remove(buscador.iniciar)
+        buscador.cerrar()
+
+def buscar_facetado(query: str, k: int = 10, filtros: Optional[Dict[str, str]] = None,
+                    min_score: float = 0.0, modo: Optional[str] = None, corregir: Optional[bool] = None,
+                    ventana: Optional[int] = None) -> Dict:
+    """
+    Como buscar_top_k, pero además devuelve cuántos resultados hay en cada
+    valor de faceta (p. ej. {"libro": {"II": 14}}) y el total de coincidencias.
+    El filtro se aplica como intersección de conjuntos antes de puntuar.
+    """
+    modo, corregir, ventana = _opciones_modo(modo, corregir, ventana)
+    indice = GESTOR_CORPUS.snapshot.indice
+    permitidos = indice.filtrar(filtros)
+    if permitidos is not None and not permitidos:
+        return {"hits": [], "total": 0, "facetas": {}}
+    
+    scores, coincidencias, correcciones = _puntuar_consulta(
+        indice, query, modo, corregir, permitidos, ventana
+    )
+    coincidentes = [posicion for posicion, score in scores.items() if score >= min_score]
+    return {
+        "hits": _seleccionar_top_k(indice, scores, coincidencias, correcciones, max(k, 0), min_score),
+        "total": len(coincidentes),
+        "facetas": indice.contar_facetas(coincidentes),
+    }
+
+def buscar_por_palabras_clave(query: str, modo: Optional[str] = None, corregir: Optional[bool] = None,
+                              ley: Optional[str] = None, ventana: Optional[int] = None) -> Optional[Dict]:
+    """Búsqueda por palabras clave con el ranking elegido ("legacy" o "bm25")"""
+    modo, corregir, ventana = _opciones_modo(modo, corregir, ventana)
+    return _mejor_por_palabras_clave(GESTOR_CORPUS.snapshot, query, modo, corregir, ley, ventana)
+
+def _mejor_por_palabras_clave(snapshot: SnapshotCorpus, query: str, modo: str, corregir: bool,
+                              ley: Optional[str], ventana: int) -> Optional[Dict]:
+    hits = _buscar_top_k(snapshot, query, 1, 0.0, modo, corregir, ley, ventana, None)
+    return hits[0] if hits else None
+
+def _top_k_fila(posiciones, scores, k: int, min_score: float) -> List[Tuple[int, float]]:
+    """Top-k de una fila dispersa con argpartition; los empates se resuelven por orden del corpus"""
+    filtro = scores >= min_score
+    posiciones, scores = posiciones[filtro], scores[filtro]
+    if len(scores) > k:
+        umbral = np.partition(scores, len(scores) - k)[len(scores) - k]
+        filtro = scores >= umbral
+        posiciones, scores = posiciones[filtro], scores[filtro]
+    orden = np.lexsort((posiciones, -scores))[:k]
+    return [(int(posiciones[i]), float(scores[i])) for i in orden]
+
+def buscar_lote(queries: List[str], k: int = 5, min_score: float = 0.0, tamano_bloque: int = 256,
+                modo: Optional[str] = None, corregir: Optional[bool] = None,
+                ventana: Optional[int] = None) -> List[List[Dict]]:
+    """
+    Muchas consultas a la vez (evaluación offline, endpoints batch): devuelve,
+    por consulta, los mismos hits que buscar_top_k(query, k, min_score, modo,
+    corregir, ventana=ventana). En "bm25" cada bloque se puntúa con un solo
+    producto de matrices dispersas y después se suma el bonus de proximidad.
+    El modo "legacy" (substrings, alias de leyes) y las consultas con frases
+    entre comillas no entran en una matriz de términos: van por buscar_top_k.
+    """
+    modo, corregir, ventana = _opciones_modo(modo, corregir, ventana)
+    snapshot = GESTOR_CORPUS.snapshot
+    if modo != "bm25" or not NUMPY_AVAILABLE:
+        return [_buscar_top_k(snapshot, query, k, min_score, modo, corregir, None, ventana, None)
+                for query in queries]
+    
+    indice = snapshot.indice
+    peso = PESO_PROXIMIDAD.get(modo, 1.0)
+    resultados = []
+    for inicio in range(0, len(queries), tamano_bloque):
+        originales = queries[inicio:inicio + tamano_bloque]
+        bloque = originales
+        correcciones = [{} for _ in bloque]
+        if corregir:
+            corregidas = [indice.corrector.corregir_consulta(q) for q in bloque]
+            bloque = [q for q, _ in corregidas]
+            correcciones = [c for _, c in corregidas]
+        scores = indice.puntuar_lote_bm25(bloque)
+        for fila, query in enumerate(bloque):
+            if '"' in query:
+                resultados.append(_buscar_top_k(snapshot, originales[fila], k, min_score, modo, corregir,
+                                                None, ventana, None))
+                continue
+            desde, hasta = scores.indptr[fila], scores.indptr[fila + 1]
+            posiciones, puntajes = scores.indices[desde:hasta], scores.data[desde:hasta]
+            terminos = analizar_consulta(query)
+            if ventana > 0 and len(posiciones):
+                bonus = indice.puntuar_proximidad(list(terminos), posiciones.tolist(), ventana)
+                if bonus:
+                    puntajes = puntajes + peso * np.array([bonus.get(p, 0.0) for p in posiciones.tolist()])
+            hits = []
+            if k > 0:
+                for posicion, score in _top_k_fila(posiciones, puntajes, k, min_score):
+                    hit = _formatear_articulo(indice.articulos[posicion])
+                    hit["score"] = score
+                    hit["terminos_coincidentes"] = sorted(
+                        t for t in set(terminos) if posicion in indice.postings.get(t, ())
+                    )
+                    hit["correcciones"] = correcciones[fila]
+                    hits.append(hit)
+            resultados.append(_agregar_cobertura(indice, hits, originales[fila]))
+    return resultados
+
+def buscar_articulo_relevante(query: str, modo: Optional[str] = None, corregir: Optional[bool] = None,
+                              ventana: Optional[int] = None) -> Optional[Dict]:
+    """Función principal de búsqueda (compatible con la interfaz original), con cache LRU"""
+    modo, corregir, ventana = _opciones_modo(modo, corregir, ventana)
+    # Un solo snapshot para la clave, la ley, el número, la cobertura y el ranking
+    snapshot = GESTOR_CORPUS.snapshot
+    clave = ("relevante", snapshot.version, _clave_consulta(query), modo, corregir, ventana)
+    return _copia(CACHE_BUSQUEDA.obtener_o_calcular(
+        clave, lambda: _buscar_articulo_relevante(snapshot, query, modo, corregir, ventana)
+    ))
 
-def buscar_articulo_relevante(query: str) -> Optional[Dict]:
-    """Función principal de búsqueda (compatible con la interfaz original)"""
+def _buscar_articulo_relevante(snapshot: SnapshotCorpus, query: str, modo: str, corregir: bool,
+                               ventana: int) -> Optional[Dict]:
+    # Ley mencionada (por nombre o alias): restringe ambas búsquedas a ese código
+    ley = snapshot.indice.detectar_ley(query)
     
     # Intentar extraer número de artículo
     match = re.search(r'art[íi]culo\s*(\d+)|art\.?\s*(\d+)', query.lower())
     if match:
         numero = match.group(1) or match.group(2)
-        resultado = buscar_articulo_por_numero(int(numero))
+        resultado = _copia(_articulo_por_numero(snapshot, int(numero), ley))
         if resultado:
-            return resultado
+            return _agregar_cobertura(snapshot.indice, [resultado], query)[0]
     
     # Búsqueda semántica
-    return buscar_por_palabras_clave(query)
+    return _mejor_por_palabras_clave(snapshot, query, modo, corregir, ley, ventana)
@@ -0,0 +1,211 @@
+# Archivo: app/referencias.py
+# COLEPA - Números de artículo en texto libre y grafo de referencias cruzadas entre artículos
+#
+# Los scripts procesar_* guardan en cada artículo las referencias que hace
+# ("conforme al artículo 12", "lo dispuesto en los arts. 5 y 6 del Código
+# Civil"); generar_grafo_referencias.py las junta en un único grafo
+# (<corpus>.referencias.json) que el motor de búsqueda carga junto al corpus.
+
+import re
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Rangos y listas: "artículos 10 al 15", "arts. 229, 230 y 231", "art. 5-8". "a", "al",
+# "hasta" y el guion solo conectan si sigue un número que no es una cantidad
+# ("el artículo 45 a 18 años" es el artículo 45)
+_CANTIDAD = r'(?!\d)(?!\s*(?:(?:a[ñn]os?|mes(?:es)?|d[ií]as?|horas?|semanas?|por\s+ciento)\b|%))'
+PATRON_LISTA_ARTICULOS = re.compile(
+    r'\bart(?:[íi]culos?|s)?\.?\s*(?:n[úu]meros?\s*)?'
+    r'(\d+(?:\s*(?:,|\by\b|\be\b)\s*\d+|\s*(?:-|–|\bal\b|\ba\b|\bhasta\b)\s*\d+' + _CANTIDAD + r')*)'
+)
+CONECTORES_RANGO = {"al", "a", "hasta", "-", "–"}
+MAX_ARTICULOS_POR_RANGO = 20
+# Ningún código llega a este número: lo que pase de acá no es un artículo
+MAX_NUMERO_ARTICULO = 9999
+
+# Lo que sigue a la lista cuando la referencia es a otra norma: "del Código Civil", "de la Ley N° 1160/97"
+PATRON_OTRA_NORMA = re.compile(
+    r'[º°]?\s*,?\s*(?:del|de\s+la|de\s+este|de\s+esta|de\s+dicho|de\s+dicha)\s+'
+    r'(c[óo]digo[^,.;:\n]*|ley\s+n?[º°.]?\s*[\d./]+)'
+)
+
+Nodo = Tuple[str, str]
+
+
+def _intervalos_de_lista(lista: str) -> List[Tuple[int, int]]:
+    """
+    "10 al 15" / "229, 230 y 231" como intervalos (desde, hasta) en orden,
+    acotados a números de artículo válidos: nunca se expande un rango. Un
+    rango descendente ("45 a 18") no es rango: la lista termina ahí.
+    """
+    intervalos: List[Tuple[int, int]] = []
+    anterior, conector = None, None
+    for parte in re.findall(r'\d+|[^\d\s]+', lista):
+        if not parte.isdigit():
+            conector = parte
+            continue
+        numero = int(parte)
+        if anterior is not None and conector in CONECTORES_RANGO:
+            if numero <= anterior:
+                break
+            intervalos.append((anterior + 1, numero))
+        else:
+            intervalos.append((numero, numero))
+        anterior, conector = numero, None
+    return [
+        (max(desde, 1), min(hasta, MAX_NUMERO_ARTICULO))
+        for desde, hasta in intervalos if desde <= MAX_NUMERO_ARTICULO and hasta >= 1
+    ]
+
+
+def _numeros_de_lista(lista: str, maximo_rango: int = MAX_ARTICULOS_POR_RANGO) -> List[int]:
+    """Expande la lista; cada rango aporta a lo sumo `maximo_rango` números"""
+    numeros: List[int] = []
+    for desde, hasta in _intervalos_de_lista(lista):
+        numeros.extend(range(desde, min(hasta, desde + maximo_rango - 1) + 1))
+    return numeros
+
+
+def extraer_pedido_articulos(texto: str, maximo: int = MAX_ARTICULOS_POR_RANGO) -> Tuple[List[int], int]:
+    """
+    Los primeros `maximo` números de artículo mencionados (rangos
+    expandidos, sin repetir, en orden) y cuántos se pidieron en total: si
+    el total es mayor, el pedido se cortó y hay que avisarlo. El total se
+    cuenta sobre los intervalos, sin expandirlos.
+    """
+    intervalos = [
+        intervalo for match in PATRON_LISTA_ARTICULOS.finditer(texto.lower())
+        for intervalo in _intervalos_de_lista(match.group(1))
+    ]
+    numeros: List[int] = []
+    vistos = set()
+    for desde, hasta in intervalos:
+        # Los vistos son a lo sumo `maximo`: cada intervalo recorre pocos números de más
+        for numero in range(desde, hasta + 1):
+            if len(numeros) >= maximo:
+                break
+            if numero not in vistos:
+                vistos.add(numero)
+                numeros.append(numero)
+
+    total, fin_anterior = 0, 0
+    for desde, hasta in sorted(intervalos):
+        desde = max(desde, fin_anterior + 1)
+        if hasta >= desde:
+            total += hasta - desde + 1
+            fin_anterior = hasta
+    return numeros, total
+
+
+def extraer_numeros_articulos(texto: str, maximo: int = MAX_ARTICULOS_POR_RANGO) -> List[int]:
+    """Todos los números de artículo mencionados, expandiendo rangos, sin repetir y en orden"""
+    return extraer_pedido_articulos(texto, maximo)[0]
+
+
+def extraer_referencias(texto: str, numero_propio: Optional[str] = None,
+                        resolutor=None) -> List[Tuple[Optional[str], int]]:
+    """
+    Referencias (ley, número) que hace el texto de un artículo. ley es None
+    cuando apunta al mismo código; las referencias a leyes sueltas ("de la
+    Ley N° 1160/97") se descartan porque no están en el corpus. `resolutor`
+    (ResolutorLeyes) traduce "del Código Civil" al nombre oficial.
+    """
+    texto_plegado = texto.lower()
+    referencias: List[Tuple[Optional[str], int]] = []
+    for match in PATRON_LISTA_ARTICULOS.finditer(texto_plegado):
+        ley = None
+        otra_norma = PATRON_OTRA_NORMA.match(texto_plegado, match.end())
+        if otra_norma:
+            if otra_norma.group(1).startswith("ley"):
+                continue
+            ley = resolutor.resolver(otra_norma.group(1)) if resolutor else None
+        for numero in _numeros_de_lista(match.group(1)):
+            if ley is None and str(numero) == str(numero_propio):
+                continue
+            if (ley, numero) not in referencias:
+                referencias.append((ley, numero))
+    return referencias
+
+
+def agregar_referencias(articulos: List[Dict], campo_numero: str = "numero_str", campo_texto: str = "texto"):
+    """Agrega "referencias" ([ley o null, número]) a cada artículo de un procesar_*"""
+    from app.alias_leyes import ResolutorLeyes
+
+    resolutor = ResolutorLeyes()
+    total = 0
+    for art in articulos:
+        art["referencias"] = [
+            [ley, numero] for ley, numero in
+            extraer_referencias(art[campo_texto], art.get(campo_numero), resolutor)
+        ]
+        total += len(art["referencias"])
+    print(f"Referencias cruzadas extraídas: {total}")
+
+
+class GrafoReferencias:
+    """
+    Lista de adyacencia (ley, número) -> artículos citados, más la inversa
+    (quién cita a cada artículo). Expandir un artículo es O(grado).
+    """
+
+    def __init__(self, aristas: Optional[Dict[Nodo, List[Nodo]]] = None):
+        self.salientes: Dict[Nodo, Tuple[Nodo, ...]] = {}
+        self.entrantes: Dict[Nodo, Tuple[Nodo, ...]] = {}
+        entrantes: Dict[Nodo, List[Nodo]] = {}
+        for origen, destinos in (aristas or {}).items():
+            self.salientes[origen] = tuple(destinos)
+            for destino in destinos:
+                entrantes.setdefault(destino, []).append(origen)
+        self.entrantes = {nodo: tuple(origenes) for nodo, origenes in entrantes.items()}
+
+    def __len__(self) -> int:
+        return sum(len(destinos) for destinos in self.salientes.values())
+
+    def citados(self, nombre_ley: str, numero) -> Tuple[Nodo, ...]:
+        return self.salientes.get((nombre_ley, str(numero)), ())
+
+    def citado_por(self, nombre_ley: str, numero) -> Tuple[Nodo, ...]:
+        return self.entrantes.get((nombre_ley, str(numero)), ())
+
+    @classmethod
+    def desde_articulos(cls, articulos: Iterable[Dict], resolutor=None) -> "GrafoReferencias":
+        """
+        Grafo de un corpus con la forma de legal_database.json: usa
+        art["referencias"] si vino precalculado y, si no, lo extrae del texto.
+        """
+        aristas: Dict[Nodo, List[Nodo]] = {}
+        for art in articulos:
+            nombre_ley, numero = art['nombre_ley'], str(art['numero_articulo'])
+            referencias = art.get('referencias')
+            if referencias is None:
+                referencias = extraer_referencias(art['texto_completo'], numero, resolutor)
+            destinos = [(ley or nombre_ley, str(num)) for ley, num in referencias]
+            if destinos:
+                aristas.setdefault((nombre_ley, numero), []).extend(destinos)
+        return cls(aristas)
+
+    def guardar(self, ruta: Path):
+        por_ley: Dict[str, Dict[str, List[Nodo]]] = {}
+        for (ley, numero), destinos in self.salientes.items():
+            por_ley.setdefault(ley, {})[numero] = [list(destino) for destino in destinos]
+        ruta_temporal = Path(str(ruta) + ".tmp")
+        with open(ruta_temporal, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "referencias": por_ley}, f, ensure_ascii=False)
+        ruta_temporal.replace(ruta)
+
+    @classmethod
+    def cargar(cls, ruta: Path) -> "GrafoReferencias":
+        with open(ruta, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        return cls({
+            (ley, numero): [tuple(destino) for destino in destinos]
+            for ley, por_numero in datos["referencias"].items()
+            for numero, destinos in por_numero.items()
+        })
+
+
+def ruta_grafo(ruta_corpus: Path) -> Path:
+    """Archivo del grafo junto al corpus: legal_database.json -> legal_database.referencias.json"""
+    ruta_corpus = Path(ruta_corpus)
+    return ruta_corpus.with_name(ruta_corpus.stem + ".referencias.json")
@@ -1,6 +1,8 @@
 # Archivo: app/vector_search.py - CORREGIDO PARA QDRANT API
 import os
 import logging
+import threading
+from pathlib import Path
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
@@ -21,6 +23,56 @@ except Exception as e:
     logger.error(f"❌ Error Qdrant: {e}")
     qdrant_client = None
 
+# Colección de Qdrant de cada código (las crean los scripts poblar_*)
+COLECCIONES_POR_LEY: Dict[str, str] = {
+    "Código Aduanero": "colepa_aduanero_final",
+    "Código Civil": "colepa_codigo_civil_final",
+    "Código Electoral": "colepa_electoral_final",
+    "Código de Organización Judicial": "colepa_organizacion_judicial_final",
+    "Código Laboral": "colepa_laboral_final",
+    "Código de la Niñez y la Adolescencia": "colepa_ninez_final",
+    "Código Penal": "colepa_penal_final",
+    "Código Procesal Civil": "colepa_procesal_civil_final",
+    "Código Procesal Penal": "colepa_procesal_penal_final",
+    "Código Sanitario": "colepa_sanitario_final",
+}
+
+# ========== BACKEND VECTORIAL LOCAL ==========
+# Con COLEPA_VECTORES_DIR, las colecciones que tengan <coleccion>.npy/.json en ese
+# directorio se buscan en proceso con NumPy; el resto sigue yendo a Qdrant.
+VECTORES_DIR = os.getenv("COLEPA_VECTORES_DIR")
+VECTORES_DTYPE = os.getenv("COLEPA_VECTORES_DTYPE", "float32")
+# Amplitud de búsqueda del grafo HNSW (si la colección tiene uno); 0 = la guardada en el grafo
+HNSW_EF = int(os.getenv("COLEPA_HNSW_EF", "0"))
+_indices_locales: Dict[str, object] = {}
+_lock_indices = threading.Lock()
+
+def _indice_local(collection_name: str):
+    """Índice NumPy de la colección, cargado la primera vez (None si no hay archivos locales)"""
+    if not VECTORES_DIR:
+        return None
+    with _lock_indices:
+        if collection_name not in _indices_locales:
+            ruta = Path(VECTORES_DIR) / collection_name
+            indice = None
+            if ruta.with_suffix(".npy").exists():
+                try:
+                    from app.vectores_locales import cargar_indice_vectorial
+                    indice = cargar_indice_vectorial(ruta, VECTORES_DTYPE, HNSW_EF or None)
+                except Exception as e:
+                    logger.error(f"❌ Error cargando vectores locales de {collection_name}: {e}")
+            _indices_locales[collection_name] = indice
+        return _indices_locales[collection_name]
+
+def _contexto_desde_payload(payload: Dict) -> Dict:
+    return {
+        # Los scripts poblar_* guardan el texto como "pageContent"
+        "pageContent": payload.get("texto_completo") or payload.get("pageContent", ""),
+        "numero_articulo": payload.get("numero_articulo"),
+        "nombre_ley": payload.get("nombre_ley", "Código Aduanero"),
+        "titulo": payload.get("titulo", "")
+    }
+
 def buscar_articulo_por_numero(numero: int, collection_name: str) -> Optional[Dict]:
     """
     Busca un artículo específico por número.
@@ -72,6 +124,20 @@ def buscar_articulo_relevante(query_vector: List[float], collection_name: str) -
     Búsqueda semántica simple.
     CORREGIDO: Usa search() en lugar de query_points()
     """
+    indice_local = _indice_local(collection_name) if query_vector else None
+    if indice_local is not None:
+        try:
+            resultados = indice_local.buscar(query_vector, k=1, score_threshold=0.7)
+        except Exception as e:
+            logger.error(f"❌ Error en búsqueda semántica local: {e}")
+            return None
+        if resultados:
+            score, payload = resultados[0]
+            logger.info(f"✅ Contexto local encontrado con score: {score}")
+            return _contexto_desde_payload(payload)
+        logger.warning("❌ No se encontró contexto relevante")
+        return None
+    
     if not qdrant_client or not query_vector:
         logger.error("❌ Qdrant o vector no disponible")
         return None
@@ -89,12 +155,7 @@ def buscar_articulo_relevante(query_vector: List[float], collection_name: str) -
         
         if resultados:
             punto = resultados[0]
-            contexto = {
-                "pageContent": punto.payload.get("texto_completo", ""),
-                "numero_articulo": punto.payload.get("numero_articulo"),
-                "nombre_ley": punto.payload.get("nombre_ley", "Código Aduanero"),
-                "titulo": punto.payload.get("titulo", "")
-            }
+            contexto = _contexto_desde_payload(punto.payload)
             
             logger.info(f"✅ Contexto encontrado con score: {punto.score}")
             return contexto
@@ -105,3 +166,36 @@ def buscar_articulo_relevante(query_vector: List[float], collection_name: str) -
     except Exception as e:
         logger.error(f"❌ Error en búsqueda semántica: {e}")
         return None
+
+def buscar_articulos_relevantes_lote(query_vectors: List[List[float]], collection_name: str,
+                                     limit: int = 5, score_threshold: float = 0.7) -> List[List[Dict]]:
+    """
+    Varias consultas semánticas a la vez. Con vectores locales es un único
+    producto de matrices; si no, una búsqueda a Qdrant por consulta.
+    Cada contexto incluye su "score".
+    """
+    indice_local = _indice_local(collection_name)
+    try:
+        if indice_local is not None:
+            lotes = indice_local.buscar_lote(query_vectors, k=limit, score_threshold=score_threshold)
+        elif qdrant_client:
+            lotes = []
+            for vector in query_vectors:
+                puntos = qdrant_client.search(
+                    collection_name=collection_name,
+                    query_vector=vector,
+                    limit=limit,
+                    score_threshold=score_threshold
+                )
+                lotes.append([(punto.score, punto.payload) for punto in puntos])
+        else:
+            logger.error("❌ Qdrant no disponible")
+            return [[] for _ in query_vectors]
+    except Exception as e:
+        logger.error(f"❌ Error en búsqueda semántica por lote: {e}")
+        return [[] for _ in query_vectors]
+    
+    return [
+        [dict(_contexto_desde_payload(payload), score=score) for score, payload in resultados]
+        for resultados in lotes
+    ]
@@ -0,0 +1,151 @@
+# Archivo: app/vectores_locales.py
+# COLEPA - Búsqueda semántica en proceso sobre embeddings precalculados (sin Qdrant)
+#
+# Los embeddings de una colección se guardan como:
+#   <coleccion>.npy  : matriz n × d (la exporta scripts/exportar_vectores_qdrant.py)
+#   <coleccion>.json : {"ids": [...], "payloads": [...]} en el mismo orden que las filas
+#
+# Las filas se normalizan una sola vez al cargar, igual que hace Qdrant con
+# las colecciones de distancia COSINE, así que el coseno es un producto punto
+# y el score coincide con el que devuelve qdrant_client.search().
+# Si además existe <coleccion>.hnsw.npz (scripts/construir_hnsw.py), las
+# consultas recorren ese grafo en lugar de comparar contra todas las filas.
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.hnsw import IndiceHNSW
+
+logger = logging.getLogger(__name__)
+
+# Filas por bloque al convertir float16 -> float32 para el producto
+FILAS_POR_BLOQUE = 65536
+
+
+def _normalizar(matriz: np.ndarray) -> np.ndarray:
+    """Divide cada fila por su norma (las filas nulas quedan en cero)"""
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+class IndiceVectorial:
+    """
+    Matriz contigua de embeddings normalizados. Una consulta es un único
+    producto matriz-vector; un lote de consultas, un producto matriz-matriz.
+    Con dtype float16 la matriz ocupa la mitad y el producto se hace en
+    float32 por bloques de filas.
+    """
+
+    def __init__(self, vectores, payloads: List[Dict[str, Any]], ids: Optional[List[Any]] = None,
+                 dtype: str = "float32"):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"dtype no soportado: {dtype} (opciones: float32, float16)")
+        matriz = np.asarray(vectores, dtype=np.float32)
+        if matriz.ndim != 2 or len(matriz) != len(payloads):
+            raise ValueError("Se esperaba una matriz n × d con un payload por fila")
+
+        self.matriz = np.ascontiguousarray(_normalizar(matriz), dtype=dtype)
+        self.payloads = payloads
+        self.ids = ids if ids is not None else list(range(len(payloads)))
+        self.dimension = matriz.shape[1]
+        # Grafo HNSW opcional para búsqueda aproximada
+        self.hnsw: Optional[IndiceHNSW] = None
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    def _similitudes(self, consultas: np.ndarray) -> np.ndarray:
+        """Cosenos (m × n) entre consultas ya normalizadas y todas las filas"""
+        if self.matriz.dtype == np.float32:
+            return consultas @ self.matriz.T
+        partes = [
+            consultas @ self.matriz[inicio:inicio + FILAS_POR_BLOQUE].astype(np.float32).T
+            for inicio in range(0, len(self.matriz), FILAS_POR_BLOQUE)
+        ]
+        return np.concatenate(partes, axis=1) if partes else np.zeros((len(consultas), 0), np.float32)
+
+    def _consultas(self, vectores) -> np.ndarray:
+        consultas = np.asarray(vectores, dtype=np.float32)
+        if consultas.ndim == 1:
+            consultas = consultas[np.newaxis, :]
+        if consultas.shape[1] != self.dimension:
+            raise ValueError(f"Dimensión de consulta {consultas.shape[1]}, se esperaba {self.dimension}")
+        return _normalizar(consultas)
+
+    @staticmethod
+    def _top_k_fila(scores: np.ndarray, k: int, score_threshold: Optional[float]) -> List[Tuple[int, float]]:
+        """(fila, score) de los k mayores, de mayor a menor (a igual score, la primera fila)"""
+        if score_threshold is not None:
+            candidatas = np.flatnonzero(scores >= score_threshold)
+        else:
+            candidatas = np.arange(len(scores))
+        if len(candidatas) > k:
+            parte = np.argpartition(-scores[candidatas], k - 1)[:k]
+            candidatas = candidatas[parte]
+        orden = np.lexsort((candidatas, -scores[candidatas]))
+        return [(int(fila), float(scores[fila])) for fila in candidatas[orden]]
+
+    def buscar(self, vector: Sequence[float], k: int = 5, score_threshold: Optional[float] = None,
+               exacto: bool = False) -> List[Tuple[float, Dict[str, Any]]]:
+        """(score, payload) de los k embeddings más parecidos por coseno"""
+        return self.buscar_lote([vector], k, score_threshold, exacto)[0]
+
+    def buscar_lote(self, vectores: Sequence[Sequence[float]], k: int = 5, score_threshold: Optional[float] = None,
+                    exacto: bool = False) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """
+        Igual que buscar() para varias consultas. La búsqueda exacta es un solo
+        producto de matrices; con grafo HNSW (y exacto=False) cada consulta
+        recorre el grafo.
+        """
+        if k <= 0 or not len(self):
+            return [[] for _ in vectores]
+        consultas = self._consultas(vectores)
+        if self.hnsw is not None and not exacto:
+            return [
+                [(score, self.payloads[fila]) for score, fila in self.hnsw.buscar(consulta, k)
+                 if score_threshold is None or score >= score_threshold]
+                for consulta in consultas
+            ]
+        similitudes = self._similitudes(consultas)
+        return [
+            [(score, self.payloads[fila]) for fila, score in self._top_k_fila(fila_scores, k, score_threshold)]
+            for fila_scores in similitudes
+        ]
+
+    def guardar(self, ruta_base: Path):
+        """Escribe <ruta_base>.npy y <ruta_base>.json"""
+        ruta_base = Path(ruta_base)
+        np.save(ruta_base.with_suffix(".npy"), self.matriz)
+        with open(ruta_base.with_suffix(".json"), 'w', encoding='utf-8') as f:
+            json.dump({"ids": self.ids, "payloads": self.payloads}, f, ensure_ascii=False)
+
+
+def ruta_hnsw(ruta_base: Path) -> Path:
+    return Path(str(ruta_base) + ".hnsw.npz")
+
+
+def cargar_indice_vectorial(ruta_base: Path, dtype: str = "float32", ef: Optional[int] = None) -> IndiceVectorial:
+    """
+    Carga los embeddings exportados de una colección (<ruta_base>.npy + .json)
+    y, si existe, su grafo HNSW (`ef` reemplaza al guardado en el grafo).
+    """
+    ruta_base = Path(ruta_base)
+    vectores = np.load(ruta_base.with_suffix(".npy"))
+    with open(ruta_base.with_suffix(".json"), 'r', encoding='utf-8') as f:
+        datos = json.load(f)
+    indice = IndiceVectorial(vectores, datos["payloads"], datos.get("ids"), dtype=dtype)
+    if ruta_hnsw(ruta_base).exists():
+        try:
+            indice.hnsw = IndiceHNSW.cargar(ruta_hnsw(ruta_base), indice.matriz)
+            if ef:
+                indice.hnsw.ef = ef
+            logger.info(f"🕸️ Grafo HNSW cargado: M={indice.hnsw.M}, ef={indice.hnsw.ef}")
+        except Exception as e:
+            logger.error(f"❌ Grafo HNSW inválido, se usa búsqueda exacta: {e}")
+    logger.info(f"✅ Vectores locales: {ruta_base.name} ({len(indice)} × {indice.dimension}, {dtype})")
+    return indice
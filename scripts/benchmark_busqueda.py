@@ -0,0 +1,301 @@
+# Archivo: scripts/benchmark_busqueda.py
+# Benchmark de recuperación: latencia (p50/p95/p99), consultas por segundo,
+# recall@k y MRR de cada backend sobre un juego de consultas etiquetadas.
+#
+# Las consultas se generan del propio corpus, con la respuesta correcta
+# conocida de antemano:
+#   numero   : "artículo 105 del Código Penal"        -> ese artículo
+#   palabras : palabras clave + texto de un artículo  -> ese artículo
+#   ambigua  : "qué dice el artículo 3" (en varias leyes) -> todos los artículos 3
+#
+# Uso:
+#   python scripts/benchmark_busqueda.py                       # corpus real + sintéticos de 5k y 50k
+#   python scripts/benchmark_busqueda.py --tamanos 25,5000 --consultas 300 --k 5 --salida bench.json
+#   python scripts/benchmark_busqueda.py --tamanos real --backends mock_legacy,pipeline_main
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import mock_search
+from app.alias_leyes import ALIAS_LEYES
+from app.analizador import tokenizar, STOPWORDS
+from app.referencias import extraer_numeros_articulos
+
+# --- CONFIGURACIÓN ---
+ARCHIVO_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'app', 'legal_database.json')
+TAMANOS_POR_DEFECTO = "real,5000,50000"
+BACKENDS_POR_DEFECTO = "mock_legacy,mock_bm25,mock_relevante,pipeline_main,hibrida_lexica,lote_bm25"
+PROPORCION_TIPOS = {"numero": 0.35, "palabras": 0.45, "ambigua": 0.20}
+
+
+# ========== CORPUS SINTÉTICO ==========
+def generar_corpus_sintetico(n_articulos: int, base: dict, semilla: int = 13) -> dict:
+    """
+    Corpus con la forma de legal_database.json: vocabulario del corpus real
+    con frecuencias tipo Zipf, los 10 códigos y números correlativos por código.
+    """
+    rng = random.Random(semilla)
+    vocabulario = sorted({
+        palabra for art in base['articulos'] for palabra in tokenizar(art['texto_completo'])
+        if len(palabra) >= 4 and palabra not in STOPWORDS and not palabra.isdigit()
+    })
+    rng.shuffle(vocabulario)
+    pesos = [1.0 / (rango + 1) for rango in range(len(vocabulario))]
+    leyes = list(ALIAS_LEYES)
+    siguiente_numero = {ley: 1 for ley in leyes}
+
+    articulos = []
+    for i in range(n_articulos):
+        ley = leyes[i % len(leyes)]
+        numero = siguiente_numero[ley]
+        siguiente_numero[ley] += 1
+        palabras = rng.choices(vocabulario, weights=pesos, k=rng.randint(30, 90))
+        # Cada artículo tiene algunas palabras poco frecuentes propias, como los artículos reales
+        propias = rng.sample(vocabulario[len(vocabulario) // 3:], 3)
+        texto = " ".join(palabras[:15] + propias + palabras[15:])
+        articulos.append({
+            "id": i + 1,
+            "nombre_ley": ley,
+            "numero_articulo": str(numero),
+            "texto_completo": f"Artículo {numero}.- {texto.capitalize()}.",
+            "palabras_clave": propias,
+        })
+    return {"metadata": {"sintetico": True, "articulos": n_articulos}, "articulos": articulos}
+
+
+# ========== CONSULTAS ETIQUETADAS ==========
+def generar_consultas(articulos: list, cantidad: int, semilla: int = 29) -> list:
+    rng = random.Random(semilla)
+    por_numero = {}
+    for art in articulos:
+        por_numero.setdefault(str(art['numero_articulo']), []).append((art['nombre_ley'], str(art['numero_articulo'])))
+    ambiguos = [numero for numero, arts in por_numero.items() if len(arts) > 1]
+    con_palabras = [art for art in articulos if art.get('palabras_clave')]
+
+    consultas = []
+    for tipo, proporcion in PROPORCION_TIPOS.items():
+        for _ in range(max(1, int(cantidad * proporcion))):
+            if tipo == "numero":
+                art = rng.choice(articulos)
+                consultas.append({
+                    "tipo": tipo,
+                    "consulta": f"¿Qué dice el artículo {art['numero_articulo']} del {art['nombre_ley']}?",
+                    "relevantes": [(art['nombre_ley'], str(art['numero_articulo']))],
+                })
+            elif tipo == "palabras" and con_palabras:
+                art = rng.choice(con_palabras)
+                palabras = rng.sample(art['palabras_clave'], min(2, len(art['palabras_clave'])))
+                texto = [p for p in tokenizar(art['texto_completo']) if len(p) >= 5 and p not in STOPWORDS]
+                extra = rng.sample(texto, min(2, len(texto)))
+                consultas.append({
+                    "tipo": tipo,
+                    "consulta": " ".join(palabras + extra),
+                    "relevantes": [(art['nombre_ley'], str(art['numero_articulo']))],
+                })
+            elif tipo == "ambigua" and ambiguos:
+                numero = rng.choice(ambiguos)
+                consultas.append({
+                    "tipo": tipo,
+                    "consulta": f"qué dice el artículo {numero}",
+                    "relevantes": por_numero[numero],
+                })
+    return consultas
+
+
+# ========== BACKENDS ==========
+def _claves(hits) -> list:
+    return [(h['nombre_ley'], str(h['numero_articulo'])) for h in hits if h]
+
+
+def crear_backends(nombres: list, k: int) -> dict:
+    """backend -> función(consulta) que devuelve la lista ordenada de (ley, número)"""
+    backends = {}
+    for nombre in nombres:
+        if nombre == "mock_legacy":
+            backends[nombre] = lambda q: _claves(mock_search.buscar_top_k(q, k=k, modo="legacy"))
+        elif nombre == "mock_bm25":
+            backends[nombre] = lambda q: _claves(mock_search.buscar_top_k(q, k=k, modo="bm25"))
+        elif nombre == "mock_relevante":
+            backends[nombre] = lambda q: _claves([mock_search.buscar_articulo_relevante(q)])
+        elif nombre == "pipeline_main":
+            # Búsqueda completa del endpoint, incluida validar_calidad_contexto
+            os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+            from app import main as servidor
+            logging.getLogger().setLevel(logging.WARNING)
+
+            def pipeline(q, servidor=servidor):
+                contexto = servidor.buscar_con_manejo_errores(q)
+                if not contexto:
+                    return []
+                return _claves(contexto.get("articulos") or [contexto])
+            backends[nombre] = pipeline
+        elif nombre == "hibrida_lexica":
+            from app.busqueda_hibrida import buscar_hibrido
+            backends[nombre] = lambda q: _claves(
+                buscar_hibrido(q, k=k, numero=(extraer_numeros_articulos(q) or [None])[0])["hits"]
+            )
+        elif nombre == "qdrant":
+            backends[nombre] = crear_backend_qdrant(k)
+        elif nombre != "lote_bm25":
+            raise ValueError(f"Backend desconocido: {nombre}")
+    return backends
+
+
+def crear_backend_qdrant(k: int):
+    """Búsqueda semántica real: embedding ada-002 + Qdrant (o vectores locales con COLEPA_VECTORES_DIR)"""
+    from openai import OpenAI
+    from app.vector_search import buscar_articulos_relevantes_lote, COLECCIONES_POR_LEY
+
+    cliente = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    def buscar(q):
+        vector = cliente.embeddings.create(model="text-embedding-ada-002", input=q).data[0].embedding
+        ley = mock_search.detectar_ley_en_consulta(q)
+        colecciones = [COLECCIONES_POR_LEY[ley]] if ley in COLECCIONES_POR_LEY else COLECCIONES_POR_LEY.values()
+        hits = [h for c in colecciones for h in buscar_articulos_relevantes_lote([vector], c, k, 0.0)[0]]
+        return _claves(sorted(hits, key=lambda h: -h["score"])[:k])
+    return buscar
+
+
+# ========== MÉTRICAS ==========
+def metricas(latencias_ms: list, resultados: list, consultas: list, k: int, segundos: float) -> dict:
+    recall, rr = [], []
+    for devueltos, consulta in zip(resultados, consultas):
+        relevantes = {tuple(r) for r in consulta["relevantes"]}
+        top = devueltos[:k]
+        recall.append(len(relevantes & set(top)) / len(relevantes))
+        rr.append(next((1.0 / rango for rango, clave in enumerate(top, start=1) if clave in relevantes), 0.0))
+    resumen = {
+        "consultas": len(consultas),
+        "qps": len(consultas) / segundos if segundos else 0.0,
+        f"recall@{k}": float(np.mean(recall)) if recall else 0.0,
+        "mrr": float(np.mean(rr)) if rr else 0.0,
+    }
+    if latencias_ms:
+        for p in (50, 95, 99):
+            resumen[f"p{p}_ms"] = float(np.percentile(latencias_ms, p))
+    return resumen
+
+
+def correr_backend(nombre: str, funcion, consultas: list, k: int) -> dict:
+    mock_search.CACHE_BUSQUEDA.limpiar()
+    for consulta in consultas[:5]:
+        funcion(consulta["consulta"])  # calentamiento (cachés de analizador, imports)
+    mock_search.CACHE_BUSQUEDA.limpiar()
+
+    latencias, resultados = [], []
+    inicio_total = time.perf_counter()
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        resultados.append(funcion(consulta["consulta"]))
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    total = time.perf_counter() - inicio_total
+    return resumen_por_tipo(latencias, resultados, consultas, k, total)
+
+
+def correr_lote(consultas: list, k: int) -> dict:
+    """buscar_lote en BM25 (mismos hits que mock_bm25): una sola llamada para todas las consultas (solo tiene sentido el QPS total)"""
+    textos = [c["consulta"] for c in consultas]
+    mock_search.buscar_lote(textos[:5], k=k, modo="bm25")
+    inicio = time.perf_counter()
+    lotes = mock_search.buscar_lote(textos, k=k, modo="bm25")
+    total = time.perf_counter() - inicio
+    return resumen_por_tipo([], [_claves(hits) for hits in lotes], consultas, k, total)
+
+
+def resumen_por_tipo(latencias, resultados, consultas, k, total) -> dict:
+    resumen = metricas(latencias, resultados, consultas, k, total)
+    resumen["por_tipo"] = {}
+    for tipo in PROPORCION_TIPOS:
+        indices = [i for i, c in enumerate(consultas) if c["tipo"] == tipo]
+        if indices:
+            resumen["por_tipo"][tipo] = metricas(
+                [latencias[i] for i in indices] if latencias else [],
+                [resultados[i] for i in indices], [consultas[i] for i in indices], k,
+                total * len(indices) / len(consultas),
+            )
+    return resumen
+
+
+# ========== EJECUCIÓN ==========
+def cargar_corpus(ruta: str) -> mock_search.GestorCorpus:
+    """Reemplaza el corpus del motor (sin vigilancia de cambios) y mide la construcción de índices"""
+    gestor = mock_search.GestorCorpus(Path(ruta), intervalo=0)
+    mock_search.GESTOR_CORPUS = gestor
+    mock_search.CACHE_BUSQUEDA.limpiar()
+    return gestor
+
+
+def imprimir_tabla(corpus: str, resultados: dict, k: int):
+    print(f"\n=== Corpus {corpus} ===")
+    print(f"{'backend':<16} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'qps':>9} {f'recall@{k}':>10} {'mrr':>6}")
+    for nombre, r in resultados.items():
+        latencias = "".join(f"{r.get(p, float('nan')):>9.3f}" for p in ("p50_ms", "p95_ms", "p99_ms"))
+        print(f"{nombre:<16}{latencias} {r['qps']:>9.1f} {r[f'recall@{k}']:>10.3f} {r['mrr']:>6.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de latencia y relevancia de la búsqueda")
+    parser.add_argument("--tamanos", default=TAMANOS_POR_DEFECTO,
+                        help="'real' (app/legal_database.json) y/o cantidades de artículos sintéticos")
+    parser.add_argument("--backends", default=BACKENDS_POR_DEFECTO,
+                        help=f"{BACKENDS_POR_DEFECTO},qdrant (qdrant requiere OpenAI y Qdrant configurados)")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--salida", help="archivo JSON con todos los resultados")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with open(ARCHIVO_CORPUS, 'r', encoding='utf-8') as f:
+        corpus_real = json.load(f)
+
+    nombres_backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    reporte = {"k": args.k, "consultas_por_corpus": args.consultas, "corpus": {}}
+    directorio = tempfile.mkdtemp(prefix="colepa_bench_")
+
+    for tamano in args.tamanos.split(","):
+        tamano = tamano.strip()
+        if tamano == "real":
+            ruta, datos = ARCHIVO_CORPUS, corpus_real
+        else:
+            datos = generar_corpus_sintetico(int(tamano), corpus_real)
+            ruta = os.path.join(directorio, f"sintetico_{tamano}.json")
+            with open(ruta, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False)
+
+        inicio = time.perf_counter()
+        cargar_corpus(ruta)
+        construccion = time.perf_counter() - inicio
+        consultas = generar_consultas(datos['articulos'], args.consultas)
+
+        resultados = {}
+        backends = crear_backends(nombres_backends, args.k)
+        for nombre in nombres_backends:
+            resultados[nombre] = (correr_lote(consultas, args.k) if nombre == "lote_bm25"
+                                  else correr_backend(nombre, backends[nombre], consultas, args.k))
+
+        etiqueta = tamano if tamano == "real" else f"{tamano}_sintetico"
+        reporte["corpus"][etiqueta] = {
+            "articulos": len(datos['articulos']),
+            "construccion_indice_s": construccion,
+            "consultas": len(consultas),
+            "backends": resultados,
+        }
+        print(f"\nÍndice de {len(datos['articulos'])} artículos construido en {construccion:.2f}s")
+        imprimir_tabla(etiqueta, resultados, args.k)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en: {args.salida}")
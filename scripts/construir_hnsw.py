@@ -0,0 +1,108 @@
+# Archivo: scripts/construir_hnsw.py
+# Construye el grafo HNSW de una colección exportada con exportar_vectores_qdrant.py
+# (los mismos vectores que suben los scripts poblar_*) y lo guarda como
+# <coleccion>.hnsw.npz junto a los vectores. Al final imprime un reporte de
+# recall contra la búsqueda exacta y de latencia para varios valores de ef.
+#
+# Uso: python scripts/construir_hnsw.py colepa_penal_final [--M 16] [--ef-construccion 200]
+#          [--ef 16,32,64,128,256] [--consultas 200] [--k 10] [--json reporte.json]
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.hnsw import IndiceHNSW
+from app.vectores_locales import cargar_indice_vectorial, ruta_hnsw
+
+# --- CONFIGURACIÓN ---
+DIRECTORIO_VECTORES = os.getenv("COLEPA_VECTORES_DIR", os.path.join(os.path.dirname(__file__), '..', 'data', 'vectores'))
+
+
+def percentil(valores, p):
+    return float(np.percentile(valores, p)) if valores else 0.0
+
+
+def reporte_recall_latencia(indice, valores_ef, n_consultas, k, semilla=7):
+    """
+    Consultas: filas del corpus con ruido gaussiano (se parecen a una pregunta
+    sobre un artículo existente sin ser idénticas). Mide recall@k del grafo
+    contra la búsqueda exacta y la latencia por consulta de ambos.
+    """
+    rng = np.random.default_rng(semilla)
+    filas = rng.choice(len(indice), size=min(n_consultas, len(indice)), replace=False)
+    base = indice.matriz[filas].astype(np.float32)
+    consultas = base + rng.normal(scale=0.5 / np.sqrt(indice.dimension), size=base.shape).astype(np.float32)
+
+    exactos, tiempos_exactos = [], []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        resultado = indice.buscar(consulta, k, exacto=True)
+        tiempos_exactos.append((time.perf_counter() - inicio) * 1000)
+        exactos.append({id(payload) for _, payload in resultado})
+
+    filas_reporte = [{
+        "metodo": "exacto", "ef": None, f"recall@{k}": 1.0,
+        "p50_ms": percentil(tiempos_exactos, 50), "p95_ms": percentil(tiempos_exactos, 95),
+    }]
+    for ef in valores_ef:
+        indice.hnsw.ef = ef
+        aciertos, tiempos = 0, []
+        for consulta, esperados in zip(consultas, exactos):
+            inicio = time.perf_counter()
+            resultado = indice.buscar(consulta, k)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            aciertos += len(esperados & {id(payload) for _, payload in resultado})
+        filas_reporte.append({
+            "metodo": "hnsw", "ef": ef, f"recall@{k}": aciertos / (k * len(consultas)),
+            "p50_ms": percentil(tiempos, 50), "p95_ms": percentil(tiempos, 95),
+        })
+    return filas_reporte
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye el grafo HNSW de una colección local")
+    parser.add_argument("coleccion")
+    parser.add_argument("--M", type=int, default=16)
+    parser.add_argument("--ef-construccion", type=int, default=200)
+    parser.add_argument("--ef", default="16,32,64,128,256", help="valores de ef para el reporte")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", help="guardar también el reporte en este archivo")
+    args = parser.parse_args()
+
+    ruta_base = os.path.join(DIRECTORIO_VECTORES, args.coleccion)
+    indice = cargar_indice_vectorial(ruta_base)
+    print(f"Construyendo HNSW para {args.coleccion}: {len(indice)} vectores de {indice.dimension} dimensiones "
+          f"(M={args.M}, ef_construccion={args.ef_construccion})...")
+    inicio = time.time()
+    valores_ef = [int(ef) for ef in args.ef.split(",")]
+    indice.hnsw = IndiceHNSW(args.M, args.ef_construccion, ef=valores_ef[0]).construir(indice.matriz, 1000)
+    print(f"Grafo construido en {time.time() - inicio:.1f}s.")
+
+    reporte = reporte_recall_latencia(indice, valores_ef, args.consultas, args.k)
+    # El ef por defecto del grafo guardado: el menor con recall >= 0.95 (o el mayor probado)
+    recall = f"recall@{args.k}"
+    suficientes = [fila["ef"] for fila in reporte[1:] if fila[recall] >= 0.95]
+    indice.hnsw.ef = suficientes[0] if suficientes else valores_ef[-1]
+    indice.hnsw.guardar(ruta_hnsw(ruta_base))
+    print(f"Grafo guardado en {ruta_hnsw(ruta_base)} (ef por defecto = {indice.hnsw.ef})\n")
+
+    print(f"{'método':<8} {'ef':>5} {recall:>10} {'p50 ms':>9} {'p95 ms':>9}")
+    for fila in reporte:
+        print(f"{fila['metodo']:<8} {str(fila['ef'] or '-'):>5} {fila[recall]:>10.3f} "
+              f"{fila['p50_ms']:>9.3f} {fila['p95_ms']:>9.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                "coleccion": args.coleccion, "vectores": len(indice), "dimension": indice.dimension,
+                "M": args.M, "ef_construccion": args.ef_construccion, "k": args.k,
+                "consultas": args.consultas, "resultados": reporte,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nReporte guardado en {args.json}")
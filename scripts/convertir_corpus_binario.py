@@ -0,0 +1,28 @@
+# Archivo: scripts/convertir_corpus_binario.py
+# Convierte app/legal_database.json al formato binario .colepa (mmap) que
+# puede cargar el motor de búsqueda local con COLEPA_CORPUS=<ruta>.colepa
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.corpus_binario import convertir_json
+
+# --- CONFIGURACIÓN ---
+ARCHIVO_JSON_ENTRADA = os.path.join(os.path.dirname(__file__), '..', 'app', 'legal_database.json')
+ARCHIVO_BINARIO_SALIDA = os.path.join(os.path.dirname(__file__), '..', 'app', 'legal_database.colepa')
+
+if __name__ == "__main__":
+    entrada = sys.argv[1] if len(sys.argv) > 1 else ARCHIVO_JSON_ENTRADA
+    salida = sys.argv[2] if len(sys.argv) > 2 else ARCHIVO_BINARIO_SALIDA
+
+    inicio = time.time()
+    print(f"Convirtiendo: {entrada}")
+    total = convertir_json(entrada, salida)
+    tamano_json = os.path.getsize(entrada)
+    tamano_binario = os.path.getsize(salida)
+    print(f"Se convirtieron {total} artículos en {time.time() - inicio:.2f}s.")
+    print(f"Tamaño: {tamano_json:,} bytes (JSON) -> {tamano_binario:,} bytes (binario)")
+    print(f"Corpus binario guardado en: {salida}")
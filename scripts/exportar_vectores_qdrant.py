@@ -0,0 +1,56 @@
+# Archivo: scripts/exportar_vectores_qdrant.py
+# Descarga los embeddings y payloads de colecciones de Qdrant para el backend
+# vectorial local (COLEPA_VECTORES_DIR=<directorio de salida>)
+#
+# Uso: python scripts/exportar_vectores_qdrant.py colepa_penal_final [colepa_civil_final ...]
+
+import os
+import sys
+import json
+
+import numpy as np
+from qdrant_client import QdrantClient
+from dotenv import load_dotenv
+
+load_dotenv()
+# --- CONFIGURACIÓN ---
+DIRECTORIO_SALIDA = os.getenv("COLEPA_VECTORES_DIR", os.path.join(os.path.dirname(__file__), '..', 'data', 'vectores'))
+LOTE_SCROLL = 256
+
+# --- INICIALIZACIÓN ---
+try:
+    print("Inicializando cliente Qdrant...")
+    qdrant_client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"), timeout=120)
+except Exception as e:
+    print(f"Error al inicializar el cliente: {e}")
+    exit()
+
+def exportar_coleccion(coleccion: str):
+    ids, vectores, payloads = [], [], []
+    offset = None
+    while True:
+        puntos, offset = qdrant_client.scroll(
+            collection_name=coleccion, limit=LOTE_SCROLL, offset=offset,
+            with_payload=True, with_vectors=True
+        )
+        for punto in puntos:
+            ids.append(str(punto.id))
+            vectores.append(punto.vector)
+            payloads.append(punto.payload)
+        print(f"  - {coleccion}: {len(ids)} puntos descargados...")
+        if offset is None:
+            break
+
+    os.makedirs(DIRECTORIO_SALIDA, exist_ok=True)
+    ruta_base = os.path.join(DIRECTORIO_SALIDA, coleccion)
+    np.save(ruta_base + ".npy", np.asarray(vectores, dtype=np.float32))
+    with open(ruta_base + ".json", 'w', encoding='utf-8') as f:
+        json.dump({"ids": ids, "payloads": payloads}, f, ensure_ascii=False)
+    print(f"Colección '{coleccion}' exportada en {ruta_base}.npy/.json")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python scripts/exportar_vectores_qdrant.py <coleccion> [<coleccion> ...]")
+        exit()
+    for coleccion in sys.argv[1:]:
+        exportar_coleccion(coleccion)
@@ -0,0 +1,64 @@
+# Archivo: scripts/generar_grafo_referencias.py
+# Junta las referencias cruzadas que guardan los scripts procesar_* (campo
+# "referencias" de data/*_data.json) en un único grafo que el motor de búsqueda
+# carga junto al corpus (app/legal_database.referencias.json).
+# Si falta algún archivo de data/, las referencias de ese código se extraen del
+# texto de app/legal_database.json.
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.alias_leyes import ResolutorLeyes
+from app.referencias import GrafoReferencias, extraer_referencias, ruta_grafo
+
+# --- CONFIGURACIÓN ---
+DIRECTORIO_DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
+ARCHIVO_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'app', 'legal_database.json')
+ARCHIVOS_POR_LEY = {
+    "Código Civil": "civil_data.json",
+    "Código Electoral": "electoral_data.json",
+    "Código de Organización Judicial": "judicial_data_completo.json",
+    "Código Laboral": "laboral_data.json",
+    "Código de la Niñez y la Adolescencia": "ninez_data.json",
+    "Código Penal": "penal_data.json",
+    "Código Procesal Civil": "procesal_civil_data.json",
+    "Código Procesal Penal": "procesal_penal_data.json",
+    "Código Sanitario": "sanitario_data.json",
+    "Código Aduanero": "aduanero_data.json",
+}
+
+if __name__ == "__main__":
+    corpus = sys.argv[1] if len(sys.argv) > 1 else ARCHIVO_CORPUS
+    resolutor = ResolutorLeyes()
+    aristas = {}
+    leyes_procesadas = set()
+
+    for ley, archivo in ARCHIVOS_POR_LEY.items():
+        ruta = os.path.join(DIRECTORIO_DATA, archivo)
+        if not os.path.exists(ruta):
+            continue
+        with open(ruta, 'r', encoding='utf-8') as f:
+            articulos = json.load(f)
+        for art in articulos:
+            numero = str(art['numero_str'])
+            referencias = art.get('referencias')
+            if referencias is None:
+                referencias = extraer_referencias(art['texto'], numero, resolutor)
+            destinos = [(ley_destino or ley, str(num)) for ley_destino, num in referencias]
+            if destinos:
+                aristas.setdefault((ley, numero), []).extend(destinos)
+        leyes_procesadas.add(ley)
+        print(f"  - {ley}: {len(articulos)} artículos leídos de {archivo}")
+
+    with open(corpus, 'r', encoding='utf-8') as f:
+        articulos_corpus = [a for a in json.load(f)['articulos'] if a['nombre_ley'] not in leyes_procesadas]
+    for origen, destinos in GrafoReferencias.desde_articulos(articulos_corpus, resolutor).salientes.items():
+        aristas.setdefault(origen, []).extend(destinos)
+
+    grafo = GrafoReferencias(aristas)
+    grafo.guardar(ruta_grafo(corpus))
+    print(f"Grafo de referencias: {len(grafo.salientes)} artículos con {len(grafo)} referencias.")
+    print(f"Guardado en: {ruta_grafo(corpus)}")
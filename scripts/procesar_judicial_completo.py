@@ -3,8 +3,12 @@
 import os
 import re
 import fitz  # PyMuPDF
+import sys
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.referencias import agregar_referencias
+
 # --- CONFIGURACIÓN ---
 NOMBRE_PDF_ENTRADA = "Código de Organización Judicial-Texto Consolidado.pdf"
 DIRECTORIO_TXT_SALIDA = os.path.join(os.path.dirname(__file__), '..', 'data', 'judicial_articulos_txt')
@@ -130,6 +134,8 @@ def procesar_documento(texto_limpio):
     guardar_articulo_estructurado(numero_articulo_actual, buffer_articulo, contexto_actual, lista_para_json, DIRECTORIO_TXT_SALIDA)
     print(f"\nProcesamiento finalizado. Se han procesado y guardado {len(lista_para_json)} artículos.")
     
+    agregar_referencias(lista_para_json)
+    
     with open(ARCHIVO_JSON_SALIDA, 'w', encoding='utf-8') as f:
         json.dump(lista_para_json, f, ensure_ascii=False, indent=4)
     print(f"Datos estructurados completos guardados en: {ARCHIVO_JSON_SALIDA}")
@@ -3,8 +3,12 @@
 import os
 import re
 import fitz  # PyMuPDF
+import sys
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.referencias import agregar_referencias
+
 # --- CONFIGURACIÓN ---
 NOMBRE_PDF_ENTRADA = "Código Laboral-Texto Consolidado.pdf"
 DIRECTORIO_DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
@@ -100,6 +104,7 @@ def procesar_y_estructurar(texto_limpio):
     
     if not os.path.exists(DIRECTORIO_DATA):
         os.makedirs(DIRECTORIO_DATA)
+    agregar_referencias(lista_de_articulos)
     with open(ARCHIVO_JSON_SALIDA, 'w', encoding='utf-8') as f:
         json.dump(lista_de_articulos, f, ensure_ascii=False, indent=4)
     print(f"Datos estructurados guardados en: {ARCHIVO_JSON_SALIDA}")
@@ -3,8 +3,12 @@
 import os
 import re
 import fitz  # PyMuPDF
+import sys
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.referencias import agregar_referencias
+
 # --- CONFIGURACIÓN ---
 NOMBRE_PDF_ENTRADA = "Código de la Niñez y la Adolescencia-Texto Consolidado.pdf"
 DIRECTORIO_DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
@@ -91,6 +95,7 @@ def procesar_y_estructurar(texto_limpio):
     
     if not os.path.exists(os.path.dirname(ARCHIVO_JSON_SALIDA)):
         os.makedirs(os.path.dirname(ARCHIVO_JSON_SALIDA))
+    agregar_referencias(lista_de_articulos)
     with open(ARCHIVO_JSON_SALIDA, 'w', encoding='utf-8') as f:
         json.dump(lista_de_articulos, f, ensure_ascii=False, indent=4)
     print(f"Datos estructurados guardados en: {ARCHIVO_JSON_SALIDA}")
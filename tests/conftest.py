@@ -0,0 +1,81 @@
+# Archivo: tests/conftest.py
+# COLEPA - Corpus de prueba: la base demo más artículos armados para frases,
+# números repetidos en varios códigos y artículos largos
+
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from app.mock_search import GestorCorpus
+
+DB_DEMO = root_dir / "app" / "legal_database.json"
+
+ARTICULOS_EXTRA = [
+    {
+        "id": "cc_36", "nombre_ley": "Código Civil", "numero_articulo": "36",
+        "texto_completo": "Artículo 36.- El estado civil de las personas se prueba con las partidas del registro.",
+        "palabras_clave": ["estado civil", "registro"],
+    },
+    {
+        "id": "cc_37", "nombre_ley": "Código Civil", "numero_articulo": "37",
+        "texto_completo": "Artículo 37.- El registro civil depende del estado y lleva las partidas de nacimiento.",
+        "palabras_clave": ["registro"],
+    },
+    {
+        "id": "cc_1833", "nombre_ley": "Código Civil", "numero_articulo": "1833",
+        "texto_completo": "Artículo 1833.- El que comete un acto ilícito queda obligado a resarcir los daños y perjuicios.",
+        "palabras_clave": ["acto ilícito", "daños y perjuicios"],
+    },
+    {
+        "id": "cc_1835", "nombre_ley": "Código Civil", "numero_articulo": "1835",
+        "texto_completo": "Artículo 1835.- La estimación de daños de perjuicios futuros corresponde al juez.",
+        "palabras_clave": ["estimación"],
+    },
+    {
+        "id": "cl_36", "nombre_ley": "Código Laboral", "numero_articulo": "36",
+        "texto_completo": "Artículo 36.- El estado de salud del trabajador no impide el cobro de su salario.",
+        "palabras_clave": ["salud", "salario"],
+    },
+    {
+        "id": "coj_10", "nombre_ley": "Código de Organización Judicial", "numero_articulo": "10",
+        "texto_completo": "Artículo 10.- Los tribunales se integran con jueces nombrados por concurso. "
+        + " ".join(
+            f"Inciso {i}: el juez de la circunscripción {i} atiende las causas civiles y comerciales del distrito."
+            for i in range(1, 121)
+        )
+        + " La Corte Suprema reglamenta la feria judicial de enero.",
+        "palabras_clave": ["tribunales", "jueces", "feria judicial"],
+    },
+]
+
+
+@pytest.fixture(scope="session")
+def ruta_corpus(tmp_path_factory) -> Path:
+    base = json.loads(DB_DEMO.read_text(encoding="utf-8"))
+    base["articulos"] = base["articulos"] + ARTICULOS_EXTRA
+    ruta = tmp_path_factory.mktemp("corpus") / "legal_database.json"
+    ruta.write_text(json.dumps(base, ensure_ascii=False), encoding="utf-8")
+    return ruta
+
+
+@pytest.fixture(scope="session")
+def gestor(ruta_corpus) -> GestorCorpus:
+    return GestorCorpus(ruta_corpus)
+
+
+@pytest.fixture(scope="session")
+def snapshot(gestor):
+    return gestor.snapshot
+
+
+@pytest.fixture
+def corpus_prueba(monkeypatch, gestor):
+    """Las funciones públicas de mock_search buscan sobre el corpus de prueba"""
+    from app import mock_search
+    monkeypatch.setattr(mock_search, "GESTOR_CORPUS", gestor)
+    return mock_search
@@ -0,0 +1,22 @@
+# Archivo: tests/test_analizador.py
+# COLEPA - Plegado, stopwords y stemming aplicados al ranking legacy
+
+import pytest
+
+from app.analizador import analizar, plegar
+from app.mock_search import _buscar_top_k
+
+
+def test_plegado_y_stemming():
+    assert analizar("Código códigos CODIGO") == ["codig", "codig", "codig"]
+    assert analizar("de la ley") == ["ley"]
+
+
+@pytest.mark.parametrize("palabra", ["pena", "dolo", "años", "días", "acto"])
+def test_palabras_de_cuatro_letras_puntuan_en_legacy(snapshot, palabra):
+    # El +2 del ranking legacy mira el largo de la palabra, no el de su raíz ("pena" -> "pen")
+    hits = _buscar_top_k(snapshot, palabra, len(snapshot.articulos), 0.0, "legacy", False, None, 0, None)
+    esperados = {(a["nombre_ley"], str(a["numero_articulo"])) for a in snapshot.articulos
+                 if plegar(palabra) in plegar(a["texto_completo"])}
+    assert esperados
+    assert esperados <= {(h["nombre_ley"], str(h["numero_articulo"])) for h in hits}
@@ -0,0 +1,23 @@
+# Archivo: tests/test_arranque.py
+# COLEPA - El modo secuencial arranca sin Qdrant
+
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+
+
+@pytest.mark.parametrize("modo, cargado", [("secuencial", False), ("hibrida", True)])
+def test_vector_search_solo_en_modo_hibrido(modo, cargado):
+    pytest.importorskip("fastapi")
+    entorno = dict(os.environ, COLEPA_BUSQUEDA=modo, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "test"))
+    salida = subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; print('app.vector_search' in sys.modules)"],
+        cwd=ROOT, env=entorno, capture_output=True, text=True, timeout=120,
+    )
+    assert salida.returncode == 0, salida.stderr
+    assert salida.stdout.strip().splitlines()[-1] == str(cargado)
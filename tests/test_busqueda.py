@@ -0,0 +1,81 @@
+# Archivo: tests/test_busqueda.py
+# COLEPA - La búsqueda indexada da los mismos resultados que los caminos que reemplaza
+
+import re
+
+import pytest
+
+from app.mock_search import _buscar_top_k
+
+CONSULTAS = [
+    "divorcio por adulterio",
+    "despido sin justa causa e indemnización",
+    "homicidio y pena de prisión",
+    "jornada de trabajo nocturna del trabajador",
+    "salario mínimo del trabajador",
+    "capacidad de las personas y estado civil",
+    "registro de las partidas",
+    "idioma guaraní en el proceso",
+    "obligación de alimentos de los padres",
+    "Código Civil matrimonio",
+    "Código Laboral descanso",
+    "juez del distrito en causas comerciales",
+    "tribunales y jueces",
+    "consulta sin resultados xyzw",
+]
+
+
+def _puntajes_originales(articulos, query):
+    """
+    Copia textual del loop de scoring de buscar_por_palabras_clave antes del
+    índice invertido: texto_completo y palabras_clave crudos, comparación por
+    substring. Devuelve todos los (score, art) ordenados como el original.
+    """
+    query_lower = query.lower()
+    
+    # Extraer palabras importantes de la query
+    palabras_query = set(re.findall(r'\b\w{4,}\b', query_lower))  # Palabras de 4+ letras
+    
+    # Scoring de artículos
+    scores = []
+    for art in articulos:
+        score = 0
+        
+        # Score por palabras clave
+        for palabra in art.get('palabras_clave', []):
+            if palabra.lower() in query_lower:
+                score += 5
+        
+        # Score por palabras en texto
+        texto_lower = art['texto_completo'].lower()
+        for palabra in palabras_query:
+            if palabra in texto_lower:
+                score += 2
+        
+        # Score por nombre de ley
+        if art['nombre_ley'].lower() in query_lower:
+            score += 10
+        
+        if score > 0:
+            scores.append((score, art))
+    
+    scores.sort(reverse=True, key=lambda x: x[0])
+    return scores
+
+
+# ========== RANKING ==========
+# El analizador compartido pliega tildes y descarta stopwords a propósito:
+# estas consultas no dependen de eso, así que el ranking debe ser idéntico
+CONSULTAS_LEGACY = CONSULTAS + [
+    "dolo", "pena", "robo", "plazo de años", "los días", "acto ilícito", "homicidio doloso",
+    "contrato de trabajo", "daños y perjuicios", "Código Penal homicidio", "Código Procesal Penal defensa",
+]
+
+
+@pytest.mark.parametrize("query", CONSULTAS_LEGACY)
+def test_ranking_legacy_igual_al_original(snapshot, query):
+    hits = _buscar_top_k(snapshot, query, len(snapshot.articulos), 0.0, "legacy", False, None, 0, None)
+    assert [(h["nombre_ley"], str(h["numero_articulo"]), h["score"]) for h in hits] == [
+        (art["nombre_ley"], str(art["numero_articulo"]), score)
+        for score, art in _puntajes_originales(snapshot.articulos, query)
+    ]
@@ -0,0 +1,17 @@
+# Archivo: tests/test_cache.py
+# COLEPA - Los resultados cacheados no se modifican desde afuera
+
+
+def test_modificar_un_resultado_no_toca_el_cache(corpus_prueba):
+    # El art. 36 existe en el Código Civil y en el Laboral: el resultado trae "candidatos"
+    resultado = corpus_prueba.buscar_articulo_por_numero(36)
+    assert len(resultado["candidatos"]) == 2
+    resultado["pageContent"] = "modificado"
+    for candidato in resultado["candidatos"]:
+        candidato["fragmento"] = {"texto": "modificado"}
+    resultado["candidatos"].append({})
+
+    otra = corpus_prueba.buscar_articulo_por_numero(36)
+    assert otra["pageContent"] != "modificado"
+    assert len(otra["candidatos"]) == 2
+    assert all("fragmento" not in candidato for candidato in otra["candidatos"])
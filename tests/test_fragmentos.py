@@ -0,0 +1,64 @@
+# Archivo: tests/test_fragmentos.py
+# COLEPA - Lo que va al prompt: artículos pedidos enteros, fragmentos del resto y el cache de respuestas
+
+import os
+
+import pytest
+
+
+@pytest.fixture
+def main(corpus_prueba):
+    pytest.importorskip("fastapi")
+    os.environ.setdefault("OPENAI_API_KEY", "test")
+    from app import main
+    return main
+
+
+def _articulo_largo(snapshot):
+    art = next(a for a in snapshot.articulos if a["nombre_ley"] == "Código de Organización Judicial")
+    return {"pageContent": art["texto_completo"], "numero_articulo": art["numero_articulo"],
+            "nombre_ley": art["nombre_ley"]}
+
+
+def test_articulo_pedido_por_numero_conserva_el_cuerpo(main, snapshot):
+    contexto = main.recortar_contexto(
+        _articulo_largo(snapshot), "¿Qué dice el artículo 10 del Código de Organización Judicial sobre la feria judicial?"
+    )
+    fragmento = contexto["fragmento"]
+    assert fragmento["recortado"]
+    # Desde el comienzo y sin saltos: un solo tramo que arranca en el texto del artículo
+    assert fragmento["fragmentos"][0]["inicio"] == 0
+    assert len(fragmento["fragmentos"]) == 1
+    assert fragmento["texto"].startswith("Artículo 10.- Los tribunales se integran")
+    assert fragmento["tokens"] <= main.MAX_TOKENS_ARTICULO_PEDIDO
+
+
+def test_articulo_no_pedido_por_numero_elige_los_segmentos_de_la_consulta(main, snapshot):
+    contexto = main.recortar_contexto(_articulo_largo(snapshot), "¿Quién reglamenta la feria judicial?")
+    fragmento = contexto["fragmento"]
+    assert fragmento["recortado"]
+    assert "feria judicial de enero" in fragmento["texto"]
+    assert fragmento["tokens"] <= main.MAX_TOKENS_CONTEXTO
+
+
+def test_recortar_un_contexto_combinado_no_toca_los_articulos(main):
+    contextos = main.buscar_articulos_por_numeros([36, 37], "Código Civil")
+    assert len(contextos) == 2
+    contexto = main.recortar_contexto(main.combinar_contextos(contextos), "artículos 36 y 37 del Código Civil")
+    assert all("fragmento" in c for c in contexto["articulos"])
+    assert all("fragmento" not in c for c in contextos)
+
+
+def test_cache_de_respuestas_distingue_texto_completo_y_version(main, monkeypatch):
+    cache = main.cache_manager
+    historial = [main.MensajeChat(role="user", content="¿Qué dice el artículo 10 del Código de Organización Judicial?")]
+    contexto = {"nombre_ley": "Código de Organización Judicial", "numero_articulo": "10", "pageContent": "..."}
+    monkeypatch.setattr(cache, "cache_respuestas", {})
+
+    cache.set_respuesta(historial, contexto, "con fragmentos", texto_completo=False)
+    assert cache.get_respuesta(historial, contexto, texto_completo=False) == "con fragmentos"
+    assert cache.get_respuesta(historial, contexto, texto_completo=True) is None
+
+    # Una recarga del corpus puede cambiar el texto del artículo
+    monkeypatch.setattr(main, "version_corpus", lambda: "otra-version")
+    assert cache.get_respuesta(historial, contexto, texto_completo=False) is None
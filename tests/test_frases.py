@@ -0,0 +1,38 @@
+# Archivo: tests/test_frases.py
+# COLEPA - Frases entre comillas: solo la frase exacta, resuelta con el índice posicional
+
+import re
+
+import pytest
+
+from app.analizador import plegar
+from app.mock_search import _buscar_top_k
+
+
+def _encontrados(snapshot, query):
+    hits = _buscar_top_k(snapshot, query, len(snapshot.articulos), 0.0, "bm25", False, None, 0, None)
+    return {(h["nombre_ley"], str(h["numero_articulo"])) for h in hits}
+
+
+@pytest.mark.parametrize("frase", [
+    "estado civil", "registro civil", "partidas del registro", "feria judicial", "daños y perjuicios",
+])
+def test_frase_entre_comillas_solo_coincidencia_exacta(snapshot, frase):
+    patron = re.compile(r"\b" + r"\s+".join(map(re.escape, plegar(frase).split())) + r"\b")
+    esperados = {(a["nombre_ley"], str(a["numero_articulo"])) for a in snapshot.articulos
+                 if patron.search(plegar(a["texto_completo"]))}
+    assert esperados
+    assert _encontrados(snapshot, f'"{frase}"') == esperados
+
+
+def test_frase_no_coincide_con_palabras_separadas(snapshot):
+    # "estado" y "civil" aparecen en el art. 37 del Código Civil, pero no juntas
+    assert ("Código Civil", "37") not in _encontrados(snapshot, '"estado civil"')
+
+
+def test_frase_respeta_las_stopwords_del_medio(snapshot):
+    # El art. 1835 dice "daños de perjuicios": mismas palabras de contenido, otra stopword
+    encontrados = _encontrados(snapshot, '"daños y perjuicios"')
+    assert ("Código Civil", "1833") in encontrados
+    assert ("Código Civil", "1835") not in encontrados
+    assert ("Código Civil", "1835") in _encontrados(snapshot, '"daños de perjuicios"')
@@ -0,0 +1,34 @@
+# Archivo: tests/test_lote.py
+# COLEPA - buscar_lote da, consulta por consulta, los mismos hits que buscar_top_k
+
+import pytest
+
+CONSULTAS = [
+    "despido sin justa causa e indemnización",
+    "homicidio y pena de prisión",
+    "jornada de trabajo nocturna del trabajador",
+    "capacidad de las personas y estado civil",
+    "obligación de alimentos de los padres",
+    "Código Civil matrimonio",
+    "Código Laboral descanso",
+    "juez del distrito en causas comerciales",
+    "daños y perjuicios",
+    "homicidio dolosso",
+    '"estado civil" registro',
+    "consulta sin resultados xyzw",
+]
+
+
+def _claves(hits):
+    return [(h["nombre_ley"], str(h["numero_articulo"]), round(h["score"], 9), h["terminos_coincidentes"],
+             h["correcciones"], h.get("cobertura_consulta")) for h in hits]
+
+
+@pytest.mark.parametrize("modo", [None, "legacy", "bm25"])
+@pytest.mark.parametrize("ventana", [None, 0])
+def test_buscar_lote_igual_a_top_k(corpus_prueba, modo, ventana):
+    # tamano_bloque chico: varias consultas por bloque y más de un bloque
+    lote = corpus_prueba.buscar_lote(CONSULTAS, k=5, tamano_bloque=5, modo=modo, ventana=ventana)
+    assert [_claves(hits) for hits in lote] == [
+        _claves(corpus_prueba.buscar_top_k(query, k=5, modo=modo, ventana=ventana)) for query in CONSULTAS
+    ]
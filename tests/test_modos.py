@@ -0,0 +1,22 @@
+# Archivo: tests/test_modos.py
+# COLEPA - El modo legacy conserva el scoring original salvo que se pida otra cosa
+
+from app.mock_search import VENTANA_PROXIMIDAD, _buscar_top_k
+
+CONSULTA = "jornada de trabajo nocturna del trabajdor"
+
+
+def test_legacy_sin_proximidad_ni_correccion_por_defecto(corpus_prueba, snapshot):
+    hits = corpus_prueba.buscar_top_k(CONSULTA, k=10, modo="legacy")
+    assert hits == _buscar_top_k(snapshot, CONSULTA, 10, 0.0, "legacy", False, None, 0, None)
+    assert all(type(h["score"]) is int and not h["correcciones"] for h in hits)
+
+
+def test_legacy_con_proximidad_y_correccion_a_pedido(corpus_prueba, snapshot):
+    hits = corpus_prueba.buscar_top_k(CONSULTA, k=10, modo="legacy", corregir=True, ventana=VENTANA_PROXIMIDAD)
+    assert hits == _buscar_top_k(snapshot, CONSULTA, 10, 0.0, "legacy", True, None, VENTANA_PROXIMIDAD, None)
+
+
+def test_bm25_con_proximidad_y_correccion_por_defecto(corpus_prueba, snapshot):
+    hits = corpus_prueba.buscar_top_k(CONSULTA, k=10, modo="bm25")
+    assert hits == _buscar_top_k(snapshot, CONSULTA, 10, 0.0, "bm25", True, None, VENTANA_PROXIMIDAD, None)
@@ -0,0 +1,57 @@
+# Archivo: tests/test_presupuesto.py
+# COLEPA - El tiempo límite corta el ranking: el hilo de /api/buscar no sigue trabajando
+
+import os
+import time
+import threading
+
+import pytest
+
+from app.indice_invertido import PresupuestoAgotado, _verificar_limite
+
+CONSULTAS = ["despido sin justa causa e indemnización", "Código Civil matrimonio", '"estado civil" registro']
+
+
+@pytest.mark.parametrize("modo", ["legacy", "bm25"])
+def test_limite_vencido_corta_el_ranking(corpus_prueba, modo):
+    for query in CONSULTAS:
+        with pytest.raises(PresupuestoAgotado):
+            corpus_prueba.buscar_top_k(query, modo=modo, ventana=5, limite=time.monotonic() - 1)
+
+
+@pytest.mark.parametrize("modo", ["legacy", "bm25"])
+def test_limite_holgado_no_cambia_el_ranking(corpus_prueba, modo):
+    for query in CONSULTAS:
+        assert corpus_prueba.buscar_top_k(query, modo=modo, limite=time.monotonic() + 60) == \
+            corpus_prueba.buscar_top_k(query, modo=modo)
+
+
+def test_buscar_responde_parcial_y_el_hilo_termina(corpus_prueba, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    os.environ.setdefault("OPENAI_API_KEY", "test")
+    from fastapi.testclient import TestClient
+    from app import main
+
+    terminado = threading.Event()
+
+    def ranking_lento(query, k, ley=None, limite=None):
+        # Un ranking que nunca termina solo: lo corta el límite, como el scoring real
+        try:
+            while True:
+                _verificar_limite(limite)
+                time.sleep(0.005)
+        finally:
+            terminado.set()
+
+    monkeypatch.setattr(main, "buscar_top_k", ranking_lento)
+    respuesta = TestClient(main.app).get(
+        "/api/buscar", params={"q": "artículo 36 del Código Civil", "presupuesto_ms": 50}
+    )
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert datos["parcial"]
+    assert [(h["nombre_ley"], h["numero_articulo"], h["por_numero"]) for h in datos["hits"]] == [
+        ("Código Civil", "36", True)
+    ]
+    assert terminado.is_set()
@@ -0,0 +1,20 @@
+# Archivo: tests/test_referencias.py
+# COLEPA - Rangos y listas de artículos en la consulta
+
+import time
+
+from app.referencias import MAX_ARTICULOS_POR_RANGO, MAX_NUMERO_ARTICULO, extraer_pedido_articulos
+
+
+def test_rangos_y_listas():
+    assert extraer_pedido_articulos("artículos 10 al 13") == ([10, 11, 12, 13], 4)
+    assert extraer_pedido_articulos("arts. 229, 230 y 231") == ([229, 230, 231], 3)
+    assert extraer_pedido_articulos("el artículo 45 a 18 años") == ([45], 1)
+
+
+def test_rango_enorme_no_se_expande():
+    inicio = time.perf_counter()
+    numeros, total = extraer_pedido_articulos("artículos 1 al 10000000000000000000, 5 al 300000000")
+    assert time.perf_counter() - inicio < 0.5
+    assert numeros == list(range(1, MAX_ARTICULOS_POR_RANGO + 1))
+    assert total == MAX_NUMERO_ARTICULO
@@ -0,0 +1,54 @@
+# Archivo: tests/test_shards.py
+# COLEPA - Los shards devuelven los mismos hits que la búsqueda en un solo proceso
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.busqueda_distribuida import BuscadorDistribuido
+from app.mock_search import _buscar_top_k
+
+CONSULTAS = [
+    "divorcio por adulterio",
+    "despido sin justa causa e indemnización",
+    "homicidio y pena de prisión",
+    "jornada de trabajo nocturna del trabajador",
+    "salario mínimo del trabajador",
+    "capacidad de las personas y estado civil",
+    "registro de las partidas",
+    "idioma guaraní en el proceso",
+    "obligación de alimentos de los padres",
+    "Código Civil matrimonio",
+    "Código Laboral descanso",
+    "juez del distrito en causas comerciales",
+    "tribunales y jueces",
+    "consulta sin resultados xyzw",
+]
+
+
+def _claves(hits):
+    return [(h["nombre_ley"], str(h["numero_articulo"]), round(h["score"], 9), h["terminos_coincidentes"])
+            for h in hits]
+
+
+@pytest.fixture(scope="module")
+def buscador(snapshot):
+    buscador = BuscadorDistribuido(3)
+    buscador.iniciar(snapshot)
+    yield buscador
+    buscador.cerrar()
+
+
+@pytest.mark.parametrize("modo", ["legacy", "bm25"])
+@pytest.mark.parametrize("filtros", [{}, {"ley": "Código Civil"}])
+def test_shards_igual_a_busqueda_local(snapshot, buscador, modo, filtros):
+    for query in CONSULTAS + ['"estado civil"', "estado civil"]:
+        local = _buscar_top_k(snapshot, query, 5, 0.0, modo, False, None, 5, filtros)
+        assert _claves(buscador.buscar_top_k(query, 5, 0.0, modo, 5, filtros)) == _claves(local)
+
+
+def test_shards_atienden_consultas_concurrentes(snapshot, buscador):
+    with ThreadPoolExecutor(8) as ejecutor:
+        resultados = list(ejecutor.map(lambda q: buscador.buscar_top_k(q, 5, 0.0, "bm25", 0, {}), CONSULTAS * 4))
+    for query, hits in zip(CONSULTAS * 4, resultados):
+        assert _claves(hits) == _claves(_buscar_top_k(snapshot, query, 5, 0.0, "bm25", False, None, 0, None))